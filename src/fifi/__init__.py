@@ -9,12 +9,20 @@ __all__ = [
     "LoggerFactory",
     "RedisSubscriber",
     "RedisPublisher",
+    "SHMPublisher",
+    "SHMSubscriber",
     "Repository",
     "BaseEngine",
     "BaseService",
     "RedisBaseModel",
     "MarketDataRepository",
     "MarketStatRepository",
+    "OrderBookRepository",
+    "TradeTapeRepository",
+    "CandleAggregator",
+    "HistoryRepository",
+    "SHMArena",
+    "SHMRegistry",
 ]
 
 from .data.database_provider import DatabaseProvider
@@ -27,9 +35,17 @@ from .models.datetime_decorated_base import DatetimeDecoratedBase
 from .helpers.get_logger import LoggerFactory
 from .redis.redis_subscriber import RedisSubscriber
 from .redis.redis_publisher import RedisPublisher
+from .ipc.shm_publisher import SHMPublisher
+from .ipc.shm_subscriber import SHMSubscriber
 from .redis.redis_base_model import RedisBaseModel
 from .repository.repository import Repository
 from .repository.shm.market_data_repository import MarketDataRepository
 from .repository.shm.market_stat_repository import MarketStatRepository
+from .repository.shm.order_book_repository import OrderBookRepository
+from .repository.shm.trade_tape_repository import TradeTapeRepository
+from .repository.shm.candle_aggregator import CandleAggregator
+from .repository.history.history_repository import HistoryRepository
+from .repository.shm.shm_arena import SHMArena
+from .repository.shm.shm_registry import SHMRegistry
 from .engine.base_engine import BaseEngine
 from .service.base_service import BaseService
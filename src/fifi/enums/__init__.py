@@ -11,6 +11,8 @@ __all__ = [
     "PositionStatus",
     "MarketStat",
     "Candle",
+    "SHMHeader",
+    "OverflowPolicy",
 ]
 
 from .asset import Asset
@@ -25,3 +27,5 @@ from .position_side import PositionSide
 from .position_status import PositionStatus
 from .market_stat import MarketStat
 from .candle import Candle
+from .shm_header import SHMHeader
+from .overflow_policy import OverflowPolicy
@@ -1,5 +1,7 @@
-__all__ = ["MarketData", "MarketStat", "HealthStat"]
+__all__ = ["MarketData", "MarketStat", "HealthStat", "OrderBook", "Trade"]
 
 from .market_data import MarketData
 from .market_stat import MarketStat
 from .health_stat import HealthStat
+from .order_book import OrderBook
+from .trade import Trade
@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class OrderBook(Enum):
+    BID_PRICE = 0
+    BID_SIZE = 1
+    ASK_PRICE = 2
+    ASK_SIZE = 3
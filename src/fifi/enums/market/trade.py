@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class Trade(Enum):
+    TIME = 0
+    PRICE = 1
+    SIZE = 2
+    SIDE = 3
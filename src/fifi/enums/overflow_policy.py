@@ -0,0 +1,12 @@
+from enum import Enum
+
+
+class OverflowPolicy(str, Enum):
+    # evicts the oldest buffered message
+    DROP_OLDEST = "drop_oldest"
+    # rejects the incoming message
+    DROP_NEWEST = "drop_newest"
+    # a new message replaces the buffered one with the same key
+    KEEP_LATEST = "keep_latest"
+    # the listener waits for the consumer
+    BLOCK = "block"
@@ -0,0 +1,26 @@
+from enum import Enum
+
+
+class SHMHeader(Enum):
+    # layout
+    MAGIC = 0
+    VERSION = 1
+    DTYPE = 2
+    ROWS = 3
+    COLUMNS = 4
+    FINGERPRINT = 5
+    # seqlock counter, odd while the writer is in the middle of a write
+    SEQ = 6
+    # ring buffer
+    HEAD = 7
+    RING = 8
+    # readers sleeping on the seqlock counter
+    WAITERS = 9
+    # memory layout of the data block, 1 for column-major
+    ORDER = 10
+    # structured dtype with a compact type per column
+    COMPACT = 11
+    # bumped by the writer when the rows move to a resized segment
+    GENERATION = 12
+    # number of records ever appended to a tape
+    WRITTEN = 13
@@ -4,6 +4,9 @@ __all__ = [
     "IntegrityConflictException",
     "NotFoundException",
     "NotExistedSessionException",
+    "SHMSnapshotException",
+    "SHMLayoutException",
+    "SHMOverrunException",
 ]
 
 from .exceptions import *
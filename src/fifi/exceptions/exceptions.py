@@ -16,3 +16,15 @@ class NotFoundException(Exception):
 
 class NotExistedSessionException(Exception):
     pass
+
+
+class SHMSnapshotException(Exception):
+    pass
+
+
+class SHMLayoutException(Exception):
+    pass
+
+
+class SHMOverrunException(Exception):
+    pass
@@ -0,0 +1,106 @@
+import ctypes
+import errno
+import platform
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+FUTEX_WAIT = 0
+FUTEX_WAKE = 1
+# syscall numbers of futex on the architectures we run on
+SYS_FUTEX = {"x86_64": 202, "aarch64": 98}.get(platform.machine())
+INT_MAX = 2**31 - 1
+# threads of the waits of asyncio callers, more concurrent waits queue up
+WAIT_WORKERS = 32
+
+_wait_executor: Optional[ThreadPoolExecutor] = None
+_wait_executor_lock = threading.Lock()
+
+
+def wait_executor() -> ThreadPoolExecutor:
+    """wait_executor.
+    executor of the blocking futex waits of asyncio callers, kept apart from the
+    default executor of the loop so sleeping waiters don't starve other blocking
+    work. it has WAIT_WORKERS threads, a waiter beyond them waits for a free
+    thread and may see its update up to a wait slice late.
+    """
+    global _wait_executor
+    with _wait_executor_lock:
+        if _wait_executor is None:
+            _wait_executor = ThreadPoolExecutor(
+                max_workers=WAIT_WORKERS, thread_name_prefix="fifi_futex_wait"
+            )
+        return _wait_executor
+
+
+class Timespec(ctypes.Structure):
+    _fields_ = [("tv_sec", ctypes.c_long), ("tv_nsec", ctypes.c_long)]
+
+
+class Futex:
+    """Futex.
+    thin wrapper of the linux futex syscall on a 32 bits word of a shared
+    mapping, the shared (not private) operations wake waiters of every process
+    which maps the same memory. where futex isn't available `wait` falls back
+    to a short sleep so callers end up polling.
+    """
+
+    available = sys.platform == "linux" and SYS_FUTEX is not None
+    _syscall = None
+
+    def __init__(self, address: int) -> None:
+        """__init__.
+
+        Args:
+            address (int): address of a 4 bytes aligned word in shared memory
+        """
+        self.address = address
+        if self.available and Futex._syscall is None:
+            Futex._syscall = ctypes.CDLL(None, use_errno=True).syscall
+
+    def wait(self, expected: int, timeout: Optional[float] = None) -> None:
+        """wait.
+        sleeps while the word still holds `expected`, until woken up or timed out.
+
+        Args:
+            expected (int): expected value of the low 32 bits of the word
+            timeout (Optional[float]): timeout in seconds
+        """
+        if not self.available:
+            time.sleep(min(timeout, 0.001) if timeout is not None else 0.001)
+            return
+        timespec = None
+        if timeout is not None:
+            seconds = int(timeout)
+            timespec = ctypes.byref(
+                Timespec(seconds, int((timeout - seconds) * 1_000_000_000))
+            )
+        result = self._syscall(
+            SYS_FUTEX,
+            ctypes.c_void_p(self.address),
+            FUTEX_WAIT,
+            ctypes.c_int(expected & 0xFFFFFFFF),
+            timespec,
+            None,
+            0,
+        )
+        if result == -1:
+            error = ctypes.get_errno()
+            # value already changed, timed out or interrupted
+            if error not in (errno.EAGAIN, errno.ETIMEDOUT, errno.EINTR):
+                raise OSError(error, f"futex wait failed: {errno.errorcode[error]}")
+
+    def wake(self, count: int = INT_MAX) -> None:
+        """wake.
+        wakes up waiters of the word
+
+        Args:
+            count (int): maximum number of waiters to wake up
+        """
+        if not self.available:
+            return
+        self._syscall(
+            SYS_FUTEX, ctypes.c_void_p(self.address), FUTEX_WAKE, count, None, None, 0
+        )
@@ -0,0 +1,114 @@
+import hashlib
+import numpy as np
+from typing import Iterable, Union
+
+HASH_BITS = 64
+# below 16 registers the estimate is meaningless, above 2 ** 16 the ranks of the
+# 64 bits hashes get short and a candle sketch outweighs the candle
+MIN_PRECISION = 4
+MAX_PRECISION = 16
+
+
+def check_precision(precision: int) -> int:
+    """check_precision.
+
+    Raises:
+        ValueError: precision is out of MIN_PRECISION..MAX_PRECISION
+    """
+    if not MIN_PRECISION <= precision <= MAX_PRECISION:
+        raise ValueError(
+            f"{precision}: precision of a sketch should be in "
+            f"{MIN_PRECISION}..{MAX_PRECISION}"
+        )
+    return precision
+
+
+def _precision(m: int) -> int:
+    precision = m.bit_length() - 1
+    if m != 1 << precision:
+        raise ValueError(f"{m}: number of registers should be a power of two")
+    return check_precision(precision)
+
+
+def hash_traders(traders: Iterable[str]) -> np.ndarray:
+    """hash_traders.
+    stable 64 bits hashes of trader ids, the built-in hash is salted per process
+    so it can't be shared between the feed handlers and the readers.
+
+    Args:
+        traders (Iterable[str]): trader ids or addresses
+
+    Returns:
+        np.ndarray: uint64 hashes
+    """
+    return np.array(
+        [
+            int.from_bytes(
+                hashlib.blake2b(trader.encode(), digest_size=8).digest(), "little"
+            )
+            for trader in traders
+        ],
+        dtype=np.uint64,
+    )
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    # frexp is exact below 2 ** 53, so the 64 bits are split in two halves
+    high = (values >> np.uint64(32)).astype(np.double)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.double)
+    return np.where(high > 0, 32 + np.frexp(high)[1], np.frexp(low)[1])
+
+
+def hll_add(registers: np.ndarray, hashes: np.ndarray) -> None:
+    """hll_add.
+    adds hashes to a sketch in place, the first `precision` bits pick the register
+    and the register keeps the longest run of leading zeros of the rest.
+
+    Args:
+        registers (np.ndarray): uint8 registers, their count is a power of two
+        hashes (np.ndarray): uint64 hashes
+
+    Raises:
+        ValueError: the registers aren't a sketch of a supported precision
+    """
+    precision = _precision(len(registers))
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    indexes = (hashes >> np.uint64(HASH_BITS - precision)).astype(np.intp)
+    rest = hashes & np.uint64((1 << (HASH_BITS - precision)) - 1)
+    ranks = HASH_BITS - precision - _bit_length(rest) + 1
+    np.maximum.at(registers, indexes, ranks.astype(np.uint8))
+
+
+def hll_merge(sketches: np.ndarray) -> np.ndarray:
+    """hll_merge.
+    union of sketches, the register-wise maximum
+
+    Args:
+        sketches (np.ndarray): one sketch per row
+    """
+    return np.max(sketches, axis=0, initial=0)
+
+
+def hll_count(registers: np.ndarray) -> Union[float, np.ndarray]:
+    """hll_count.
+    estimated number of distinct hashes with the small range correction, the
+    standard error is about 1.04 / sqrt(number of registers).
+
+    Args:
+        registers (np.ndarray): one sketch, or one sketch per row
+
+    Returns:
+        Union[float, np.ndarray]: estimate of every sketch
+
+    Raises:
+        ValueError: the registers aren't a sketch of a supported precision
+    """
+    registers = np.asarray(registers)
+    m = registers.shape[-1]
+    _precision(m)
+    alpha = 0.7213 / (1 + 1.079 / m)
+    estimate = alpha * m * m / np.sum(np.exp2(-registers.astype(np.double)), axis=-1)
+    zeros = np.count_nonzero(registers == 0, axis=-1)
+    linear = m * np.log(m / np.maximum(zeros, 1))
+    estimate = np.where((estimate <= 2.5 * m) & (zeros > 0), linear, estimate)
+    return estimate if estimate.ndim else float(estimate)
@@ -0,0 +1,17 @@
+import os
+
+
+def pid_alive(pid: int) -> bool:
+    """pid_alive.
+    whether a process of the host exists, a process of another user counts as alive
+
+    Args:
+        pid (int): process id
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
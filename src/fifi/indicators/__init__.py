@@ -0,0 +1,14 @@
+__all__ = [
+    "WilderAverage",
+    "StreamingRSI",
+    "StreamingATR",
+    "StreamingWMA",
+    "StreamingHMA",
+    "StreamingIndicators",
+]
+
+from .wilder_average import WilderAverage
+from .rsi import StreamingRSI
+from .atr import StreamingATR
+from .hma import StreamingWMA, StreamingHMA
+from .streaming_indicators import StreamingIndicators
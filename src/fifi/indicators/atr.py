@@ -0,0 +1,44 @@
+from typing import Optional
+
+from .wilder_average import WilderAverage
+
+
+class StreamingATR:
+    """StreamingATR.
+    Wilder ATR updated in constant time per candle
+    """
+
+    def __init__(self, period: int = 14) -> None:
+        self.period = period
+        self._average = WilderAverage(period)
+        self._prev_close: Optional[float] = None
+
+    def _true_range(self, high: float, low: float) -> float:
+        if self._prev_close is None:
+            return high - low
+        return max(
+            high - low, abs(high - self._prev_close), abs(low - self._prev_close)
+        )
+
+    def peek(self, high: float, low: float) -> float:
+        """peek.
+        ATR with the live high and low of the current candle
+
+        Args:
+            high (float): high
+            low (float): low
+        """
+        return self._average.peek(self._true_range(high, low))
+
+    def push(self, high: float, low: float, close: float) -> float:
+        """push.
+        commits a closed candle
+
+        Args:
+            high (float): high
+            low (float): low
+            close (float): close
+        """
+        value = self._average.push(self._true_range(high, low))
+        self._prev_close = close
+        return value
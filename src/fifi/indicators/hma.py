@@ -0,0 +1,77 @@
+import math
+from collections import deque
+
+
+class StreamingWMA:
+    """StreamingWMA.
+    linear weighted moving average, the weighted sum and the plain sum of the
+    window are kept so adding a value doesn't walk the window. the sums are
+    recomputed from the window once per period pushes, the rounding errors of
+    the running updates would otherwise pile up, e.g. after a spike.
+    """
+
+    def __init__(self, period: int) -> None:
+        if period <= 0:
+            raise ValueError("period must be greater than 0")
+        self.period = period
+        self._window: deque = deque(maxlen=period)
+        self._weighted = 0.0
+        self._total = 0.0
+        self._pushes = 0
+        self._divisor = period * (period + 1) / 2
+
+    def _next(self, x: float):
+        if len(self._window) == self.period:
+            # every weight drops by one, the oldest one falls out of the window
+            weighted = self._weighted - self._total + self.period * x
+            total = self._total + x - self._window[0]
+        else:
+            weighted = self._weighted + (len(self._window) + 1) * x
+            total = self._total + x
+        return weighted, total
+
+    def peek(self, x: float) -> float:
+        if len(self._window) + 1 < self.period:
+            return math.nan
+        return self._next(x)[0] / self._divisor
+
+    def push(self, x: float) -> float:
+        value = self.peek(x)
+        self._weighted, self._total = self._next(x)
+        self._window.append(x)
+        self._pushes += 1
+        if self._pushes % self.period == 0:
+            self._resync()
+        return value
+
+    def _resync(self) -> None:
+        self._weighted = math.fsum(
+            weight * x for weight, x in enumerate(self._window, 1)
+        )
+        self._total = math.fsum(self._window)
+
+
+class StreamingHMA:
+    """StreamingHMA.
+    Hull moving average, WMA(sqrt(n)) of 2 * WMA(n / 2) - WMA(n)
+    """
+
+    def __init__(self, period: int = 14) -> None:
+        if period < 2:
+            raise ValueError("period must be greater than 1")
+        self.period = period
+        self._half = StreamingWMA(period // 2)
+        self._full = StreamingWMA(period)
+        self._smooth = StreamingWMA(int(math.sqrt(period)))
+
+    def peek(self, close: float) -> float:
+        raw = 2 * self._half.peek(close) - self._full.peek(close)
+        if math.isnan(raw):
+            return math.nan
+        return self._smooth.peek(raw)
+
+    def push(self, close: float) -> float:
+        raw = 2 * self._half.push(close) - self._full.push(close)
+        if math.isnan(raw):
+            return math.nan
+        return self._smooth.push(raw)
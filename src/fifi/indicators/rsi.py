@@ -0,0 +1,54 @@
+import math
+from typing import Optional
+
+from .wilder_average import WilderAverage
+
+
+class StreamingRSI:
+    """StreamingRSI.
+    Wilder RSI updated in constant time per close
+    """
+
+    def __init__(self, period: int = 14) -> None:
+        self.period = period
+        self._gain = WilderAverage(period)
+        self._loss = WilderAverage(period)
+        self._prev_close: Optional[float] = None
+
+    @staticmethod
+    def _rsi(gain: float, loss: float) -> float:
+        if math.isnan(gain) or math.isnan(loss):
+            return math.nan
+        if not loss:
+            return 100.0 if gain else 50.0
+        return 100 - 100 / (1 + gain / loss)
+
+    def peek(self, close: float) -> float:
+        """peek.
+        RSI with the live close of the current candle
+
+        Args:
+            close (float): close
+        """
+        if self._prev_close is None:
+            return math.nan
+        change = close - self._prev_close
+        return self._rsi(
+            self._gain.peek(max(change, 0.0)), self._loss.peek(max(-change, 0.0))
+        )
+
+    def push(self, close: float) -> float:
+        """push.
+        commits the close of a closed candle
+
+        Args:
+            close (float): close
+        """
+        if self._prev_close is None:
+            self._prev_close = close
+            return math.nan
+        change = close - self._prev_close
+        self._prev_close = close
+        return self._rsi(
+            self._gain.push(max(change, 0.0)), self._loss.push(max(-change, 0.0))
+        )
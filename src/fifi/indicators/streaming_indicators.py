@@ -0,0 +1,177 @@
+import math
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+from ..enums.market import MarketData, MarketStat
+from ..helpers.get_logger import LoggerFactory
+from ..repository.shm.market_data_repository import MarketDataRepository
+from ..repository.shm.market_stat_repository import MarketStatRepository
+from .atr import StreamingATR
+from .hma import StreamingHMA
+from .rsi import StreamingRSI
+
+RSI_PERIODS = {
+    MarketStat.RSI14: 14,
+    MarketStat.RSI7: 7,
+    MarketStat.RSI5: 5,
+    MarketStat.RSI3: 3,
+}
+ATR_PERIODS = {
+    MarketStat.ATR14: 14,
+    MarketStat.ATR7: 7,
+    MarketStat.ATR5: 5,
+    MarketStat.ATR3: 3,
+}
+
+
+class StreamingIndicators:
+    """StreamingIndicators.
+    keeps the indicator state of one market/interval and writes the MarketStat
+    columns into its MarketStatRepository. the live candle only peeks the state
+    and closed candles commit it, so every update is constant time.
+    """
+
+    def __init__(self, stats: MarketStatRepository, hma_period: int = 14) -> None:
+        """__init__.
+
+        Args:
+            stats (MarketStatRepository): writer repository of the stats
+            hma_period (int): period of the HMA column
+        """
+        self.stats = stats
+        self.LOGGER = LoggerFactory().get(f"streaming_indicators_{stats._name}")
+        self._rsi = {stat: StreamingRSI(period) for stat, period in RSI_PERIODS.items()}
+        self._atr = {stat: StreamingATR(period) for stat, period in ATR_PERIODS.items()}
+        self._hma = StreamingHMA(hma_period)
+        self._candle_time = 0.0
+        # close of the last committed candle, empty candles are flat at it
+        self._last_close = math.nan
+
+    def update(self, close: float, high: float, low: float, time: float) -> None:
+        """update.
+        writes the indicators of the live candle
+
+        Args:
+            close (float): live close
+            high (float): live high
+            low (float): live low
+            time (float): candle time
+        """
+        values: Dict[MarketStat, float] = {
+            stat: rsi.peek(close) for stat, rsi in self._rsi.items()
+        }
+        for stat, atr in self._atr.items():
+            values[stat] = atr.peek(high, low)
+        values[MarketStat.HMA] = self._hma.peek(close)
+        values[MarketStat.TIME] = time
+        self.stats.set_last_stats(values)
+
+    def close_candle(self, close: float, high: float, low: float, time: float) -> None:
+        """close_candle.
+        commits a closed candle, writes its final indicators and opens the next
+        stats row.
+
+        Args:
+            close (float): close
+            high (float): high
+            low (float): low
+            time (float): candle time
+        """
+        values: Dict[MarketStat, float] = {
+            stat: rsi.push(close) for stat, rsi in self._rsi.items()
+        }
+        for stat, atr in self._atr.items():
+            values[stat] = atr.push(high, low, close)
+        values[MarketStat.HMA] = self._hma.push(close)
+        values[MarketStat.TIME] = time
+        self.stats.set_last_stats(values)
+        self.stats.create_candle()
+        self._last_close = close
+
+    def warmup(self, data: MarketDataRepository) -> None:
+        """warmup.
+        commits the closed candles in the window of the data repository without
+        writing them, so the indicators are ready on the first update.
+
+        Args:
+            data (MarketDataRepository): data
+        """
+        candles = data.snapshot()
+        for candle in candles[:-1]:
+            prices = self._prices(candle)
+            if prices is not None:
+                self._push(*prices)
+        self._candle_time = candles[-1, MarketData.TIME.value]
+
+    def update_from(self, data: MarketDataRepository) -> None:
+        """update_from.
+        follows the candles of a data repository, it closes every candle since the
+        last update when the data repository has rolled over and then updates the
+        live one. updates which missed some candles look them up in the whole window.
+
+        Args:
+            data (MarketDataRepository): data
+        """
+        candles = data.snapshot(_from=-2)
+        live = candles[-1]
+        time = live[MarketData.TIME.value]
+        if not time:
+            return
+        if self._candle_time and time != self._candle_time:
+            closed = candles[:-1]
+            if closed[0, MarketData.TIME.value] != self._candle_time:
+                closed = self._closed_since(data.snapshot()[:-1])
+            for candle in closed:
+                prices = self._prices(candle)
+                if prices is None:
+                    # nothing traded yet, the row only gets its time
+                    self.stats.set_last_stat(
+                        MarketStat.TIME, candle[MarketData.TIME.value]
+                    )
+                    self.stats.create_candle()
+                else:
+                    self.close_candle(*prices, candle[MarketData.TIME.value])
+        self._candle_time = time
+        if live[MarketData.OPEN.value]:
+            self.update(
+                live[MarketData.CLOSE.value],
+                live[MarketData.HIGH.value],
+                live[MarketData.LOW.value],
+                time,
+            )
+
+    def _closed_since(self, candles: np.ndarray) -> np.ndarray:
+        """_closed_since.
+        closed candles from the last live one on, the candles without a time in
+        between are kept so the empty ones are committed too
+        """
+        times = candles[:, MarketData.TIME.value]
+        last = np.flatnonzero(times == self._candle_time)
+        if len(last):
+            return candles[last[-1] :]
+        # the last live candle has left the window
+        later = np.flatnonzero(times > self._candle_time)
+        return candles[later[0] :] if len(later) else candles[:0]
+
+    def _prices(self, candle: np.ndarray) -> Optional[Tuple[float, float, float]]:
+        """_prices.
+        close, high and low of a closed candle, None before the first trade
+        """
+        if candle[MarketData.OPEN.value]:
+            return (
+                candle[MarketData.CLOSE.value],
+                candle[MarketData.HIGH.value],
+                candle[MarketData.LOW.value],
+            )
+        if math.isnan(self._last_close):
+            return None
+        # nothing traded in the candle, it is flat at the previous close
+        return self._last_close, self._last_close, self._last_close
+
+    def _push(self, close: float, high: float, low: float) -> None:
+        for rsi in self._rsi.values():
+            rsi.push(close)
+        for atr in self._atr.values():
+            atr.push(high, low, close)
+        self._hma.push(close)
+        self._last_close = close
@@ -0,0 +1,31 @@
+import math
+
+
+class WilderAverage:
+    """WilderAverage.
+    Wilder smoothed moving average, seeded with the simple average of the first
+    `period` values. `peek` gives the average including a live value without
+    committing it, `push` commits a closed value.
+    """
+
+    def __init__(self, period: int) -> None:
+        if period <= 0:
+            raise ValueError("period must be greater than 0")
+        self.period = period
+        self.count = 0
+        self.value = math.nan
+        self._sum = 0.0
+
+    def peek(self, x: float) -> float:
+        if self.count + 1 < self.period:
+            return math.nan
+        if self.count + 1 == self.period:
+            return (self._sum + x) / self.period
+        return (self.value * (self.period - 1) + x) / self.period
+
+    def push(self, x: float) -> float:
+        self.value = self.peek(x)
+        self.count += 1
+        if self.count < self.period:
+            self._sum += x
+        return self.value
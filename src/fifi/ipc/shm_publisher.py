@@ -0,0 +1,88 @@
+import logging
+import orjson
+import numpy as np
+import numpy.typing as npt
+from typing import Dict, Optional, Union
+
+from ..helpers.get_logger import LoggerFactory
+from .shm_queue import SHMQueue, queue_name
+
+LOGGER = LoggerFactory().get(__name__)
+
+
+class SHMPublisher:
+    """SHMPublisher.
+    publisher with the surface of RedisPublisher on a shared memory queue, for
+    engines on the same host. the publisher writes into its own lane of the
+    queue so many publishers can share a channel without locks.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        record_dtype: Optional[npt.DTypeLike] = None,
+        lanes: int = 8,
+        capacity: int = 1024 * 1024,
+    ):
+        """__init__.
+
+        Args:
+            channel (str): channel name
+            record_dtype (Optional[npt.DTypeLike]): publishes fixed size records of
+                this dtype instead of json messages
+            lanes (int): number of publishers of the channel, if the queue is created here
+            capacity (int): bytes of every lane, if the queue is created here
+        """
+        self.channel = channel
+        self.queue = SHMQueue(
+            queue_name(channel),
+            lanes=lanes,
+            capacity=capacity,
+            record_dtype=record_dtype,
+        )
+        self.lane = self.queue.claim_lane()
+        # messages which didn't fit in the lane
+        self.dropped = 0
+
+    @classmethod
+    async def create(cls, channel: str, **kwargs):
+        """create.
+        same as the constructor, it mirrors RedisPublisher.create
+
+        Args:
+            channel (str): channel
+        """
+        return cls(channel, **kwargs)
+
+    async def publish(self, message: Optional[Union[Dict, bytes, np.ndarray]]) -> bool:
+        """publish.
+        sending a message on the channel, it never blocks. a message which doesn't
+        fit in the lane because the subscriber is behind is dropped and counted
+        in dropped.
+
+        Args:
+            message (Optional[Union[Dict, bytes, np.ndarray]]): dict or encoded
+                json, records in record mode
+
+        Returns:
+            bool: False if the message is dropped
+        """
+        if self.queue._records is not None:
+            records = np.asarray(message, dtype=self.queue._record_dtype).reshape(-1)
+            published = self.queue.push_records(self.lane, records) == len(records)
+        else:
+            if type(message) == dict:
+                message = orjson.dumps(message)
+            published = self.queue.push(self.lane, message)  # type: ignore
+        if not published:
+            self.dropped += 1
+            # a slow subscriber makes every publish drop, so it isn't an error each time
+            if LOGGER.isEnabledFor(logging.DEBUG):
+                LOGGER.debug(
+                    f"[Publisher-SHM] {self.channel} is full, {self.dropped} messages are dropped"
+                )
+        return published
+
+    def close(self) -> None:
+        self.queue.release_lane(self.lane)
+        self.queue.close()
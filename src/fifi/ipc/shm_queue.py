@@ -0,0 +1,331 @@
+import fcntl
+import os
+import struct
+import time
+import numpy as np
+import numpy.typing as npt
+from typing import List, Optional, Union
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.resource_tracker import unregister
+
+from ..exceptions import SHMLayoutException
+from ..helpers.futex import Futex
+from ..helpers.get_logger import LoggerFactory
+from ..helpers.process import pid_alive
+
+QUEUE_MAGIC = int.from_bytes(b"FIFIQUE\0", "little")
+QUEUE_VERSION = 1
+# magic, version, lanes, capacity, record size, notify, waiters
+QUEUE_HEADER_SIZE = 128
+MAGIC, VERSION, LANES, CAPACITY, RECORD_SIZE, NOTIFY, WAITERS = range(7)
+# every lane starts with its own cache line: head, tail, owner pid
+LANE_HEADER_SIZE = 64
+HEAD, TAIL, OWNER = range(3)
+# frames of the byte mode are a 4 bytes length and the payload, 8 bytes aligned
+FRAME_ALIGNMENT = 8
+SKIP = 0xFFFFFFFF
+# longest single sleep of a waiting consumer
+WAIT_SLICE = 0.1
+# how long an attaching side waits for the creator to finish the header
+ATTACH_TIMEOUT = 1.0
+
+
+def queue_name(channel: str) -> str:
+    return "fifi_queue_" + channel.replace("/", "_")
+
+
+class SHMQueue:
+    """SHMQueue.
+    lock-free multi producer single consumer queue in one shared memory segment.
+    every producer claims its own lane, a single producer single consumer ring
+    where only the producer moves the head and only the consumer moves the tail,
+    so neither side ever takes a lock on the hot path. messages of a producer
+    keep their order, messages of different producers are not ordered.
+
+    the queue carries either length prefixed byte messages or fixed size records
+    of a numpy dtype. the first side to open the queue creates it, the other
+    side takes the layout from the header.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        lanes: int = 8,
+        capacity: int = 1024 * 1024,
+        record_dtype: Optional[npt.DTypeLike] = None,
+        owner: bool = False,
+    ) -> None:
+        """__init__.
+
+        Args:
+            name (str): shared memory segment name
+            lanes (int): number of producer lanes, only used by the creator
+            capacity (int): bytes of every lane, only used by the creator
+            record_dtype (Optional[npt.DTypeLike]): fixed size records instead of
+                byte messages, both sides have to pass the same dtype
+            owner (bool): the consumer owns the segment and unlinks it on close,
+                producers leave it alone
+        """
+        self._name = name
+        self.LOGGER = LoggerFactory().get(self._name)
+        self._owner = owner
+        self._record_dtype = None if record_dtype is None else np.dtype(record_dtype)
+        record_size = 0 if self._record_dtype is None else self._record_dtype.itemsize
+        # lanes are whole records and whole cache lines
+        unit = np.lcm(record_size or FRAME_ALIGNMENT, LANE_HEADER_SIZE)
+        capacity = max(capacity // unit, 1) * unit
+        try:
+            self._sm = SharedMemory(
+                name=name,
+                create=True,
+                size=QUEUE_HEADER_SIZE + lanes * (LANE_HEADER_SIZE + capacity),
+            )
+            created = True
+        except FileExistsError:
+            self._attach()
+            created = False
+        if not owner:
+            # the segment outlives the producers
+            unregister(self._sm._name, "shared_memory")  # type: ignore
+
+        self._header = np.ndarray(shape=(16,), dtype=np.int64, buffer=self._sm.buf)
+        if created:
+            self._header[VERSION] = QUEUE_VERSION
+            self._header[LANES] = lanes
+            self._header[CAPACITY] = capacity
+            self._header[RECORD_SIZE] = record_size
+            # magic goes last, the queue is ready to attach from now on
+            self._header[MAGIC] = QUEUE_MAGIC
+        else:
+            self._read_header(record_size)
+        self._lanes = int(self._header[LANES])
+        self._capacity = int(self._header[CAPACITY])
+        self._futex = Futex(self._header.ctypes.data + NOTIFY * 8)
+
+        stride = LANE_HEADER_SIZE + self._capacity
+        self._lane_headers = [
+            np.ndarray(
+                shape=(8,),
+                dtype=np.int64,
+                buffer=self._sm.buf,
+                offset=QUEUE_HEADER_SIZE + lane * stride,
+            )
+            for lane in range(self._lanes)
+        ]
+        # offsets of the lane rings in the segment
+        self._lane_offsets = [
+            QUEUE_HEADER_SIZE + lane * stride + LANE_HEADER_SIZE
+            for lane in range(self._lanes)
+        ]
+        self._records = None
+        if self._record_dtype is not None:
+            self._records = [
+                np.ndarray(
+                    shape=(self._capacity // record_size,),
+                    dtype=self._record_dtype,
+                    buffer=self._sm.buf,
+                    offset=offset,
+                )
+                for offset in self._lane_offsets
+            ]
+
+    def _attach(self) -> None:
+        deadline = time.monotonic() + ATTACH_TIMEOUT
+        while True:
+            try:
+                self._sm = SharedMemory(name=self._name)
+                return
+            except ValueError:
+                # the creator hasn't sized the segment yet
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.001)
+
+    def _read_header(self, record_size: int) -> None:
+        deadline = time.monotonic() + ATTACH_TIMEOUT
+        while self._header[MAGIC] != QUEUE_MAGIC:
+            if time.monotonic() > deadline:
+                raise SHMLayoutException(f"{self._name}: segment has no queue header")
+            time.sleep(0.001)
+        if self._header[VERSION] != QUEUE_VERSION:
+            raise SHMLayoutException(
+                f"{self._name}: queue version {self._header[VERSION]} is not supported"
+            )
+        if self._header[RECORD_SIZE] != record_size:
+            raise SHMLayoutException(
+                f"{self._name}: queue carries records of {self._header[RECORD_SIZE]} bytes, expected {record_size}"
+            )
+
+    @property
+    def lanes(self) -> int:
+        return self._lanes
+
+    def claim_lane(self) -> int:
+        """claim_lane.
+        takes a free lane for this producer, lanes of dead producers are free.
+        claiming is rare so it's serialized by a lock on the segment.
+
+        Raises:
+            SHMLayoutException: every lane is taken
+        """
+        pid = os.getpid()
+        fcntl.flock(self._sm._fd, fcntl.LOCK_EX)  # type: ignore
+        try:
+            for lane, header in enumerate(self._lane_headers):
+                owner = int(header[OWNER])
+                if not owner or not pid_alive(owner):
+                    header[OWNER] = pid
+                    return lane
+        finally:
+            fcntl.flock(self._sm._fd, fcntl.LOCK_UN)  # type: ignore
+        raise SHMLayoutException(f"{self._name}: all {self._lanes} lanes are taken")
+
+    def release_lane(self, lane: int) -> None:
+        # messages left in the lane are still consumed
+        self._lane_headers[lane][OWNER] = 0
+
+    def push(self, lane: int, payload: bytes) -> bool:
+        """push.
+        writes a byte message into the lane of this producer
+
+        Returns:
+            bool: False if the lane is full and the message is dropped
+        """
+        header = self._lane_headers[lane]
+        head = int(header[HEAD])
+        frame = -(-(4 + len(payload)) // FRAME_ALIGNMENT) * FRAME_ALIGNMENT
+        if frame > self._capacity:
+            raise ValueError(
+                f"{self._name}: message of {len(payload)} bytes doesn't fit in a lane"
+            )
+        position = head % self._capacity
+        to_end = self._capacity - position
+        # a frame never wraps, the rest of the ring is skipped instead
+        needed = frame if frame <= to_end else to_end + frame
+        if head - int(header[TAIL]) + needed > self._capacity:
+            return False
+        offset = self._lane_offsets[lane]
+        if frame > to_end:
+            struct.pack_into("<I", self._sm.buf, offset + position, SKIP)
+            head += to_end
+            position = 0
+        start = offset + position
+        struct.pack_into("<I", self._sm.buf, start, len(payload))
+        self._sm.buf[start + 4 : start + 4 + len(payload)] = payload
+        # publishing the head makes the message visible to the consumer
+        header[HEAD] = head + frame
+        self.notify()
+        return True
+
+    def push_records(self, lane: int, records: np.ndarray) -> int:
+        """push_records.
+        writes records into the lane of this producer in at most two copies
+
+        Returns:
+            int: number of records written, the rest doesn't fit and is dropped
+        """
+        ring = self._records[lane]  # type: ignore
+        header = self._lane_headers[lane]
+        head = int(header[HEAD])
+        count = min(len(records), len(ring) - (head - int(header[TAIL])))
+        if count <= 0:
+            return 0
+        position = head % len(ring)
+        split = min(count, len(ring) - position)
+        ring[position : position + split] = records[:split]
+        ring[: count - split] = records[split:count]
+        header[HEAD] = head + count
+        self.notify()
+        return count
+
+    def notify(self) -> None:
+        # a lost increment of two racing producers still changes the word
+        self._header[NOTIFY] += 1
+        # the waiters slot counts the sleeping consumers, only they change it
+        if self._header[WAITERS]:
+            self._futex.wake()
+
+    def pop(self) -> Union[List[bytes], np.ndarray]:
+        """pop.
+        takes every pending message of every lane
+
+        Returns:
+            Union[List[bytes], np.ndarray]: byte messages, or a copy of the records
+                in record mode
+        """
+        if self._records is not None:
+            return self._pop_records()
+        messages = []
+        buf = self._sm.buf
+        for header, offset in zip(self._lane_headers, self._lane_offsets):
+            head = int(header[HEAD])
+            tail = int(header[TAIL])
+            if tail == head:
+                continue
+            while tail < head:
+                position = tail % self._capacity
+                (length,) = struct.unpack_from("<I", buf, offset + position)
+                if length == SKIP:
+                    tail += self._capacity - position
+                    continue
+                start = offset + position + 4
+                messages.append(bytes(buf[start : start + length]))
+                tail += -(-(4 + length) // FRAME_ALIGNMENT) * FRAME_ALIGNMENT
+            # releasing the space to the producer
+            header[TAIL] = tail
+        return messages
+
+    def _pop_records(self) -> np.ndarray:
+        batches = [np.empty(0, dtype=self._record_dtype)]
+        for header, ring in zip(self._lane_headers, self._records):  # type: ignore
+            head = int(header[HEAD])
+            tail = int(header[TAIL])
+            count = head - tail
+            if not count:
+                continue
+            position = tail % len(ring)
+            split = min(count, len(ring) - position)
+            # copied before the space is released to the producer
+            batches.append(
+                np.concatenate(
+                    (ring[position : position + split], ring[: count - split])
+                )
+            )
+            header[TAIL] = head
+        return np.concatenate(batches)
+
+    def pending(self) -> bool:
+        return any(header[HEAD] != header[TAIL] for header in self._lane_headers)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """wait.
+        blocks until a lane has pending messages
+
+        Args:
+            timeout (Optional[float]): timeout in seconds, None waits forever
+
+        Returns:
+            bool: True if there are pending messages, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            # the word is read before the lanes so a message in between wakes us up
+            expected = int(self._header[NOTIFY])
+            if self.pending():
+                return True
+            wait = WAIT_SLICE
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            self._header[WAITERS] += 1
+            try:
+                self._futex.wait(expected, wait)
+            finally:
+                self._header[WAITERS] -= 1
+
+    def close(self) -> None:
+        self._sm.close()
+        if self._owner:
+            self._sm.unlink()
@@ -0,0 +1,133 @@
+import asyncio
+import orjson
+import numpy as np
+import numpy.typing as npt
+from typing import Dict, List, Optional, Union
+
+from ..helpers.futex import wait_executor
+from ..helpers.get_logger import LoggerFactory
+from .shm_queue import WAIT_SLICE, SHMQueue, queue_name
+
+LOGGER = LoggerFactory().get(__name__)
+
+
+class SHMSubscriber:
+    """SHMSubscriber.
+    subscriber with the surface of RedisSubscriber on a shared memory queue, the
+    single consumer of the channel. there is no listener thread, messages wait
+    in the queue until they are taken.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        record_dtype: Optional[npt.DTypeLike] = None,
+        raw: bool = False,
+        lanes: int = 8,
+        capacity: int = 1024 * 1024,
+    ):
+        """__init__.
+
+        Args:
+            channel (str): channel
+            record_dtype (Optional[npt.DTypeLike]): receives fixed size records of
+                this dtype instead of json messages
+            raw (bool): byte messages are returned as they are instead of decoded json
+            lanes (int): number of publishers of the channel, if the queue is created here
+            capacity (int): bytes of every lane, if the queue is created here
+        """
+        self.channel = channel
+        self.raw = raw
+        self.queue = SHMQueue(
+            queue_name(channel),
+            lanes=lanes,
+            capacity=capacity,
+            record_dtype=record_dtype,
+            owner=True,
+        )
+
+    @classmethod
+    async def create(cls, channel: str, **kwargs):
+        """create.
+        same as the constructor, it mirrors RedisSubscriber.create
+
+        Args:
+            channel (str): channel
+        """
+        return cls(channel, **kwargs)
+
+    def close(self) -> None:
+        self.queue.close()
+
+    def _take(self) -> Union[List, np.ndarray]:
+        messages = self.queue.pop()
+        if self.raw or isinstance(messages, np.ndarray):
+            return messages
+        result = []
+        for message in messages:
+            try:
+                result.append(orjson.loads(message))
+            except orjson.JSONDecodeError as ex:
+                LOGGER.debug(f"[Subscriber-SHM] Failed to decode message: {str(ex)}")
+        return result
+
+    async def get_messages(self) -> Union[List, np.ndarray]:
+        """get_messages.
+
+        Returns:
+            Union[List, np.ndarray]: messages waiting in the queue, records in record mode
+        """
+        return self._take()
+
+    async def get_last_message(self) -> Optional[Union[Dict, np.void]]:
+        """get_last_message.
+
+        Returns:
+            Optional[Union[Dict, np.void]]: the last message in the queue, the rest
+                is dropped
+        """
+        messages = self._take()
+        if not len(messages):
+            LOGGER.debug(
+                f"[Subscriber-SHM] there is no messages on the {self.channel} channel"
+            )
+            return None
+        return messages[-1]
+
+    def wait_for_messages(
+        self, timeout: Optional[float] = None
+    ) -> Union[List, np.ndarray]:
+        """wait_for_messages.
+        blocks until there are messages in the queue and takes them
+
+        Args:
+            timeout (Optional[float]): timeout in seconds, None waits forever
+
+        Returns:
+            Union[List, np.ndarray]: messages, empty on timeout
+        """
+        self.queue.wait(timeout)
+        return self._take()
+
+    async def receive(self, timeout: Optional[float] = None) -> Union[List, np.ndarray]:
+        """receive.
+        asyncio version of wait_for_messages, the blocking wait runs in slices on
+        the shared futex wait executor so a cancelled receive doesn't hold a thread
+        for long.
+
+        Args:
+            timeout (Optional[float]): timeout in seconds, None waits forever
+
+        Returns:
+            Union[List, np.ndarray]: messages, empty on timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            wait = WAIT_SLICE
+            if deadline is not None:
+                wait = min(wait, max(deadline - loop.time(), 0))
+            if await loop.run_in_executor(wait_executor(), self.queue.wait, wait):
+                return self._take()
+            if deadline is not None and loop.time() >= deadline:
+                return self._take()
@@ -0,0 +1,115 @@
+import itertools
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from ..enums import OverflowPolicy
+
+# tags the running numbers of keyless messages apart from the message keys
+_SEQ = object()
+
+
+class MessageBuffer:
+    """MessageBuffer.
+    bounded fifo of the messages of a subscriber with an overflow policy and
+    counters for received, dropped and the high-water mark. it isn't thread safe,
+    the subscriber guards it.
+    """
+
+    def __init__(
+        self,
+        maxlen: Optional[int] = None,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        key: Optional[Callable[[Any], Optional[Hashable]]] = None,
+    ) -> None:
+        """__init__.
+
+        Args:
+            maxlen (Optional[int]): capacity, None for an unbounded buffer
+            overflow (OverflowPolicy): what happens to a message on a full buffer
+            key (Optional[Callable[[Any], Optional[Hashable]]]): key of a message for
+                KEEP_LATEST, messages with a None key are never replaced
+        """
+        overflow = OverflowPolicy(overflow)
+        if overflow is OverflowPolicy.KEEP_LATEST and key is None:
+            raise ValueError("keep_latest needs a key for the messages")
+        if maxlen is not None and maxlen < 1:
+            raise ValueError(f"{maxlen}: capacity of the buffer should be positive")
+        self.maxlen = maxlen
+        self.overflow = overflow
+        self.key = key
+        # entries are keyed by the message key or a tagged running number, so
+        # eviction and replacement are both O(1)
+        self._items: OrderedDict = OrderedDict()
+        self._ids = itertools.count()
+        self.received = 0
+        self.dropped = 0
+        self.high_water_mark = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def full(self) -> bool:
+        return self.maxlen is not None and len(self._items) >= self.maxlen
+
+    def blocked(self) -> bool:
+        """blocked.
+        the producer has to wait for the consumer before the next put
+        """
+        return self.overflow is OverflowPolicy.BLOCK and self.full()
+
+    def put(self, message: Any) -> bool:
+        """put.
+
+        Returns:
+            bool: the message is buffered
+        """
+        self.received += 1
+        key = None
+        if self.overflow is OverflowPolicy.KEEP_LATEST:
+            key = self.key(message)  # type: ignore
+            if key is not None and key in self._items:
+                # the stale message is superseded, not evicted
+                self._items[key] = message
+                self._items.move_to_end(key)
+                self.dropped += 1
+                return True
+        if self.full():
+            if self.overflow is OverflowPolicy.DROP_NEWEST:
+                self.dropped += 1
+                return False
+            # drop_oldest and keep_latest evict, a blocked producer shouldn't get here
+            self._items.popitem(last=False)
+            self.dropped += 1
+        self._items[(_SEQ, next(self._ids)) if key is None else key] = message
+        self.high_water_mark = max(self.high_water_mark, len(self._items))
+        return True
+
+    def popleft(self) -> Any:
+        return self._items.popitem(last=False)[1]
+
+    def take(self, predicate: Optional[Callable[[Any], bool]] = None) -> List:
+        """take.
+        removes the buffered messages in order
+
+        Args:
+            predicate (Optional[Callable[[Any], bool]]): only the matching messages
+                are taken, the rest are kept in order
+        """
+        if predicate is None:
+            result = list(self._items.values())
+            self._items.clear()
+            return result
+        result = []
+        for key, message in list(self._items.items()):
+            if predicate(message):
+                result.append(message)
+                del self._items[key]
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "received": self.received,
+            "dropped": self.dropped,
+            "buffered": len(self._items),
+            "high_water_mark": self.high_water_mark,
+        }
@@ -1,7 +1,10 @@
+import asyncio
+import logging
+import time
 import orjson
 import traceback
-from typing import Dict, Optional
-from redis import PubSubError
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+from redis.exceptions import RedisError
 
 from ..helpers.get_logger import LoggerFactory
 from .redis_client import RedisClient
@@ -12,46 +15,269 @@ LOGGER = LoggerFactory().get()
 class RedisPublisher:
     """RedisPublisher.
     This class manages our publisher on the redis for sending messages to the consumers
+
+    with batch_size or batch_window the publisher collects the messages of a tick,
+    on any channel, and sends them in one pipeline when the batch is full or the
+    window elapses. close flushes what is left.
+
+    with conflate_by the publisher sends state, e.g. last prices or the current
+    candle, at most once per key and conflate_interval. the first message of a
+    key goes out at once, the later ones of the interval replace each other and
+    only the latest is sent when the interval ends.
     """
 
-    def __init__(self, redis_client: RedisClient, channel: str):
+    def __init__(
+        self,
+        redis_client: RedisClient,
+        channel: str,
+        batch_size: Optional[int] = None,
+        batch_window: Optional[float] = None,
+        conflate_by: Optional[Union[str, Sequence[str]]] = None,
+        conflate_interval: Optional[float] = None,
+    ):
         """__init__.
 
         Args:
             redis_client (RedisClient): redis_client
             channel (str): channel name
+            batch_size (Optional[int]): flushes the batch at this number of messages
+            batch_window (Optional[float]): flushes the batch this many seconds
+                after its first message
+            conflate_by (Optional[Union[str, Sequence[str]]]): message fields of the
+                conflation key, e.g. ("market", "timeframe", "type"). messages
+                with none of the fields are never conflated.
+            conflate_interval (Optional[float]): seconds between two messages of a key
         """
 
         self.redis_client = redis_client
         self.redis = self.redis_client.redis
         self.channel = channel
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.batching = batch_size is not None or batch_window is not None
+        if (conflate_by is None) != (conflate_interval is None):
+            raise ValueError("conflation needs both conflate_by and conflate_interval")
+        self.conflate_by: Tuple[str, ...] = (
+            (conflate_by,) if isinstance(conflate_by, str) else tuple(conflate_by or ())
+        )
+        self.conflate_interval = conflate_interval
+        # latest unsent message and the time of the last sent one, per key
+        self._pending: Dict[Tuple, Tuple[str, Optional[Dict]]] = {}
+        self._sent_at: Dict[Tuple, float] = {}
+        self._pending_timers: Dict[Tuple, asyncio.TimerHandle] = {}
+        self._batch: List[Tuple[str, Any]] = []
+        self._batch_started = 0.0
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        # sends started by the timers, referenced until they are done
+        self._flushes: Set[asyncio.Task] = set()
+        # one send at a time, the pool would otherwise reorder the batches
+        self._send_lock = asyncio.Lock()
+        self.messages = 0
+        self.batches = 0
+        self.max_batch_size = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.max_delay = 0.0
+        self.conflated = 0
 
     @classmethod
-    async def create(cls, channel: str):
+    async def create(
+        cls,
+        channel: str,
+        batch_size: Optional[int] = None,
+        batch_window: Optional[float] = None,
+        conflate_by: Optional[Union[str, Sequence[str]]] = None,
+        conflate_interval: Optional[float] = None,
+    ):
         """create.
         this method create an instance of redis client and also the connection to the redis
 
         Args:
             channel (str): channel
+            batch_size (Optional[int]): messages of a batch
+            batch_window (Optional[float]): seconds of a batch
+            conflate_by (Optional[Union[str, Sequence[str]]]): fields of the conflation key
+            conflate_interval (Optional[float]): seconds between two messages of a key
         """
         redis_client = await RedisClient.create()
-        return cls(redis_client, channel)
+        return cls(
+            redis_client,
+            channel,
+            batch_size,
+            batch_window,
+            conflate_by,
+            conflate_interval,
+        )
+
+    @staticmethod
+    def _encode(message: Optional[Dict]) -> Any:
+        if type(message) == dict:
+            return orjson.dumps(message)
+        return message
 
-    async def publish(self, message: Optional[Dict]):
+    async def publish(self, message: Optional[Dict], channel: Optional[str] = None):
         """publish.
-        sending a message on the redis channel.
+        sending a message on the redis channel, in batching mode the message is
+        queued for the next flush. in conflation mode it may be held back and
+        replaced by a newer message of its key.
 
         Args:
             message (Optional[Dict]): message
+            channel (Optional[str]): channel, the channel of the publisher by default
+
+        Raises:
+            RedisError: the message, or the batch it filled, couldn't be sent. the
+                sends of the timers log their errors instead.
         """
-        publish_message = message
-        if type(message) == dict:
-            publish_message = orjson.dumps(message)
+        channel = channel or self.channel
+        key = self._conflation_key(channel, message)
+        if key is not None:
+            now = time.monotonic()
+            if key in self._pending:
+                # the held message is stale, the timer sends the latest one
+                self.conflated += 1
+                self._pending[key] = (channel, message)
+                return
+            sent_at = self._sent_at.get(key)
+            if sent_at is not None and now - sent_at < self.conflate_interval:  # type: ignore
+                self._pending[key] = (channel, message)
+                self._pending_timers[key] = asyncio.get_running_loop().call_later(
+                    sent_at + self.conflate_interval - now, self._send_pending, key  # type: ignore
+                )
+                return
+            self._sent_at[key] = now
+        await self._publish((channel, self._encode(message)))
+
+    def _conflation_key(self, channel: str, message: Optional[Dict]) -> Optional[Tuple]:
+        if not self.conflate_by or type(message) != dict:
+            return None
+        values = tuple(message.get(field) for field in self.conflate_by)  # type: ignore
+        if all(value is None for value in values):
+            return None
+        return (channel, *values)
+
+    def _send_pending(self, key: Tuple) -> None:
+        self._pending_timers.pop(key, None)
+        channel, message = self._pending.pop(key)
+        self._sent_at[key] = time.monotonic()
+        self._in_background(self._publish((channel, self._encode(message))))
+
+    def _in_background(self, coroutine) -> None:
+        task = asyncio.get_running_loop().create_task(self._logging_errors(coroutine))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    @staticmethod
+    async def _logging_errors(coroutine) -> None:
         try:
-            await self.redis.publish(self.channel, publish_message)
+            await coroutine
+        except RedisError:
+            # the timers have nobody to raise to
+            error_message = traceback.format_exc()
+            LOGGER.error(
+                f"[Publisher-Redis] redis error, the messages are lost: {error_message}"
+            )
+
+    async def _publish(self, item: Tuple[str, Any]):
+        if not self.batching:
+            await self._send([item])
+            return
+        if not self._batch:
+            self._batch_started = time.perf_counter()
+            if self.batch_window is not None:
+                self._flush_timer = asyncio.get_running_loop().call_later(
+                    self.batch_window, self._flush_later
+                )
+        self._batch.append(item)
+        if self.batch_size is not None and len(self._batch) >= self.batch_size:
+            await self.flush()
+
+    async def publish_many(
+        self, messages: Iterable[Optional[Dict]], channel: Optional[str] = None
+    ):
+        """publish_many.
+        sends messages in one pipeline, one round trip to redis. they aren't
+        conflated.
+
+        Args:
+            messages (Iterable[Optional[Dict]]): messages
+            channel (Optional[str]): channel, the channel of the publisher by default
+        """
+        channel = channel or self.channel
+        await self._send([(channel, self._encode(message)) for message in messages])
+
+    def _flush_later(self) -> None:
+        self._in_background(self.flush())
+
+    async def flush(self):
+        """flush.
+        sends the queued messages of the batching mode
+        """
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        self.max_delay = max(self.max_delay, time.perf_counter() - self._batch_started)
+        await self._send(batch)
+
+    async def _send(self, items: List[Tuple[str, Any]]):
+        if not items:
+            return
+        async with self._send_lock:
+            start = time.perf_counter()
+            if len(items) == 1:
+                await self.redis.publish(*items[0])
+            else:
+                async with self.redis.pipeline(transaction=False) as pipe:
+                    for channel, payload in items:
+                        pipe.publish(channel, payload)
+                    await pipe.execute()
+            latency = time.perf_counter() - start
+        self.messages += len(items)
+        self.batches += 1
+        self.max_batch_size = max(self.max_batch_size, len(items))
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        # the message is only formatted when somebody reads it
+        if LOGGER.isEnabledFor(logging.DEBUG):
             LOGGER.debug(
-                f"[Publisher-Redis]: published this data: {publish_message} on this channel: {self.channel}"
+                f"[Publisher-Redis]: published {len(items)} messages in {latency:.6f}s, "
+                f"the last one: {items[-1][1]} on this channel: {items[-1][0]}"
             )
-        except PubSubError:
-            error_message = traceback.format_exc()
-            LOGGER.error(f"[Publisher-Redis] pubsub error: {error_message}")
+
+    def get_stats(self) -> Dict[str, float]:
+        """get_stats.
+        latencies are round trips of redis in seconds, max_delay is the longest
+        time a message waited in a batch before its flush
+
+        Returns:
+            Dict[str, float]: messages, batches, batch sizes and latencies
+        """
+        return {
+            "messages": self.messages,
+            "batches": self.batches,
+            "queued": len(self._batch),
+            "mean_batch_size": self.messages / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_size,
+            "mean_latency": self.total_latency / self.batches if self.batches else 0.0,
+            "max_latency": self.max_latency,
+            "max_delay": self.max_delay,
+            "conflated": self.conflated,
+            "held": len(self._pending),
+        }
+
+    async def close(self):
+        """close.
+        sends the held and queued messages and closes the connection
+        """
+        for key in list(self._pending):
+            self._pending_timers[key].cancel()
+            self._send_pending(key)
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        await self.redis_client.close()
@@ -2,9 +2,12 @@ import asyncio
 import threading
 import orjson
 from redis import exceptions as redis_exceptions
-from typing import Dict, List, Optional
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
+from ..enums import OverflowPolicy
 from ..helpers.get_logger import LoggerFactory
+from .message_buffer import MessageBuffer
 from .redis_client import RedisClient
 from ..decorator.log_exception import log_exception
 
@@ -13,41 +16,137 @@ LOGGER = LoggerFactory().get(__name__)
 
 class RedisSubscriber:
     """RedisSubscriber.
-    this class is subscriber class in terms of getting messages on a channel
+    this class is subscriber class in terms of getting messages on channels.
+    every channel and glob pattern of a subscriber shares one pubsub connection
+    and one thread, messages are buffered per channel.
+
+    buffers are unbounded unless max_messages is given, a bounded buffer applies
+    its overflow policy when the consumer falls behind, see get_stats.
     """
 
-    def __init__(self, redis_client: RedisClient, channel: str):
+    def __init__(
+        self,
+        redis_client: RedisClient,
+        channel: Optional[str] = None,
+        channels: Iterable[str] = (),
+        patterns: Iterable[str] = (),
+        threaded: bool = True,
+        max_messages: Optional[int] = None,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        key: Optional[str] = None,
+    ):
         """__init__.
-        in constructor method, it creates a task for subscriber in terms of subscribe a channel
-        and try to listen to the channel and get messages
+        in constructor method, it creates a task for subscriber in terms of subscribe the channels
+        and try to listen to the channels and get messages
 
         Args:
             redis_client (RedisClient): redis_client
-            channel (str): channel
+            channel (Optional[str]): default channel of get_messages and get_last_message
+            channels (Iterable[str]): more channels
+            patterns (Iterable[str]): glob patterns of channels, messages are buffered
+                under the channel they are published on
+            threaded (bool): listens in a thread of its own. otherwise the subscriber
+                runs on the running loop of the caller and delivers messages through
+                an asyncio queue, see next and `async for`. it has to be created
+                in a coroutine then.
+            max_messages (Optional[int]): capacity of the buffer of every channel,
+                in the asyncio mode of the single queue of the subscriber
+            overflow (OverflowPolicy): policy of a full buffer. BLOCK stops reading
+                the connection until the consumer catches up, redis disconnects
+                a subscriber which stays behind its client-output-buffer-limit.
+            key (Optional[str]): message field of KEEP_LATEST, a new message replaces
+                the buffered one with the same value of the field
         """
         self.redis_client = redis_client
         self.redis = self.redis_client.redis
         self.pubsub = self.redis.pubsub()
         self.channel = channel
+        self.channels: Set[str] = set(channels)
+        if channel is not None:
+            self.channels.add(channel)
+        self.patterns: Set[str] = set(patterns)
+        self.max_messages = max_messages
+        self.overflow = OverflowPolicy(overflow)
+        self.key = key
+        if self.overflow is OverflowPolicy.KEEP_LATEST and key is None:
+            raise ValueError("keep_latest needs the key field of the messages")
         self.messages_lock = threading.Lock()
-        self.messages = list()
-        # create task for getting messages on the channel
+        # wakes a blocked listener when the consumer takes messages
+        self.not_full = threading.Condition(self.messages_lock)
+        self.messages: Dict[str, MessageBuffer] = defaultdict(self._buffer)
+        self.closed = False
+        # set by the subscribe commands while there is nothing to listen to
+        self.changed = asyncio.Event()
+        self.threaded = threaded
+        if not threaded:
+            self.loop = asyncio.get_running_loop()
+            # one queue of (channel, message) keeps the order across channels
+            self.queue = MessageBuffer(
+                max_messages,
+                self.overflow,
+                None if key is None else self._channel_key,
+            )
+            # set whenever the queue changes
+            self.updated = asyncio.Event()
+            self.thread = None
+            self.task = self.loop.create_task(self.subscriber())
+            return
+        self.loop = asyncio.new_event_loop()
+        # create task for getting messages on the channels
         self.thread = threading.Thread(target=self.start, daemon=True)
         self.thread.start()
 
     @classmethod
-    async def create(cls, channel: str):
+    async def create(
+        cls,
+        channel: Optional[str] = None,
+        channels: Iterable[str] = (),
+        patterns: Iterable[str] = (),
+        threaded: bool = True,
+        max_messages: Optional[int] = None,
+        overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        key: Optional[str] = None,
+    ):
         """create.
         create async method of redis client
 
         Args:
-            channel (str): channel
+            channel (Optional[str]): channel
+            channels (Iterable[str]): more channels
+            patterns (Iterable[str]): glob patterns of channels
+            threaded (bool): listens in a thread of its own, or on the running loop
+            max_messages (Optional[int]): capacity of the buffers
+            overflow (OverflowPolicy): policy of a full buffer
+            key (Optional[str]): message field of KEEP_LATEST
         """
         redis_client = await RedisClient.create()
-        return cls(redis_client, channel)
+        return cls(
+            redis_client,
+            channel,
+            channels,
+            patterns,
+            threaded,
+            max_messages,
+            overflow,
+            key,
+        )
+
+    def _key(self, message) -> Optional[object]:
+        return message.get(self.key) if isinstance(message, dict) else None
+
+    def _channel_key(self, item: Tuple[str, Dict]) -> Optional[Tuple]:
+        key = self._key(item[1])
+        return None if key is None else (item[0], key)
+
+    def _buffer(self) -> MessageBuffer:
+        return MessageBuffer(
+            self.max_messages,
+            self.overflow,
+            None if self.key is None else self._key,
+        )
 
     def start(self):
-        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
 
         self.loop.create_task(self.subscriber())
         try:
@@ -65,6 +164,15 @@ class RedisSubscriber:
         """close.
         cancel subscriber future task...
         """
+        self.closed = True
+        if not self.threaded:
+            self.task.cancel()
+            # ends the consumers waiting in next
+            self.updated.set()
+            return
+        with self.not_full:
+            # releases a blocked listener
+            self.not_full.notify_all()
         self.loop.call_soon_threadsafe(self.loop.stop)
         self.thread.join()
 
@@ -79,21 +187,20 @@ class RedisSubscriber:
         it puts on the message buffer.
         """
         while True:
-            await self.pubsub.subscribe(self.channel)
-            LOGGER.debug("[Subscriber-Redis] Waiting for messages...")
             try:
-                async for msg in self.pubsub.listen():
-                    try:
-                        LOGGER.debug(f"[Subscriber-Redis] Received: {msg}")
-                        if msg["type"] == "message":
-                            data = orjson.loads(msg["data"])
-                            with self.messages_lock:
-                                self.messages.append(data)
-                            LOGGER.debug(f"[Subscriber-Redis] Received: {data}")
-                    except orjson.JSONDecodeError as ex:
-                        LOGGER.debug(
-                            f"[Subscriber-Redis] Failed to decode message: {str(ex)}"
-                        )
+                if self.channels:
+                    await self.pubsub.subscribe(*self.channels)
+                if self.patterns:
+                    await self.pubsub.psubscribe(*self.patterns)
+                while True:
+                    if not self.pubsub.subscribed:
+                        # everything is unsubscribed, wait for a new subscription
+                        self.changed.clear()
+                        await self.changed.wait()
+                        continue
+                    LOGGER.debug("[Subscriber-Redis] Waiting for messages...")
+                    async for msg in self.pubsub.listen():
+                        await self.dispatch(msg)
             except asyncio.CancelledError:
                 LOGGER.error("Task cancelled, exiting gracefully.")
                 await self.close_materials()
@@ -116,33 +223,235 @@ class RedisSubscriber:
             self.redis = self.redis_client.redis
             self.pubsub = self.redis.pubsub()
 
-    async def get_messages(self) -> List:
+    async def dispatch(self, msg: Dict) -> None:
+        """dispatch.
+        puts a pubsub message on the buffer of its channel, with the BLOCK policy
+        it waits while the buffer is full
+        """
+        if msg["type"] not in ("message", "pmessage"):
+            return
+        try:
+            data = orjson.loads(msg["data"])
+        except orjson.JSONDecodeError as ex:
+            LOGGER.debug(f"[Subscriber-Redis] Failed to decode message: {str(ex)}")
+            return
+        if not self.threaded:
+            while self.queue.blocked():
+                self.updated.clear()
+                await self.updated.wait()
+            self.queue.put((msg["channel"], data))
+            self.updated.set()
+            return
+        with self.not_full:
+            buffer = self.messages[msg["channel"]]
+        # the wait runs off the loop, so the subscribe commands still get through
+        while not self._put(buffer, data):
+            if self.closed:
+                return
+            await self.loop.run_in_executor(None, self._wait_for_room, buffer)
+
+    def _put(self, buffer: MessageBuffer, data) -> bool:
+        with self.not_full:
+            if buffer.blocked():
+                return False
+            buffer.put(data)
+            return True
+
+    def _wait_for_room(self, buffer: MessageBuffer) -> None:
+        with self.not_full:
+            while buffer.blocked() and not self.closed:
+                self.not_full.wait()
+
+    async def _apply(self, command: Callable[[], Awaitable]) -> None:
+        """_apply.
+        runs a pubsub command on the loop of the subscriber thread
+        """
+
+        async def apply():
+            await command()
+            self.changed.set()
+
+        if not self.threaded:
+            await apply()
+            return
+        await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(apply(), self.loop))
+
+    async def subscribe(self, *channels: str) -> None:
+        """subscribe.
+        adds channels to the connection of the subscriber
+
+        Args:
+            channels (str): channels
+        """
+        self.channels.update(channels)
+        await self._apply(lambda: self.pubsub.subscribe(*channels))
+
+    async def unsubscribe(self, *channels: str) -> None:
+        """unsubscribe.
+        removes channels, messages which are already buffered are kept
+
+        Args:
+            channels (str): channels
+        """
+        self.channels.difference_update(channels)
+        await self._apply(lambda: self.pubsub.unsubscribe(*channels))
+
+    async def psubscribe(self, *patterns: str) -> None:
+        """psubscribe.
+        adds glob patterns of channels, e.g. "market_data_*"
+
+        Args:
+            patterns (str): patterns
+        """
+        self.patterns.update(patterns)
+        await self._apply(lambda: self.pubsub.psubscribe(*patterns))
+
+    async def punsubscribe(self, *patterns: str) -> None:
+        """punsubscribe.
+
+        Args:
+            patterns (str): patterns
+        """
+        self.patterns.difference_update(patterns)
+        await self._apply(lambda: self.pubsub.punsubscribe(*patterns))
+
+    def _take(self, channel: Optional[str]) -> List:
+        channel = channel or self.channel
+        if not self.threaded:
+            items = self.queue.take(
+                None if channel is None else lambda item: item[0] == channel
+            )
+            self.updated.set()
+            return [message for _, message in items]
+        with self.not_full:
+            if channel is None:
+                result = [
+                    message
+                    for buffer in self.messages.values()
+                    for message in buffer.take()
+                ]
+            else:
+                buffer = self.messages.get(channel)
+                result = buffer.take() if buffer is not None else []
+            self.not_full.notify_all()
+        return result
+
+    async def get_messages(self, channel: Optional[str] = None) -> List:
         """get_messages.
 
         Args:
+            channel (Optional[str]): channel, the default channel of the subscriber
+                if not given. without a default channel the messages of every channel
+                are returned channel by channel.
 
         Returns:
             List: list of messages on the buffer.
         """
-        with self.messages_lock:
-            result = self.messages[:]
-            self.messages.clear()
+        return self._take(channel)
+
+    async def next_with_channel(
+        self, timeout: Optional[float] = None
+    ) -> Tuple[str, Dict]:
+        """next_with_channel.
+        waits for the next message of the asyncio mode
+
+        Args:
+            timeout (Optional[float]): timeout in seconds, None waits forever
+
+        Raises:
+            asyncio.TimeoutError: no message in timeout
+            StopAsyncIteration: the subscriber is closed
+
+        Returns:
+            Tuple[str, Dict]: channel and message
+        """
+        if self.threaded:
+            raise RuntimeError("next is only available with threaded=False")
+        async with asyncio.timeout(timeout):
+            while not len(self.queue):
+                if self.closed:
+                    raise StopAsyncIteration
+                self.updated.clear()
+                await self.updated.wait()
+        item = self.queue.popleft()
+        # wakes a blocked listener
+        self.updated.set()
+        return item
+
+    async def next(self, timeout: Optional[float] = None) -> Dict:
+        """next.
+        waits for the next message of the asyncio mode, see next_with_channel
+        """
+        return (await self.next_with_channel(timeout))[1]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> Dict:
+        return await self.next()
+
+    async def get_all_messages(self) -> Dict[str, List]:
+        """get_all_messages.
+
+        Returns:
+            Dict[str, List]: messages on the buffers by channel
+        """
+        if not self.threaded:
+            result: Dict[str, List] = defaultdict(list)
+            for channel, message in self.queue.take():
+                result[channel].append(message)
+            self.updated.set()
+            return dict(result)
+        with self.not_full:
+            result = {
+                channel: buffer.take()
+                for channel, buffer in self.messages.items()
+                if len(buffer)
+            }
+            self.not_full.notify_all()
         return result
 
-    async def get_last_message(self) -> Optional[Dict]:
+    def get_stats(self, channel: Optional[str] = None) -> Dict[str, int]:
+        """get_stats.
+        counters of the buffers, received and dropped are summed over the channels
+        and the high-water mark is the fullest any single buffer has been
+
+        Args:
+            channel (Optional[str]): one channel, the asyncio mode only has the
+                counters of its single queue
+
+        Returns:
+            Dict[str, int]: received, dropped, buffered and high_water_mark
+        """
+        if not self.threaded:
+            return self.queue.stats()
+        with self.messages_lock:
+            if channel is not None:
+                buffer = self.messages.get(channel)
+                return (buffer if buffer is not None else self._buffer()).stats()
+            stats = [buffer.stats() for buffer in self.messages.values()]
+        return {
+            "received": sum(stat["received"] for stat in stats),
+            "dropped": sum(stat["dropped"] for stat in stats),
+            "buffered": sum(stat["buffered"] for stat in stats),
+            "high_water_mark": max(
+                (stat["high_water_mark"] for stat in stats), default=0
+            ),
+        }
+
+    async def get_last_message(self, channel: Optional[str] = None) -> Optional[Dict]:
         """get_last_message.
 
         Args:
+            channel (Optional[str]): channel, see get_messages
 
         Returns:
             Optional[Dict]: return the last message in the buffer
         """
-        with self.messages_lock:
-            if not self.messages:
-                LOGGER.debug(
-                    f"[Subscriber-Redis] there is no messages on the {self.channel} channel"
-                )
-                return None
-            result = self.messages[-1]
-            self.messages.clear()
-        return result
+        result = self._take(channel)
+        if not result:
+            LOGGER.debug(
+                f"[Subscriber-Redis] there is no messages on the {channel or self.channel} channel"
+            )
+            return None
+        return result[-1]
@@ -0,0 +1,211 @@
+import os
+import re
+import numpy as np
+from collections import OrderedDict
+from enum import Enum
+from typing import Dict, List, Optional, Type
+
+from ...enums import Market
+from ...enums.market import MarketData
+from ...types.market import intervals_type
+from ...helpers.get_logger import LoggerFactory
+from ..shm.shm_base_repository import SHMBaseRepository
+
+
+class HistoryRepository:
+    """HistoryRepository.
+    append-only columnar store of closed candles with the column layout of the
+    SHM repositories. every column is split in fixed size `.npy` chunks which are
+    memory-mapped on read, so a range read only touches the pages it returns.
+    the row count is written after the rows, rows beyond it are ignored.
+    the most recently used chunks stay mapped and the first time of every chunk
+    is cached, so a range read only maps the chunks it returns.
+
+        {directory}/{market_data_btcusd_perp_1m}/{close}/{000000}.npy
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        market: Market,
+        interval: intervals_type,
+        schema: Type[Enum] = MarketData,
+        chunk_rows: int = 1 << 16,
+        max_open_chunks: int = 64,
+    ) -> None:
+        """__init__.
+
+        Args:
+            directory (str): root directory of the history
+            market (Market): market
+            interval (intervals_type): interval
+            schema (Type[Enum]): column enum, MarketData or MarketStat
+            chunk_rows (int): rows per chunk file, fixed for the lifetime of the store
+            max_open_chunks (int): chunk files kept mapped between reads
+        """
+        kind = re.sub(r"(?<!^)(?=[A-Z])", "_", schema.__name__).lower()
+        self._name = f"{kind}_{market.value}_{interval}"
+        self._path = os.path.join(directory, self._name)
+        self._schema = schema
+        self._time = schema["TIME"]
+        self._chunk_rows = chunk_rows
+        self._max_open_chunks = max_open_chunks
+        # least recently used first
+        self._chunks: OrderedDict = OrderedDict()
+        # first time of every chunk, a stored first row never changes
+        self._firsts: List[float] = []
+        self.LOGGER = LoggerFactory().get(f"history_{self._name}")
+        os.makedirs(self._path, exist_ok=True)
+
+    def __len__(self) -> int:
+        try:
+            with open(os.path.join(self._path, "length")) as file:
+                return int(file.read() or 0)
+        except FileNotFoundError:
+            return 0
+
+    def _set_length(self, length: int) -> None:
+        path = os.path.join(self._path, "length")
+        with open(f"{path}.tmp", "w") as file:
+            file.write(str(length))
+        os.replace(f"{path}.tmp", path)
+
+    def _chunk(self, column: Enum, index: int, write: bool = False) -> np.memmap:
+        key = (column, index, write)
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self._chunks.move_to_end(key)
+            return chunk
+        directory = os.path.join(self._path, column.name.lower())
+        path = os.path.join(directory, f"{index:06d}.npy")
+        if not write:
+            chunk = np.load(path, mmap_mode="r")
+        elif os.path.exists(path):
+            chunk = np.load(path, mmap_mode="r+")
+        else:
+            os.makedirs(directory, exist_ok=True)
+            chunk = np.lib.format.open_memmap(
+                path, mode="w+", dtype=np.double, shape=(self._chunk_rows,)
+            )
+        self._chunks[key] = chunk
+        if len(self._chunks) > self._max_open_chunks:
+            # views returned by earlier reads keep their mapping alive
+            _, evicted = self._chunks.popitem(last=False)
+            if evicted.mode != "r":
+                evicted.flush()
+        return chunk
+
+    def last_time(self) -> float:
+        length = len(self)
+        if not length:
+            return 0.0
+        return float(self._row_time(length - 1))
+
+    def _row_time(self, row: int) -> float:
+        chunk = self._chunk(self._time, row // self._chunk_rows)
+        return chunk[row % self._chunk_rows]
+
+    def append(self, rows: np.ndarray) -> int:
+        """append.
+        appends rows in time order, rows which are not newer than the last stored
+        row are skipped so appending the same window again is harmless.
+
+        Args:
+            rows (np.ndarray): rows with the schema columns
+
+        Returns:
+            int: number of appended rows
+        """
+        times = rows[:, self._time.value]
+        rows = rows[times > self.last_time()]
+        if not len(rows):
+            return 0
+        length = len(self)
+        written = 0
+        while written < len(rows):
+            index, offset = divmod(length + written, self._chunk_rows)
+            count = min(self._chunk_rows - offset, len(rows) - written)
+            for column in self._schema:
+                chunk = self._chunk(column, index, write=True)
+                chunk[offset : offset + count] = rows[
+                    written : written + count, column.value
+                ]
+            written += count
+        for chunk in self._chunks.values():
+            if chunk.mode != "r":
+                chunk.flush()
+        self._set_length(length + written)
+        # only the last chunk is written again
+        last = (length + written) // self._chunk_rows
+        for key in [key for key in self._chunks if key[2] and key[1] < last]:
+            del self._chunks[key]
+        del self._firsts[length // self._chunk_rows :]
+        return written
+
+    def append_from(self, repository: SHMBaseRepository) -> int:
+        """append_from.
+        appends the closed rows of an SHM repository, the live row is left out
+
+        Args:
+            repository (SHMBaseRepository): MarketDataRepository or MarketStatRepository
+
+        Returns:
+            int: number of appended rows
+        """
+        rows = repository.snapshot()[:-1]
+        return self.append(rows[rows[:, self._time.value] > 0])
+
+    def _search(self, ts: float, length: int) -> int:
+        """_search.
+        index of the first stored row with time >= ts, it binary searches the
+        first time of the chunks and then the times of one chunk.
+        """
+        chunks = (length + self._chunk_rows - 1) // self._chunk_rows
+        # only the chunks appended since the last search are looked up
+        for index in range(len(self._firsts), chunks):
+            self._firsts.append(float(self._chunk(self._time, index)[0]))
+        index = max(int(np.searchsorted(self._firsts, ts, side="right")) - 1, 0)
+        end = min(self._chunk_rows, length - index * self._chunk_rows)
+        times = self._chunk(self._time, index)[:end]
+        return index * self._chunk_rows + int(np.searchsorted(times, ts))
+
+    def read_range(
+        self,
+        start_ts: float,
+        end_ts: float,
+        columns: Optional[List[Enum]] = None,
+    ) -> Dict[Enum, np.ndarray]:
+        """read_range.
+        rows with start_ts <= time < end_ts, a range inside a single chunk is
+        returned as read-only memory-mapped views, otherwise the chunks are joined.
+
+        Args:
+            start_ts (float): start time
+            end_ts (float): end time, exclusive
+            columns (Optional[List[Enum]]): columns to read, all by default
+
+        Returns:
+            Dict[Enum, np.ndarray]: column arrays
+        """
+        columns = list(self._schema) if columns is None else columns
+        length = len(self)
+        if not length:
+            return {column: np.empty(0) for column in columns}
+        start = self._search(start_ts, length)
+        end = self._search(end_ts, length)
+        result = {}
+        for column in columns:
+            parts = []
+            row = start
+            while row < end:
+                index, offset = divmod(row, self._chunk_rows)
+                count = min(self._chunk_rows - offset, end - row)
+                parts.append(self._chunk(column, index)[offset : offset + count])
+                row += count
+            if not parts:
+                result[column] = np.empty(0)
+            elif len(parts) == 1:
+                result[column] = parts[0]
+            else:
+                result[column] = np.concatenate(parts)
+        return result
@@ -0,0 +1,160 @@
+import numpy as np
+from typing import Dict, List
+
+from ...enums.market import MarketData
+from ...types.market import intervals_seconds, intervals_type
+from ...helpers.get_logger import LoggerFactory
+from .market_data_repository import MarketDataRepository
+
+# columns which are summed up when candles are merged
+SUM_COLUMNS = [
+    MarketData.VOL.value,
+    MarketData.SELLER_VOL.value,
+    MarketData.BUYER_VOL.value,
+    MarketData.BUYER_COUNT.value,
+    MarketData.SELLER_COUNT.value,
+]
+
+
+def merge_candles(candle: np.ndarray, other: np.ndarray) -> np.ndarray:
+    """merge_candles.
+    merges a later candle into an earlier one, empty candles are skipped.
+    unique traders are not mergeable from counts so they are left untouched,
+    the aggregator merges the trader sketches instead.
+
+    Args:
+        candle (np.ndarray): earlier candle
+        other (np.ndarray): later candle
+
+    Returns:
+        np.ndarray: merged candle
+    """
+    merged = candle.copy()
+    if other[MarketData.PRICE.value]:
+        merged[MarketData.PRICE.value] = other[MarketData.PRICE.value]
+    if not other[MarketData.OPEN.value]:
+        return merged
+    if not merged[MarketData.OPEN.value]:
+        merged[MarketData.OPEN.value] = other[MarketData.OPEN.value]
+        merged[MarketData.HIGH.value] = other[MarketData.HIGH.value]
+        merged[MarketData.LOW.value] = other[MarketData.LOW.value]
+    else:
+        merged[MarketData.HIGH.value] = max(
+            merged[MarketData.HIGH.value], other[MarketData.HIGH.value]
+        )
+        merged[MarketData.LOW.value] = min(
+            merged[MarketData.LOW.value], other[MarketData.LOW.value]
+        )
+    merged[MarketData.CLOSE.value] = other[MarketData.CLOSE.value]
+    merged[SUM_COLUMNS] += other[SUM_COLUMNS]
+    return merged
+
+
+class CandleAggregator:
+    """CandleAggregator.
+    keeps higher interval candles up to date from the candles of a base interval
+    repository. every higher interval holds the merge of its already closed base
+    candles, so an update only merges that with the live base candle.
+    """
+
+    def __init__(
+        self,
+        base: MarketDataRepository,
+        intervals: List[intervals_type],
+        rows: int = 200,
+        ring: bool = False,
+    ) -> None:
+        """__init__.
+
+        Args:
+            base (MarketDataRepository): base interval repository, reader or writer
+            intervals (List[intervals_type]): higher intervals to keep up to date
+            rows (int): rows of the higher interval repositories
+            ring (bool): ring mode of the higher interval repositories
+        """
+        self.base = base
+        self.LOGGER = LoggerFactory().get(f"candle_aggregator_{base._name}")
+        base_seconds = intervals_seconds[base._interval]
+        for interval in intervals:
+            if intervals_seconds[interval] % base_seconds:
+                raise ValueError(
+                    f"{interval} is not a multiple of base interval {base._interval}"
+                )
+        self.repositories: Dict[str, MarketDataRepository] = {
+            interval: MarketDataRepository(
+                market=base._market,
+                interval=interval,
+                create=True,
+                rows=rows,
+                ring=ring,
+                hll_precision=base.traders.precision if base.traders else None,
+            )
+            for interval in intervals
+        }
+        self._closed = {
+            interval: np.zeros(len(MarketData)) for interval in self.repositories
+        }
+        self._buckets = {interval: 0.0 for interval in self.repositories}
+        self._base_time = 0.0
+
+    def update(self) -> None:
+        """update.
+        folds base candles closed since the last update into the higher intervals
+        and merges the live base candle on top of them. the first update and updates
+        which missed some base candles look the closed candles up in the whole window.
+        """
+        candles = self.base.snapshot(_from=-2)
+        live = candles[-1]
+        time = live[MarketData.TIME.value]
+        if not time:
+            return
+        if time != self._base_time:
+            closed = candles[:-1]
+            if (
+                not self._base_time
+                or closed[0, MarketData.TIME.value] != self._base_time
+            ):
+                # first update or missed more than one base candle
+                closed = self.base.snapshot()[:-1]
+                times = closed[:, MarketData.TIME.value]
+                closed = closed[
+                    (times > 0) & (times >= self._base_time) & (times < time)
+                ]
+            for candle in closed:
+                self._fold(candle)
+        self._base_time = time
+
+        for interval, repository in self.repositories.items():
+            self._roll(interval, time)
+            repository.set_candle(merge_candles(self._closed[interval], live))
+            if self.base.traders is not None:
+                # merging sketches is idempotent, the live one is merged on every update
+                repository.merge_traders(self.base.get_trader_sketch())
+
+    def _fold(self, candle: np.ndarray) -> None:
+        for interval, repository in self.repositories.items():
+            self._roll(interval, candle[MarketData.TIME.value])
+            self._closed[interval] = merge_candles(self._closed[interval], candle)
+            repository.set_candle(self._closed[interval])
+            if self.base.traders is not None:
+                sketch = self.base.trader_sketch_at(candle[MarketData.TIME.value])
+                if sketch is not None:
+                    repository.merge_traders(sketch)
+
+    def _roll(self, interval: str, time: float) -> None:
+        seconds = intervals_seconds[interval]
+        bucket = time // seconds * seconds
+        if bucket == self._buckets[interval]:
+            return
+        repository = self.repositories[interval]
+        if self._buckets[interval]:
+            repository.create_candle()
+        closed = np.zeros(len(MarketData))
+        closed[MarketData.TIME.value] = bucket
+        closed[MarketData.PRICE.value] = repository.get_last_trade()
+        self._closed[interval] = closed
+        self._buckets[interval] = bucket
+
+    def close(self) -> None:
+        for repository in self.repositories.values():
+            repository.close()
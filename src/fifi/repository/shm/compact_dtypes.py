@@ -0,0 +1,50 @@
+import numpy as np
+from enum import Enum
+from typing import Dict, Type
+
+from ...enums.market import MarketData, MarketStat
+from ...exceptions import SHMLayoutException
+
+# columns which don't need a double, the rest of the columns stay "<f8".
+# prices and volumes of market data keep their doubles, a float32 has about 7
+# significant digits which isn't enough for a price like 65432.15 or a summed
+# volume, so a compact candle only saves its three counters: 84 of 96 bytes.
+# market stats are derived values and narrow to 48 of 80 bytes.
+COMPACT_DTYPES: Dict[Type[Enum], Dict[Enum, str]] = {
+    MarketData: {
+        MarketData.TIME: "<i8",
+        MarketData.UNIQUE_TRADERS: "<i4",
+        MarketData.BUYER_COUNT: "<i4",
+        MarketData.SELLER_COUNT: "<i4",
+    },
+    MarketStat: {
+        MarketStat.RSI14: "<f4",
+        MarketStat.RSI7: "<f4",
+        MarketStat.RSI5: "<f4",
+        MarketStat.RSI3: "<f4",
+        MarketStat.ATR14: "<f4",
+        MarketStat.ATR7: "<f4",
+        MarketStat.ATR5: "<f4",
+        MarketStat.ATR3: "<f4",
+        MarketStat.TIME: "<i8",
+    },
+}
+
+
+def compact_dtype(schema: Type[Enum]) -> np.dtype:
+    """compact_dtype.
+    packed structured dtype of a column enum, one field per column named after
+    the enum member.
+
+    Args:
+        schema (Type[Enum]): column enum
+
+    Raises:
+        SHMLayoutException: there is no compact spec for the enum
+    """
+    if schema not in COMPACT_DTYPES:
+        raise SHMLayoutException(f"{schema.__name__} has no compact layout")
+    spec = COMPACT_DTYPES[schema]
+    return np.dtype(
+        [(member.name, spec.get(member, "<f8")) for member in schema]  # type: ignore
+    )
@@ -1,30 +1,44 @@
+from typing import Optional
+
 from ...enums.market import HealthStat
 from ...helpers.get_logger import LoggerFactory
 from .shm_base_repository import SHMBaseRepository, check_reader
+from .shm_arena import SHMArena
 
 
 class HealthDataRepository(SHMBaseRepository):
-    def __init__(self, name: str, create: bool = False) -> None:
+    def __init__(
+        self,
+        name: str,
+        create: bool = False,
+        directory: Optional[str] = None,
+        arena: Optional[SHMArena] = None,
+    ) -> None:
         self._name = name
         self.LOGGER = LoggerFactory().get(self._name)
         super().__init__(
-            name=self._name, rows=1, columns=HealthStat.__len__(), create=create
+            name=self._name,
+            rows=1,
+            create=create,
+            schema=HealthStat,
+            directory=directory,
+            arena=arena,
         )
 
     def is_updated(self) -> bool:
-        return bool(self._data[0][HealthStat.IS_UPDATED.value])
+        return bool(self._value(HealthStat.IS_UPDATED.value, 0))
 
     @check_reader
     def set_is_updated(self) -> None:
-        self._data[0][HealthStat.IS_UPDATED.value] = 1
+        self._set_value(HealthStat.IS_UPDATED.value, 1, 0)
 
     @check_reader
     def clear_is_updated(self) -> None:
-        self._data[0][HealthStat.IS_UPDATED.value] = 0
+        self._set_value(HealthStat.IS_UPDATED.value, 0, 0)
 
     def get_time(self) -> float:
-        return self._data[0][HealthStat.TIME.value]
+        return self._value(HealthStat.TIME.value, 0)
 
     @check_reader
     def set_time(self, time: int) -> None:
-        self._data[0][HealthStat.TIME.value] = time
+        self._set_value(HealthStat.TIME.value, time, 0)
@@ -0,0 +1,43 @@
+import mmap
+import os
+
+
+class MappedFile:
+    """MappedFile.
+    memory-mapped file with the parts of the SharedMemory interface used by the
+    SHM repositories, so the same repositories can sit on a persistent file.
+    """
+
+    def __init__(self, path: str, create: bool = False, size: int = 0) -> None:
+        """__init__.
+
+        Args:
+            path (str): file path
+            create (bool): create the file if it doesn't exist and fit it to `size`
+            size (int): size in bytes, only used with create
+        """
+        self.name = path
+        flags = os.O_RDWR | (os.O_CREAT if create else 0)
+        self._fd = os.open(path, flags, 0o600)
+        try:
+            if create and os.fstat(self._fd).st_size != size:
+                os.ftruncate(self._fd, size)
+            self.size = os.fstat(self._fd).st_size
+            self._mmap = mmap.mmap(self._fd, self.size)
+        except BaseException:
+            os.close(self._fd)
+            raise
+        self.buf = memoryview(self._mmap)
+
+    def flush(self) -> None:
+        # fsync writes the dirty pages of the mapping too, and unlike mmap.flush
+        # it releases the GIL while the disk works
+        os.fsync(self._fd)
+
+    def close(self) -> None:
+        self.buf.release()
+        self._mmap.close()
+        os.close(self._fd)
+
+    def unlink(self) -> None:
+        os.remove(self.name)
@@ -1,138 +1,387 @@
 import numpy as np
-from typing import Optional
+from typing import Literal, Optional, Sequence
 
 from ...enums.market import MarketData
 from ...enums import Market
-from ...types.market import intervals_type
+from ...types.market import intervals_seconds, intervals_type
 from ...helpers.get_logger import LoggerFactory
+from ...helpers.hyperloglog import check_precision
 from .shm_base_repository import SHMBaseRepository, check_reader
 from .health_data_repository import HealthDataRepository
+from .trader_sketch_repository import TraderSketchRepository
+from .shm_arena import SHMArena
+
+OHLCV = (
+    MarketData.OPEN,
+    MarketData.HIGH,
+    MarketData.LOW,
+    MarketData.CLOSE,
+    MarketData.VOL,
+)
 
 
 class MarketDataRepository(SHMBaseRepository):
+    traders: Optional[TraderSketchRepository] = None
+
     def __init__(
         self,
         market: Market,
         interval: intervals_type,
         create: bool = False,
         rows: int = 200,
+        ring: bool = False,
+        directory: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        arena: Optional[SHMArena] = None,
+        order: Literal["C", "F"] = "C",
+        compact: bool = False,
+        hll_precision: Optional[int] = None,
     ) -> None:
+        """__init__.
+
+        Args:
+            market (Market): market
+            interval (intervals_type): interval
+            create (bool): writer creates the segment, reader connects to it
+            rows (int): number of candles
+            ring (bool): ring buffer mode, see SHMBaseRepository
+            directory (Optional[str]): keeps the segments in memory-mapped files
+            flush_interval (Optional[float]): periodic flush of the files
+            arena (Optional[SHMArena]): hosts the segments in this arena
+            order (Literal["C", "F"]): memory layout of the data block
+            compact (bool): compact per-column types, only the counters are narrowed
+                so a candle takes 84 instead of 96 bytes, prices and volumes stay
+                doubles
+            hll_precision (Optional[int]): writer keeps a HyperLogLog sketch of the
+                traders of every candle with 2 ** hll_precision registers, readers
+                attach to the sketches if the writer keeps them, in 4..16
+
+        Raises:
+            ValueError: hll_precision is out of range
+        """
+        if hll_precision is not None:
+            # checked before any segment is created
+            check_precision(hll_precision)
         super().__init__(
             name=f"market_data_{market.value}_{interval}",
             rows=rows,
-            columns=MarketData.__len__(),
             create=create,
+            ring=ring,
+            schema=MarketData,
+            directory=directory,
+            flush_interval=flush_interval,
+            arena=arena,
+            order=order,
+            compact=compact,
         )
+        self._market = market
+        self._interval = interval
         self._health_name = f"market_data_health_{market.value}_{interval}"
-        self.health = HealthDataRepository(name=self._health_name, create=create)
+        self.health = HealthDataRepository(
+            name=self._health_name, create=create, directory=directory, arena=arena
+        )
+        self.traders = self._connect_traders(
+            market, interval, create, ring, directory, arena, hll_precision
+        )
         self.LOGGER = LoggerFactory().get(self._name)
 
+    def _connect_traders(
+        self,
+        market: Market,
+        interval: intervals_type,
+        create: bool,
+        ring: bool,
+        directory: Optional[str],
+        arena: Optional[SHMArena],
+        precision: Optional[int],
+    ) -> Optional[TraderSketchRepository]:
+        name = f"market_data_traders_{market.value}_{interval}"
+        if create and precision is None:
+            return None
+        if create:
+            return TraderSketchRepository(
+                name=name,
+                rows=self._rows,
+                precision=precision,
+                create=True,
+                ring=ring,
+                directory=directory,
+                arena=arena,
+            )
+        try:
+            return TraderSketchRepository(name=name, directory=directory, arena=arena)
+        except FileNotFoundError:
+            # the writer keeps no sketches
+            return None
+
     def get_closes(
         self, _from: Optional[int] = None, _to: Optional[int] = None
     ) -> np.ndarray:
-        data = self.extract_data(_from, _to)
-        return data[:, MarketData.CLOSE.value]
+        return self.extract_column(MarketData.CLOSE.value, _from, _to)
 
     def get_highs(
         self, _from: Optional[int] = None, _to: Optional[int] = None
     ) -> np.ndarray:
-        data = self.extract_data(_from, _to)
-        return data[:, MarketData.HIGH.value]
+        return self.extract_column(MarketData.HIGH.value, _from, _to)
 
     def get_lows(
         self, _from: Optional[int] = None, _to: Optional[int] = None
     ) -> np.ndarray:
-        data = self.extract_data(_from, _to)
-        return data[:, MarketData.LOW.value]
+        return self.extract_column(MarketData.LOW.value, _from, _to)
 
     def get_opens(
         self, _from: Optional[int] = None, _to: Optional[int] = None
     ) -> np.ndarray:
-        data = self.extract_data(_from, _to)
-        return data[:, MarketData.OPEN.value]
+        return self.extract_column(MarketData.OPEN.value, _from, _to)
 
     def get_vols(
         self, _from: Optional[int] = None, _to: Optional[int] = None
     ) -> np.ndarray:
-        data = self.extract_data(_from, _to)
-        return data[:, MarketData.VOL.value]
+        return self.extract_column(MarketData.VOL.value, _from, _to)
+
+    def get_ohlcv(
+        self,
+        _from: Optional[int] = None,
+        _to: Optional[int] = None,
+        columns: Sequence[MarketData] = OHLCV,
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """get_ohlcv.
+        one consistent copy of the candle columns, unlike calling the getters one
+        by one the writer can't move in between.
+
+        Args:
+            _from (Optional[int]): _from
+            _to (Optional[int]): _to
+            columns (Sequence[MarketData]): columns, open/high/low/close/vol by default
+            out (Optional[np.ndarray]): buffer of shape (len(columns), rows) to reuse
+
+        Returns:
+            np.ndarray: one row per column, e.g. `opens, highs, lows, closes, vols = ...`
+        """
+        return self.get_columns([column.value for column in columns], _from, _to, out)
 
     def get_last_trade(self) -> float:
-        return self._data[-1, MarketData.PRICE.value]
+        return self._value(MarketData.PRICE.value)
 
     def get_time(self) -> float:
-        return self._data[-1, MarketData.TIME.value]
+        return self._value(MarketData.TIME.value)
 
     def get_seller_vol(self) -> float:
-        return self._data[-1, MarketData.SELLER_VOL.value]
+        return self._value(MarketData.SELLER_VOL.value)
 
     def get_buyer_vol(self) -> float:
-        return self._data[-1, MarketData.BUYER_VOL.value]
+        return self._value(MarketData.BUYER_VOL.value)
 
     def get_unique_traders(self) -> float:
-        return self._data[-1, MarketData.UNIQUE_TRADERS.value]
+        return self._value(MarketData.UNIQUE_TRADERS.value)
 
     def get_buyer_count(self) -> float:
-        return self._data[-1, MarketData.BUYER_COUNT.value]
+        return self._value(MarketData.BUYER_COUNT.value)
 
     def get_seller_count(self) -> float:
-        return self._data[-1, MarketData.SELLER_COUNT.value]
+        return self._value(MarketData.SELLER_COUNT.value)
+
+    def get_trader_sketch(self, offset: int = -1) -> np.ndarray:
+        """get_trader_sketch.
+        view of the trader sketch of a candle given by its negative offset from
+        the latest one
+        """
+        return self._sketches().get_sketch(self._index(offset))
+
+    def trader_sketch_at(self, ts: float) -> Optional[np.ndarray]:
+        """trader_sketch_at.
+        view of the trader sketch of the candle which covers ts, see row_at
+        """
+        index = self._search_time(ts, side="right") - 1
+        if index < 0:
+            return None
+        return self.get_trader_sketch(index - self._rows)
+
+    def count_traders(
+        self, _from: Optional[int] = None, _to: Optional[int] = None
+    ) -> float:
+        """count_traders.
+        estimated distinct traders over a range of candles, the sketches are merged
+        so a trader active in many candles is counted once
+
+        Args:
+            _from (Optional[int]): _from
+            _to (Optional[int]): _to
+        """
+        return self._sketches().count(_from, _to)
+
+    @check_reader
+    def add_traders(self, hashes: np.ndarray) -> None:
+        """add_traders.
+        adds trader hashes to the sketch of the current candle in one vectorized
+        step and keeps UNIQUE_TRADERS at its estimate, instead of add_unique_traders
+
+        Args:
+            hashes (np.ndarray): uint64 hashes, e.g. from hash_traders
+        """
+        self._sketches().add(hashes)
+        self._count_current_traders()
+
+    @check_reader
+    def merge_traders(self, sketch: np.ndarray) -> None:
+        """merge_traders.
+        merges a sketch, e.g. of a lower interval candle, into the current candle
+
+        Args:
+            sketch (np.ndarray): registers of the same precision
+        """
+        self._sketches().merge(sketch)
+        self._count_current_traders()
+
+    def _sketches(self) -> TraderSketchRepository:
+        if self.traders is None:
+            raise ValueError(f"{self._name}: repository keeps no trader sketches")
+        return self.traders
+
+    def _count_current_traders(self) -> None:
+        count = self._sketches().count(_from=-1)
+        self._set_value(MarketData.UNIQUE_TRADERS.value, round(count))
 
     @check_reader
     def create_candle(self) -> None:
-        self._data[0].fill(0)
+        last_trade = self.get_last_trade()
+        self.new_row()
+        if self.traders is not None:
+            self.traders.new_row()
         # not coming the bad price into last trade
-        self._data[0, MarketData.PRICE.value] = self.get_last_trade()
-        self._data[:] = np.roll(self._data, shift=-1, axis=0)
+        self._set_value(MarketData.PRICE.value, last_trade)
 
     @check_reader
     def set_close_price(self, price: float) -> None:
-        self._data[-1, MarketData.CLOSE.value] = price
+        self._set_value(MarketData.CLOSE.value, price)
 
     @check_reader
     def set_open_price(self, price: float) -> None:
-        self._data[-1, MarketData.OPEN.value] = price
+        self._set_value(MarketData.OPEN.value, price)
 
     @check_reader
     def set_low_price(self, price: float) -> None:
-        self._data[-1, MarketData.LOW.value] = price
+        self._set_value(MarketData.LOW.value, price)
 
     @check_reader
     def set_high_price(self, price: float) -> None:
-        self._data[-1, MarketData.HIGH.value] = price
+        self._set_value(MarketData.HIGH.value, price)
 
     @check_reader
     def set_last_trade(self, price: float) -> None:
-        self._data[-1, MarketData.PRICE.value] = price
+        self._set_value(MarketData.PRICE.value, price)
 
     @check_reader
     def set_vol(self, vol: float) -> None:
-        self._data[-1, MarketData.VOL.value] = vol
+        self._set_value(MarketData.VOL.value, vol)
 
     @check_reader
     def add_vol(self, vol: float) -> None:
-        self._data[-1, MarketData.VOL.value] += vol
+        self._add_value(MarketData.VOL.value, vol)
 
     @check_reader
     def add_seller_vol(self, vol: float) -> None:
-        self._data[-1, MarketData.SELLER_VOL.value] += vol
+        self._add_value(MarketData.SELLER_VOL.value, vol)
 
     @check_reader
     def add_buyer_vol(self, vol: float) -> None:
-        self._data[-1, MarketData.BUYER_VOL.value] += vol
+        self._add_value(MarketData.BUYER_VOL.value, vol)
 
     @check_reader
     def add_unique_traders(self, count: int) -> None:
-        self._data[-1, MarketData.UNIQUE_TRADERS.value] += count
+        self._add_value(MarketData.UNIQUE_TRADERS.value, count)
 
     @check_reader
     def add_buyer_count(self, count: int) -> None:
-        self._data[-1, MarketData.BUYER_COUNT.value] += count
+        self._add_value(MarketData.BUYER_COUNT.value, count)
 
     @check_reader
     def add_seller_count(self, count: int) -> float:
-        self._data[-1, MarketData.SELLER_COUNT.value] += count
+        self._add_value(MarketData.SELLER_COUNT.value, count)
 
     @check_reader
     def set_time(self, time: float) -> None:
-        self._data[-1, MarketData.TIME.value] = time
+        self._set_value(MarketData.TIME.value, time)
+
+    @check_reader
+    def set_candle(self, candle: np.ndarray) -> None:
+        """set_candle.
+        overwrites every column of the current candle
+
+        Args:
+            candle (np.ndarray): values ordered by MarketData columns
+        """
+        self._fill_row(self._last(), candle)
+
+    @check_reader
+    def apply_trades(
+        self,
+        prices: np.ndarray,
+        sizes: np.ndarray,
+        sides: np.ndarray,
+        timestamps: np.ndarray,
+    ) -> None:
+        """apply_trades.
+        applies a batch of trades on the candles in one vectorized step, a new
+        candle is created whenever the trades cross an interval boundary.
+        trades older than the current candle are merged into the current candle.
+
+        Args:
+            prices (np.ndarray): trade prices
+            sizes (np.ndarray): trade sizes
+            sides (np.ndarray): positive for buyer trades, zero/negative for seller trades
+            timestamps (np.ndarray): trade times in seconds, ordered
+        """
+        prices = np.asarray(prices, dtype=np.double)
+        if not prices.size:
+            return
+        sizes = np.asarray(sizes, dtype=np.double)
+        buyers = np.asarray(sides) > 0
+        interval = intervals_seconds[self._interval]
+        buckets = np.asarray(timestamps, dtype=np.double) // interval * interval
+
+        # one segment per candle in the batch, almost always just one
+        starts = np.flatnonzero(np.diff(buckets)) + 1
+        starts = np.concatenate(([0], starts))
+        highs = np.maximum.reduceat(prices, starts)
+        lows = np.minimum.reduceat(prices, starts)
+        vols = np.add.reduceat(sizes, starts)
+        buyer_vols = np.add.reduceat(np.where(buyers, sizes, 0), starts)
+        buyer_counts = np.add.reduceat(buyers.astype(np.double), starts)
+        counts = np.diff(np.append(starts, prices.size))
+        closes = prices[np.append(starts[1:], prices.size) - 1]
+
+        for i, start in enumerate(starts):
+            time = self._value(MarketData.TIME.value)
+            if time and buckets[start] > time:
+                self.create_candle()
+            row = self._row_values(self._last())
+            if not time or buckets[start] > time:
+                row[MarketData.TIME.value] = buckets[start]
+            if not row[MarketData.OPEN.value]:
+                row[MarketData.OPEN.value] = prices[start]
+                row[MarketData.HIGH.value] = highs[i]
+                row[MarketData.LOW.value] = lows[i]
+            else:
+                row[MarketData.HIGH.value] = max(row[MarketData.HIGH.value], highs[i])
+                row[MarketData.LOW.value] = min(row[MarketData.LOW.value], lows[i])
+            row[MarketData.CLOSE.value] = closes[i]
+            row[MarketData.PRICE.value] = closes[i]
+            row[MarketData.VOL.value] += vols[i]
+            row[MarketData.BUYER_VOL.value] += buyer_vols[i]
+            row[MarketData.SELLER_VOL.value] += vols[i] - buyer_vols[i]
+            row[MarketData.BUYER_COUNT.value] += buyer_counts[i]
+            row[MarketData.SELLER_COUNT.value] += counts[i] - buyer_counts[i]
+            self._fill_row(self._last(), row)
+
+    @check_reader
+    def resize(self, rows: int) -> None:
+        super().resize(rows)
+        if self.traders is not None:
+            self.traders.resize(rows)
+
+    def close(self) -> None:
+        if self.traders is not None:
+            self.traders.close()
+        super().close()
@@ -1,5 +1,5 @@
 import numpy as np
-from typing import Optional
+from typing import Dict, Literal, Optional
 
 from ...enums.market import MarketStat
 from ...enums import Market
@@ -7,6 +7,7 @@ from ...types.market import intervals_type
 from ...helpers.get_logger import LoggerFactory
 from .shm_base_repository import SHMBaseRepository, check_reader
 from .health_data_repository import HealthDataRepository
+from .shm_arena import SHMArena
 
 
 class MarketStatRepository(SHMBaseRepository):
@@ -16,37 +17,63 @@ class MarketStatRepository(SHMBaseRepository):
         interval: intervals_type,
         create: bool = False,
         rows: int = 200,
+        ring: bool = False,
+        directory: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        arena: Optional[SHMArena] = None,
+        order: Literal["C", "F"] = "C",
+        compact: bool = False,
     ) -> None:
         super().__init__(
             name=f"market_stat_{market.value}_{interval}",
             rows=rows,
-            columns=MarketStat.__len__(),
             create=create,
+            ring=ring,
+            schema=MarketStat,
+            directory=directory,
+            flush_interval=flush_interval,
+            arena=arena,
+            order=order,
+            compact=compact,
         )
         self._health_name = f"market_stat_health_{market.value}_{interval}"
-        self.health = HealthDataRepository(name=self._health_name, create=create)
+        self.health = HealthDataRepository(
+            name=self._health_name, create=create, directory=directory, arena=arena
+        )
         self.LOGGER = LoggerFactory().get(self._name)
 
     def get_last_stat(self, stat: MarketStat) -> float:
-        return self._data[-1, stat.value]
+        return self._value(stat.value)
 
     def get_stat(
         self, stat: MarketStat, _from: Optional[int], _to: Optional[int]
     ) -> np.ndarray:
-        data = self.extract_data(_from, _to)
-        return data[:, stat.value]
+        return self.extract_column(stat.value, _from, _to)
 
+    @check_reader
     def set_last_stat(self, stat: MarketStat, value: float) -> None:
-        self._data[-1, stat.value] = value
+        self._set_value(stat.value, value)
+
+    @check_reader
+    def set_last_stats(self, stats: Dict[MarketStat, float]) -> None:
+        """set_last_stats.
+        sets several stats of the current candle under one write
+
+        Args:
+            stats (Dict[MarketStat, float]): stats
+        """
+        for stat, value in stats.items():
+            self._set_value(stat.value, value)
 
+    @check_reader
     def create_candle(self):
-        self._data[0].fill(0)
-        self._data[0, :] = self._data[-1, :]
-        self._data[:] = np.roll(self._data, shift=-1, axis=0)
+        self.new_row()
+        # stats carry over into the new candle
+        self._fill_row(self._last(), self._row_values(self._index(-2)))
 
     def get_time(self) -> float:
-        return self._data[-1, MarketStat.TIME.value]
+        return self._value(MarketStat.TIME.value)
 
     @check_reader
     def set_time(self, time: float) -> None:
-        self._data[-1, MarketStat.TIME.value] = time
+        self._set_value(MarketStat.TIME.value, time)
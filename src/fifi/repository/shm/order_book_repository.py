@@ -0,0 +1,168 @@
+import numpy as np
+from typing import Optional, Tuple
+
+from ...enums.market import OrderBook
+from ...enums import Market
+from ...helpers.get_logger import LoggerFactory
+from .shm_base_repository import SHMBaseRepository, check_reader
+from .health_data_repository import HealthDataRepository
+from .shm_arena import SHMArena
+
+
+class OrderBookRepository(SHMBaseRepository):
+    """OrderBookRepository.
+    fixed depth L2 book of a market, row i is the i-th level of both sides with
+    the best prices in row 0. the segment is column-major so the prices and
+    sizes of a side are contiguous and top-N reads are views.
+    empty levels are zero.
+    """
+
+    def __init__(
+        self,
+        market: Market,
+        create: bool = False,
+        depth: int = 50,
+        directory: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        arena: Optional[SHMArena] = None,
+    ) -> None:
+        super().__init__(
+            name=f"order_book_{market.value}",
+            rows=depth,
+            create=create,
+            schema=OrderBook,
+            directory=directory,
+            flush_interval=flush_interval,
+            arena=arena,
+            order="F",
+        )
+        self._market = market
+        self._health_name = f"order_book_health_{market.value}"
+        self.health = HealthDataRepository(
+            name=self._health_name, create=create, directory=directory, arena=arena
+        )
+        self.LOGGER = LoggerFactory().get(self._name)
+
+    @property
+    def depth(self) -> int:
+        return self._rows
+
+    def get_bids(self, n: Optional[int] = None) -> np.ndarray:
+        """get_bids.
+        view of the best `n` bid levels as (price, size) rows
+        """
+        return self.extract_data(_to=n)[:, OrderBook.BID_PRICE.value : 2]
+
+    def get_asks(self, n: Optional[int] = None) -> np.ndarray:
+        """get_asks.
+        view of the best `n` ask levels as (price, size) rows
+        """
+        return self.extract_data(_to=n)[:, OrderBook.ASK_PRICE.value :]
+
+    def top(self, n: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """top.
+        views of the best `n` levels of both sides
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: bids and asks as (price, size) rows
+        """
+        return self.get_bids(n), self.get_asks(n)
+
+    def best_bid(self) -> float:
+        return self._value(OrderBook.BID_PRICE.value, 0)
+
+    def best_ask(self) -> float:
+        return self._value(OrderBook.ASK_PRICE.value, 0)
+
+    def mid_price(self) -> float:
+        return (self.best_bid() + self.best_ask()) / 2
+
+    def microprice(self) -> float:
+        """microprice.
+        mid price weighted by the sizes of the best levels, it leans towards the
+        side with less size. nan while one side of the book is empty.
+        """
+        bid, bid_size, ask, ask_size = self.extract_data(_to=1)[0]
+        if not bid_size or not ask_size:
+            return np.nan
+        return (bid * ask_size + ask * bid_size) / (bid_size + ask_size)
+
+    def imbalance(self, n: int = 1) -> float:
+        """imbalance.
+        (bid size - ask size) / (bid size + ask size) over the best `n` levels,
+        between -1 and 1. zero for an empty book.
+        """
+        levels = self.extract_data(_to=n)
+        bid_size = levels[:, OrderBook.BID_SIZE.value].sum()
+        ask_size = levels[:, OrderBook.ASK_SIZE.value].sum()
+        if not bid_size + ask_size:
+            return 0.0
+        return (bid_size - ask_size) / (bid_size + ask_size)
+
+    def get_time(self) -> float:
+        return self.health.get_time()
+
+    @check_reader
+    def set_snapshot(
+        self, bids: np.ndarray, asks: np.ndarray, time: Optional[float] = None
+    ) -> None:
+        """set_snapshot.
+        replaces the whole book, levels deeper than the depth are dropped
+
+        Args:
+            bids (np.ndarray): (price, size) rows in any order
+            asks (np.ndarray): (price, size) rows in any order
+            time (Optional[float]): time of the book
+        """
+        self._write_side(OrderBook.BID_PRICE.value, self._sort(bids, descending=True))
+        self._write_side(OrderBook.ASK_PRICE.value, self._sort(asks, descending=False))
+        if time is not None:
+            self.health.set_time(time)
+
+    @check_reader
+    def apply_diff(
+        self, bids: np.ndarray, asks: np.ndarray, time: Optional[float] = None
+    ) -> None:
+        """apply_diff.
+        updates levels in one vectorized step, a level gets the size of the
+        diff and a zero size removes the level.
+
+        Args:
+            bids (np.ndarray): (price, size) rows of updated bid levels
+            asks (np.ndarray): (price, size) rows of updated ask levels
+            time (Optional[float]): time of the update
+        """
+        self._write_side(
+            OrderBook.BID_PRICE.value,
+            self._sort(self._merge(self.get_bids(), bids), descending=True),
+        )
+        self._write_side(
+            OrderBook.ASK_PRICE.value,
+            self._sort(self._merge(self.get_asks(), asks), descending=False),
+        )
+        if time is not None:
+            self.health.set_time(time)
+
+    @staticmethod
+    def _merge(levels: np.ndarray, diff: np.ndarray) -> np.ndarray:
+        """_merge.
+        levels of the book updated by the diff, the last update of a price wins
+        """
+        diff = np.asarray(diff, dtype=np.double).reshape(-1, 2)
+        merged = np.concatenate((levels[levels[:, 1] > 0], diff))
+        # first occurrence in reverse order is the latest update of each price
+        _, latest = np.unique(merged[::-1, 0], return_index=True)
+        return merged[len(merged) - 1 - latest]
+
+    @staticmethod
+    def _sort(levels: np.ndarray, descending: bool) -> np.ndarray:
+        levels = np.asarray(levels, dtype=np.double).reshape(-1, 2)
+        levels = levels[levels[:, 1] > 0]
+        order = np.argsort(levels[:, 0], kind="stable")
+        return levels[order[::-1] if descending else order]
+
+    def _write_side(self, column: int, levels: np.ndarray) -> None:
+        count = min(len(levels), self._rows)
+        side = self._data[:, column : column + 2]
+        side[:count] = levels[:count]
+        side[count:] = 0
@@ -0,0 +1,196 @@
+import numpy as np
+from sys import version_info
+from typing import List, Optional
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.resource_tracker import unregister
+
+from ...enums import Market
+from ...exceptions import SHMLayoutException
+from ...types.market import intervals_type
+from ...helpers.get_logger import LoggerFactory
+
+ARENA_MAGIC = int.from_bytes(b"FIFIARN\0", "little")
+ARENA_VERSION = 1
+# magic, version, entries, count, used
+ARENA_HEADER_SIZE = 64
+ALIGNMENT = 128
+ENTRY_DTYPE = np.dtype([("key", "S64"), ("offset", "<i8"), ("size", "<i8")])
+
+
+class ArenaSlice:
+    """ArenaSlice.
+    part of an arena with the parts of the SharedMemory interface used by the
+    SHM repositories, unlinking it leaves the arena alone.
+    """
+
+    def __init__(self, arena: SharedMemory, name: str, offset: int, size: int):
+        self.name = name
+        self.size = size
+        self.buf = arena.buf[offset : offset + size]
+
+    def close(self) -> None:
+        self.buf.release()
+
+    def unlink(self) -> None:
+        pass
+
+
+class SHMArena:
+    """SHMArena.
+    one shared memory segment which hosts the segments of many repositories.
+    a directory table at the beginning maps segment names to their place in the
+    arena, readers attach to the arena once and look the segments up by name.
+    allocations are append only and a directory entry is published by bumping
+    the entry count after it's written.
+    """
+
+    def __init__(
+        self,
+        name: str = "fifi_arena",
+        create: bool = False,
+        size: int = 64 * 1024 * 1024,
+        entries: int = 256,
+    ) -> None:
+        """__init__.
+
+        Args:
+            name (str): shared memory segment name of the arena
+            create (bool): writer creates the arena, reader connects to it
+            size (int): size of the arena in bytes, pages are only backed once written
+            entries (int): capacity of the directory table
+        """
+        self._name = name
+        self.LOGGER = LoggerFactory().get(self._name)
+        self._reader = not create
+        if create:
+            try:
+                self._sm = SharedMemory(name=self._name, create=True, size=size)
+            except FileExistsError:
+                self.connect()
+                self._sm.close()
+                self._sm.unlink()
+                self._sm = SharedMemory(name=self._name, create=True, size=size)
+        else:
+            self.connect()
+
+        self._header = np.ndarray(shape=(5,), dtype=np.int64, buffer=self._sm.buf)
+        if create:
+            self._header[1] = ARENA_VERSION
+            self._header[2] = entries
+            self._header[3] = 0
+            self._header[4] = self._data_offset(entries)
+            self._header[0] = ARENA_MAGIC
+        elif self._header[0] != ARENA_MAGIC or self._header[1] != ARENA_VERSION:
+            raise SHMLayoutException(f"{self._name}: segment is not a valid arena")
+        self._directory = np.ndarray(
+            shape=(int(self._header[2]),),
+            dtype=ENTRY_DTYPE,
+            buffer=self._sm.buf,
+            offset=ARENA_HEADER_SIZE,
+        )
+
+    @staticmethod
+    def _data_offset(entries: int) -> int:
+        end = ARENA_HEADER_SIZE + entries * ENTRY_DTYPE.itemsize
+        return -(-end // ALIGNMENT) * ALIGNMENT
+
+    def connect(self) -> None:
+        if version_info.major == 3 and version_info.minor <= 12:
+            self._sm = SharedMemory(name=self._name)
+            unregister(self._sm._name, "shared_memory")
+        elif version_info.major == 3 and version_info.minor >= 13:
+            self._sm = SharedMemory(name=self._name, track=False)
+
+    def _find(self, name: str) -> Optional[int]:
+        key = name.encode()
+        count = int(self._header[3])
+        found = np.flatnonzero(self._directory["key"][:count] == key)
+        return int(found[0]) if len(found) else None
+
+    def allocate(self, name: str, size: int) -> ArenaSlice:
+        """allocate.
+        place of a segment in the arena, a segment which is already allocated
+        with the same size is handed out again.
+
+        Args:
+            name (str): segment name
+            size (int): segment size in bytes
+        """
+        if self._reader:
+            raise Exception("Reader couldn't allocate in the arena!!!")
+        if len(name.encode()) > ENTRY_DTYPE["key"].itemsize:
+            raise ValueError(f"{name}: segment name is too long for the arena")
+        index = self._find(name)
+        if index is not None:
+            entry = self._directory[index]
+            if entry["size"] != size:
+                raise SHMLayoutException(
+                    f"{name}: already allocated with {entry['size']} bytes in {self._name}"
+                )
+            return self.segment(name)
+        count = int(self._header[3])
+        offset = int(self._header[4])
+        if count == len(self._directory) or offset + size > self._sm.size:
+            raise SHMLayoutException(f"{self._name}: arena is full")
+        self._directory[count] = (name.encode(), offset, size)
+        self._header[4] = -(-(offset + size) // ALIGNMENT) * ALIGNMENT
+        # publishes the entry
+        self._header[3] = count + 1
+        return self.segment(name)
+
+    def segment(self, name: str) -> ArenaSlice:
+        """segment.
+        looks an allocated segment up by name
+
+        Args:
+            name (str): segment name
+
+        Raises:
+            FileNotFoundError: segment isn't allocated in the arena
+        """
+        index = self._find(name)
+        if index is None:
+            raise FileNotFoundError(f"{name}: no such segment in {self._name}")
+        entry = self._directory[index]
+        return ArenaSlice(self._sm, name, int(entry["offset"]), int(entry["size"]))
+
+    def names(self) -> List[str]:
+        count = int(self._header[3])
+        return [key.decode() for key in self._directory["key"][:count]]
+
+    def market_data(self, market: Market, interval: intervals_type, **kwargs):
+        """market_data.
+        MarketDataRepository hosted in the arena, writer if the arena is the writer
+        """
+        from .market_data_repository import MarketDataRepository
+
+        return MarketDataRepository(
+            market=market,
+            interval=interval,
+            create=not self._reader,
+            arena=self,
+            **kwargs,
+        )
+
+    def market_stat(self, market: Market, interval: intervals_type, **kwargs):
+        """market_stat.
+        MarketStatRepository hosted in the arena, writer if the arena is the writer
+        """
+        from .market_stat_repository import MarketStatRepository
+
+        return MarketStatRepository(
+            market=market,
+            interval=interval,
+            create=not self._reader,
+            arena=self,
+            **kwargs,
+        )
+
+    def close(self) -> None:
+        """close.
+        repositories hosted in the arena should be closed before
+        """
+        del self._header, self._directory
+        self._sm.close()
+        if not self._reader:
+            self._sm.unlink()
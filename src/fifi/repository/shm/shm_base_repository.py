@@ -1,18 +1,98 @@
-from typing import Optional
+import asyncio
+import os
+import threading
+import time
+import zlib
+from enum import Enum
+from typing import Literal, Optional, Sequence, Tuple, Type, Union
 import numpy as np
+import numpy.typing as npt
+from numpy.lib.recfunctions import structured_to_unstructured
 from functools import wraps
 from sys import version_info
 from multiprocessing.shared_memory import SharedMemory
 from multiprocessing.resource_tracker import unregister
 
+from ...enums import SHMHeader
+from ...exceptions import SHMLayoutException, SHMSnapshotException
+from ...helpers.futex import Futex, wait_executor
 from ...helpers.get_logger import LoggerFactory
+from .compact_dtypes import compact_dtype
+from .mapped_file import MappedFile
+from .shm_arena import ArenaSlice, SHMArena
+
+# header is a fixed block of int64 slots at the beginning of each segment,
+# 128 bytes keeps the data block cache-line aligned
+HEADER_SLOTS = 16
+HEADER_SIZE = HEADER_SLOTS * 8
+# longest single sleep of a waiting reader, it bounds the delay of a missed wake up
+WAIT_SLICE = 0.1
+MAGIC = int.from_bytes(b"FIFISHM\0", "little")
+LAYOUT_VERSION = 1
+
+
+def fingerprint(schema: Optional[Type[Enum]]) -> int:
+    """fingerprint.
+    stable 32 bits fingerprint of the column enum names and values
+
+    Args:
+        schema (Optional[Type[Enum]]): schema
+    """
+    if schema is None:
+        return 0
+    members = ",".join(f"{member.name}={member.value}" for member in schema)
+    return zlib.crc32(f"{schema.__name__}:{members}".encode())
+
+
+def _encode_dtype(dtype: np.dtype) -> int:
+    if dtype.names:
+        # structured dtypes are rebuilt from the schema, only their fields are checked
+        return zlib.crc32(str(dtype.descr).encode())
+    return int.from_bytes(dtype.str.encode().ljust(8, b"\0"), "little")
+
+
+def _decode_dtype(code: int) -> np.dtype:
+    return np.dtype(code.to_bytes(8, "little").rstrip(b"\0").decode())
 
 
 def check_reader(func):
+    """check_reader.
+    guards writer methods against readers and wraps the outermost write in
+    the segment seqlock, the counter is odd while the write is in progress so
+    readers can detect torn reads without the writer ever waiting on them.
+    readers sleeping on the counter are woken up once the write is committed,
+    the waiters slot counts them and is only ever changed by the readers.
+    """
+
     @wraps(func)
     def wrapper(self, *args, **kwargs):
         if self._reader:
             raise Exception("Reader couldn't set the value!!!")
+        if self._writing:
+            return func(self, *args, **kwargs)
+        self._writing = True
+        self._header[SHMHeader.SEQ.value] += 1
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self._header[SHMHeader.SEQ.value] += 1
+            self._writing = False
+            if self._header[SHMHeader.WAITERS.value]:
+                self._futex.wake()
+
+    return wrapper
+
+
+def check_generation(func):
+    """check_generation.
+    remaps the segment before the access when the writer has moved the rows to
+    a resized segment, the check is a single compare of the header slot.
+    """
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self._header[SHMHeader.GENERATION.value] != self._generation:
+            self._remap()
         return func(self, *args, **kwargs)
 
     return wrapper
@@ -20,23 +100,98 @@ def check_reader(func):
 
 class SHMBaseRepository:
     _name: str
+    _header: np.ndarray
     _data: np.ndarray
     _rows: int
     _columns: int
-    _sm: SharedMemory
+    _dtype: np.dtype
+    _schema: Optional[Type[Enum]]
+    _sm: Union[SharedMemory, MappedFile, ArenaSlice]
+    _arena: Optional[SHMArena] = None
     _reader: bool
+    _ring: bool
+    _order: Literal["C", "F"]
+    _fields: Optional[Tuple[str, ...]] = None
+    _writing: bool = False
+    _directory: Optional[str] = None
+    _flush_interval: Optional[float] = None
+    _flusher: Optional[threading.Thread] = None
+    _futex: Futex
+    _seen_seq: int
+    _generation: int
+    _retired: list
+    _registry = None
     health = None
 
     def __init__(
-        self, name: str, rows: int, columns: int, create: bool = False
+        self,
+        name: str,
+        rows: Optional[int] = None,
+        columns: Optional[int] = None,
+        create: bool = False,
+        ring: bool = False,
+        schema: Optional[Type[Enum]] = None,
+        dtype: npt.DTypeLike = np.double,
+        directory: Optional[str] = None,
+        flush_interval: Optional[float] = None,
+        arena: Optional[SHMArena] = None,
+        order: Literal["C", "F"] = "C",
+        compact: bool = False,
     ) -> None:
+        """__init__.
+        writer describes the layout in the segment header, readers map the
+        segment from the header so they don't need rows, columns or dtype.
+
+        Args:
+            name (str): shared memory segment name
+            rows (Optional[int]): number of rows, required for the writer
+            columns (Optional[int]): number of columns, taken from the schema if not given
+            create (bool): writer creates the segment, reader connects to it
+            ring (bool): writer keeps rows in a ring buffer, rollover only moves
+                the write head instead of shifting the whole array. readers take
+                this flag from the segment header.
+            schema (Optional[Type[Enum]]): column enum, its fingerprint is stored in
+                the header and checked by readers
+            dtype (npt.DTypeLike): dtype of the data block
+            directory (Optional[str]): keeps the segment in a memory-mapped file of
+                this directory instead of shared memory, a writer reopening a file
+                with the same layout keeps its rows
+            flush_interval (Optional[float]): a thread of the writer flushes the file
+                to disk every `flush_interval` seconds, only with directory
+            arena (Optional[SHMArena]): hosts the segment in this arena instead of
+                its own shared memory segment
+            order (Literal["C", "F"]): memory layout of the data block, "F" keeps
+                every column contiguous. readers take it from the segment header.
+            compact (bool): rows are records of a structured dtype with a compact type
+                per column derived from the schema, instead of `dtype`. readers take
+                it from the segment header.
+        """
         self._name = name
         self.LOGGER = LoggerFactory().get(self._name)
-        self._rows = rows
-        self._columns = columns
+        self._schema = schema
+        if columns is None and schema is not None:
+            columns = len(schema)
+        self._rows = rows  # type: ignore
+        self._columns = columns  # type: ignore
+        self._dtype = np.dtype(dtype)
+        if compact:
+            if schema is None or order == "F":
+                raise ValueError(
+                    f"{self._name}: compact layout needs a row-major schema"
+                )
+            self._dtype = compact_dtype(schema)
+        self._directory = directory
+        self._flush_interval = flush_interval
+        self._flusher = None
+        self._stop_flusher = threading.Event()
+        self._arena = arena
+        # segments replaced by a resize, views into them stay valid until close
+        self._retired = []
 
         if create:
             self._reader = False
+            if rows is None or columns is None:
+                raise ValueError(f"{self._name}: writer needs rows and columns")
             try:
                 self.create()
             except FileExistsError:
@@ -47,27 +202,227 @@ class SHMBaseRepository:
             self._reader = True
             self.connect()
 
+        self._map_header()
+        restored = (
+            create and self._directory is not None and self._restorable(ring, order)
+        )
+        if restored:
+            self.LOGGER.info(f"{self._name}: restored from {self._sm.name}")
+            # writer may have died in the middle of a write
+            self._header[SHMHeader.SEQ.value] += self._header[SHMHeader.SEQ.value] & 1
+            self._header[SHMHeader.WAITERS.value] = 0
+        elif create:
+            self._write_header(ring, order, compact)
+        else:
+            self.read_header()
+        self._generation = int(self._header[SHMHeader.GENERATION.value])
+
+        self._map_data()
+        # initial value
+        if create and not restored:
+            self._data[:] = 0
+        if create and directory is not None and flush_interval is not None:
+            # the disk writes stay out of the write path of the writer
+            self._flusher = threading.Thread(
+                target=self._flush_periodically, name=f"{name}_flusher", daemon=True
+            )
+            self._flusher.start()
+
+    def _map_header(self) -> None:
+        self._header = np.ndarray(
+            shape=(HEADER_SLOTS,),
+            dtype=np.int64,
+            buffer=self._sm.buf,
+        )
+        self._futex = Futex(self._header.ctypes.data + SHMHeader.SEQ.value * 8)
+        self._seen_seq = int(self._header[SHMHeader.SEQ.value])
+
+    def _write_header(self, ring: bool, order: str, compact: bool) -> None:
+        self._header.fill(0)
+        self._header[SHMHeader.VERSION.value] = LAYOUT_VERSION
+        self._header[SHMHeader.DTYPE.value] = _encode_dtype(self._dtype)
+        self._header[SHMHeader.ROWS.value] = self._rows
+        self._header[SHMHeader.COLUMNS.value] = self._columns
+        self._header[SHMHeader.FINGERPRINT.value] = fingerprint(self._schema)
+        self._header[SHMHeader.RING.value] = int(ring)
+        self._header[SHMHeader.ORDER.value] = int(order == "F")
+        self._header[SHMHeader.COMPACT.value] = int(compact)
+        self._header[SHMHeader.HEAD.value] = self._rows - 1
+        # magic goes last, the segment is ready to attach from now on
+        self._header[SHMHeader.MAGIC.value] = MAGIC
+
+    def _map_data(self) -> None:
+        self._order = "F" if self._header[SHMHeader.ORDER.value] else "C"
+        self._fields = self._dtype.names
+
         # access to arrays
         try:
             self._data = np.ndarray(
-                shape=(self._rows, self._columns),
-                dtype=np.double,
+                shape=(self._rows,) if self._fields else (self._rows, self._columns),
+                dtype=self._dtype,
                 buffer=self._sm.buf,
+                offset=HEADER_SIZE,
+                order=self._order,
             )
         except TypeError:
             self.LOGGER.error(
                 f"It probably happens because of wrong configuration not same as Monitoring Service.."
             )
             raise
-        # initial value
-        if create:
-            self._data.fill(0)
+        self._ring = bool(self._header[SHMHeader.RING.value])
+
+    def _remap(self) -> None:
+        """_remap.
+        reader follows the writer to the resized segment of the same name
+        """
+        self.LOGGER.info(
+            f"{self._name}: segment is resized, mapping generation {self._header[SHMHeader.GENERATION.value]}"
+        )
+        self._retired.append(self._sm)
+        seen_seq = self._seen_seq
+        self.connect()
+        self._map_header()
+        # the counter carries on in the new segment, a pending update isn't lost
+        self._seen_seq = seen_seq
+        self.read_header()
+        self._generation = int(self._header[SHMHeader.GENERATION.value])
+        self._map_data()
+
+    @check_reader
+    def resize(self, rows: int) -> None:
+        """resize.
+        moves the rows into a new segment of `rows` rows under the same name and
+        publishes a new generation in the old header, readers remap on their next
+        access. the latest rows are kept when the segment shrinks.
+
+        Args:
+            rows (int): new number of rows
+        """
+        if self._arena is not None:
+            raise ValueError(f"{self._name}: segments of an arena can't be resized")
+        if rows < 1:
+            raise ValueError(f"{self._name}: resize needs at least one row")
+        history = np.array(self.extract_data())
+        keep = min(rows, self._rows)
+        old_header, old_futex = self._header, self._futex
+        # readers keep their mapping of the old segment until they remap
+        self._sm.unlink()
+        self._retired.append(self._sm)
+        self._rows = rows
+        self.create()
+        self._map_header()
+        self._write_header(self._ring, self._order, bool(self._fields))
+        # the write is still in progress, check_reader commits it on the new header
+        self._header[SHMHeader.SEQ.value] = old_header[SHMHeader.SEQ.value]
+        self._generation += 1
+        self._header[SHMHeader.GENERATION.value] = self._generation
+        self._map_data()
+        self._data[:] = 0
+        self._data[rows - keep :] = history[len(history) - keep :]
+
+        old_header[SHMHeader.GENERATION.value] = self._generation
+        old_header[SHMHeader.SEQ.value] += 1
+        old_futex.wake()
+        if self._registry is not None:
+            self._registry.resized(self)
+        self.LOGGER.info(f"{self._name}: resized to {rows} rows")
+
+    def read_header(self) -> None:
+        """read_header.
+        takes the layout of the segment from its header and checks it against
+        what this reader expects.
+
+        Raises:
+            SHMLayoutException: segment isn't written by this layout or doesn't
+                match the columns/schema of the reader
+        """
+        if self._header[SHMHeader.MAGIC.value] != MAGIC:
+            raise SHMLayoutException(f"{self._name}: segment has no valid header")
+        version = int(self._header[SHMHeader.VERSION.value])
+        if version != LAYOUT_VERSION:
+            raise SHMLayoutException(
+                f"{self._name}: layout version {version} is not supported, expected {LAYOUT_VERSION}"
+            )
+        columns = int(self._header[SHMHeader.COLUMNS.value])
+        if self._columns is not None and self._columns != columns:
+            raise SHMLayoutException(
+                f"{self._name}: segment has {columns} columns, expected {self._columns}"
+            )
+        if self._schema is not None:
+            if self._header[SHMHeader.FINGERPRINT.value] != fingerprint(self._schema):
+                raise SHMLayoutException(
+                    f"{self._name}: segment isn't written with {self._schema.__name__} columns"
+                )
+        rows = int(self._header[SHMHeader.ROWS.value])
+        if self._rows is not None and self._rows != rows:
+            self.LOGGER.debug(
+                f"{self._name}: mapping {rows} rows instead of {self._rows}"
+            )
+        self._rows = rows
+        self._columns = columns
+        if self._header[SHMHeader.COMPACT.value]:
+            if self._schema is None:
+                raise SHMLayoutException(
+                    f"{self._name}: compact segment needs the schema of its columns"
+                )
+            self._dtype = compact_dtype(self._schema)
+            if self._header[SHMHeader.DTYPE.value] != _encode_dtype(self._dtype):
+                raise SHMLayoutException(
+                    f"{self._name}: segment is written with other compact types"
+                )
+        else:
+            self._dtype = _decode_dtype(int(self._header[SHMHeader.DTYPE.value]))
+        size = HEADER_SIZE + self._rows * self._row_size
+        if self._sm.size < size:
+            raise SHMLayoutException(
+                f"{self._name}: segment is {self._sm.size} bytes, header describes {size}"
+            )
+
+    def _restorable(self, ring: bool, order: str) -> bool:
+        """_restorable.
+        whether the existing file holds a segment with the layout of this writer
+        """
+        header = self._header
+        return (
+            header[SHMHeader.MAGIC.value] == MAGIC
+            and header[SHMHeader.VERSION.value] == LAYOUT_VERSION
+            and header[SHMHeader.DTYPE.value] == _encode_dtype(self._dtype)
+            and header[SHMHeader.ROWS.value] == self._rows
+            and header[SHMHeader.COLUMNS.value] == self._columns
+            and header[SHMHeader.FINGERPRINT.value] == fingerprint(self._schema)
+            and header[SHMHeader.RING.value] == int(ring)
+            and header[SHMHeader.ORDER.value] == int(order == "F")
+            and header[SHMHeader.COMPACT.value] == int(bool(self._dtype.names))
+        )
+
+    @property
+    def _path(self) -> str:
+        return os.path.join(self._directory, self._name)  # type: ignore
+
+    @property
+    def _row_size(self) -> int:
+        if self._dtype.names:
+            return self._dtype.itemsize
+        return self._columns * self._dtype.itemsize
 
     def create(self) -> None:
-        size = self._rows * self._columns * 8
+        size = HEADER_SIZE + self._rows * self._row_size
+        if self._arena is not None:
+            self._sm = self._arena.allocate(self._name, size)
+            return
+        if self._directory is not None:
+            os.makedirs(self._directory, exist_ok=True)
+            self._sm = MappedFile(self._path, create=True, size=size)
+            return
         self._sm = SharedMemory(name=self._name, create=True, size=size)
 
     def connect(self) -> None:
+        if self._arena is not None:
+            self._sm = self._arena.segment(self._name)
+            return
+        if self._directory is not None:
+            self._sm = MappedFile(self._path)
+            return
         if version_info.major == 3 and version_info.minor <= 12:
             self._sm = SharedMemory(name=self._name)
             unregister(self._sm._name, "shared_memory")
@@ -75,22 +430,387 @@ class SHMBaseRepository:
             self._sm = SharedMemory(name=self._name, track=False)
 
     def close(self) -> None:
-        if self.health:
-            self.health.close()
+        if self._flusher is not None:
+            self._stop_flusher.set()
+            self._flusher.join()
+            self._flusher = None
+        try:
+            if self.health:
+                self.health.close()
+            if self._registry is not None:
+                registry, self._registry = self._registry, None
+                registry.unregister(self._name)
+        finally:
+            # the segment is released even if the companions fail
+            self._close_segment()
+
+    def _close_segment(self) -> None:
+        for segment in self._retired:
+            segment.close()
+        self._retired.clear()
+        if self._directory is not None:
+            if not self._reader:
+                # health flushed its own file when it was closed
+                self._sm.flush()
+            # the file outlives the writer
+            self._sm.close()
+            return
         self._sm.close()
         if not self._reader:
             self._sm.unlink()
 
+    def flush(self) -> None:
+        """flush.
+        writes the memory-mapped file to disk, shared memory has nothing to flush
+        """
+        if self.health:
+            self.health.flush()
+        if isinstance(self._sm, MappedFile):
+            self._sm.flush()
+
+    def _flush_periodically(self) -> None:
+        while not self._stop_flusher.wait(self._flush_interval):
+            try:
+                self.flush()
+            except (OSError, ValueError) as ex:
+                # the writer goes on, the next round or close flushes again
+                self.LOGGER.error(f"{self._name}: periodic flush failed: {ex}")
+
+    def _last(self) -> int:
+        """_last.
+        physical index of the latest row
+        """
+        if self._ring:
+            return int(self._header[SHMHeader.HEAD.value])
+        return -1
+
+    def _index(self, offset: int) -> int:
+        """_index.
+        physical index of a row given by its negative offset from the latest one,
+        -1 is the latest row, -2 the one before it and so on.
+
+        Args:
+            offset (int): offset
+        """
+        if self._ring:
+            return (int(self._header[SHMHeader.HEAD.value]) + offset + 1) % self._rows
+        return offset
+
+    def _column(self, column: int) -> np.ndarray:
+        """_column.
+        view of a whole column in physical order
+        """
+        if self._fields:
+            return self._data[self._fields[column]]
+        return self._data[:, column]
+
+    @check_generation
+    def _value(self, column: int, row: Optional[int] = None):
+        """_value.
+        value of a cell, the latest row by default
+        """
+        if row is None:
+            row = self._last()
+        if self._fields:
+            return self._data[self._fields[column]][row]
+        return self._data[row, column]
+
+    def _set_value(self, column: int, value, row: Optional[int] = None) -> None:
+        if row is None:
+            row = self._last()
+        if self._fields:
+            self._data[self._fields[column]][row] = value
+        else:
+            self._data[row, column] = value
+
+    def _add_value(self, column: int, value) -> None:
+        self._set_value(column, self._value(column) + value)
+
+    def _row_values(self, row: int) -> np.ndarray:
+        """_row_values.
+        copy of a row as doubles ordered by columns
+        """
+        if self._fields:
+            return np.array(self._data[row].tolist(), dtype=np.double)
+        return np.array(self._data[row], dtype=np.double)
+
+    def _fill_row(self, row: int, values) -> None:
+        if self._fields:
+            self._data[row] = tuple(values)
+        else:
+            self._data[row] = values
+
+    @check_reader
     def new_row(self) -> None:
-        self._data[0].fill(0)
+        if self._ring:
+            head = (int(self._header[SHMHeader.HEAD.value]) + 1) % self._rows
+            self._data[head] = 0
+            self._header[SHMHeader.HEAD.value] = head
+            return
+        self._data[0] = 0
         self._data[:] = np.roll(self._data, shift=-1, axis=0)
 
+    @check_generation
     def extract_data(self, _from: Optional[int] = None, _to: Optional[int] = None):
-        data = self._data
-        if _from and _to:
-            data = data[_from:_to]
-        elif _from:
-            data = data[_from:]
-        elif _to:
-            data = data[:_to]
+        if self._ring:
+            return self._extract_ring(_from, _to)
+        return self._data[_from:_to]
+
+    def _ring_range(self, _from: Optional[int], _to: Optional[int]):
+        """_ring_range.
+        physical start and count of time ordered rows in the ring buffer
+        """
+        start, stop, _ = slice(_from, _to).indices(self._rows)
+        count = max(stop - start, 0)
+        # oldest row lives right after the write head
+        oldest = (int(self._header[SHMHeader.HEAD.value]) + 1) % self._rows
+        return (oldest + start) % self._rows, count
+
+    def _extract_ring(self, _from: Optional[int], _to: Optional[int]) -> np.ndarray:
+        """_extract_ring.
+        slices rows in time order out of the ring buffer, it returns a view
+        when the requested rows don't wrap around the end of the buffer.
+
+        Args:
+            _from (Optional[int]): _from
+            _to (Optional[int]): _to
+        """
+        start, count = self._ring_range(_from, _to)
+        if start + count <= self._rows:
+            return self._data[start : start + count]
+        # the copy keeps the memory order of the segment
+        data = np.empty(
+            (count,) + self._data.shape[1:], dtype=self._data.dtype, order=self._order
+        )
+        split = self._rows - start
+        data[:split] = self._data[start:]
+        data[split:] = self._data[: count - split]
         return data
+
+    @check_generation
+    def extract_column(
+        self, column: int, _from: Optional[int] = None, _to: Optional[int] = None
+    ) -> np.ndarray:
+        """extract_column.
+        one column of the rows in time order, only this column is copied when
+        the rows wrap around the ring. with the column-major layout the result
+        is contiguous.
+
+        Args:
+            column (int): column index
+            _from (Optional[int]): _from
+            _to (Optional[int]): _to
+        """
+        values = self._column(column)
+        if not self._ring:
+            return values[_from:_to]
+        start, count = self._ring_range(_from, _to)
+        if start + count <= self._rows:
+            return values[start : start + count]
+        return np.concatenate((values[start:], values[: start + count - self._rows]))
+
+    @property
+    def _time_column(self) -> int:
+        if self._schema is None or "TIME" not in self._schema.__members__:
+            raise ValueError(f"{self._name}: segment has no TIME column")
+        return self._schema["TIME"].value
+
+    def _search_time(self, ts: float, side: Literal["left", "right"] = "left") -> int:
+        """_search_time.
+        binary searches the TIME column, in ring mode the two sorted parts of
+        the buffer are searched one after the other.
+
+        Returns:
+            int: time ordered index where ts would be inserted
+        """
+        times = self._column(self._time_column)
+        if not self._ring:
+            return int(np.searchsorted(times, ts, side=side))
+        oldest = (int(self._header[SHMHeader.HEAD.value]) + 1) % self._rows
+        older = times[oldest:]
+        index = int(np.searchsorted(older, ts, side=side))
+        if index < len(older) or not oldest:
+            return index
+        return len(older) + int(np.searchsorted(times[:oldest], ts, side=side))
+
+    @check_generation
+    def extract_by_time(self, start: float, end: float) -> np.ndarray:
+        """extract_by_time.
+        rows with start <= time < end, a view unless the rows wrap around the ring
+
+        Args:
+            start (float): start time
+            end (float): end time, exclusive
+        """
+        return self.extract_data(self._search_time(start), self._search_time(end))
+
+    @check_generation
+    def row_at(self, ts: float) -> Optional[np.ndarray]:
+        """row_at.
+        the row which covers ts, it's the last row with time <= ts
+
+        Args:
+            ts (float): time
+
+        Returns:
+            Optional[np.ndarray]: view of the row, None if ts is older than the window
+        """
+        index = self._search_time(ts, side="right") - 1
+        if index < 0:
+            return None
+        row = self._data[self._index(index - self._rows)]
+        if not row[self._time_column]:
+            return None
+        return row
+
+    @check_generation
+    def snapshot(
+        self,
+        _from: Optional[int] = None,
+        _to: Optional[int] = None,
+        retries: int = 100,
+    ) -> np.ndarray:
+        """snapshot.
+        consistent copy of the rows, the copy is retried while the writer is
+        in the middle of a write or has written during the copy.
+
+        Args:
+            _from (Optional[int]): _from
+            _to (Optional[int]): _to
+            retries (int): maximum number of copy attempts
+
+        Returns:
+            np.ndarray: copy of the rows in time order, as doubles with the compact layout
+        """
+        for _ in range(retries):
+            seq = self._header[SHMHeader.SEQ.value]
+            if seq & 1:
+                # give the writer a chance to finish
+                time.sleep(0)
+                continue
+            data = np.array(self.extract_data(_from, _to))
+            if self._header[SHMHeader.SEQ.value] == seq:
+                if self._fields:
+                    return structured_to_unstructured(data, dtype=np.double)
+                return data
+        raise SHMSnapshotException(
+            f"couldn't take a consistent snapshot of {self._name} in {retries} retries"
+        )
+
+    @property
+    @check_generation
+    def version(self) -> int:
+        """version.
+        seqlock counter of the segment, it changes with every committed write.
+        a caller reading it before a copy can skip the next copy while it's unchanged.
+        """
+        return int(self._header[SHMHeader.SEQ.value])
+
+    @check_generation
+    def get_columns(
+        self,
+        columns: Sequence[int],
+        _from: Optional[int] = None,
+        _to: Optional[int] = None,
+        out: Optional[np.ndarray] = None,
+        retries: int = 100,
+    ) -> np.ndarray:
+        """get_columns.
+        consistent copy of several columns in time order, all of them come from
+        the same committed write. every column is contiguous in the result.
+
+        Args:
+            columns (Sequence[int]): column indexes
+            _from (Optional[int]): _from
+            _to (Optional[int]): _to
+            out (Optional[np.ndarray]): buffer of shape (len(columns), rows) to copy
+                into, a previous result can be passed to reuse it
+            retries (int): maximum number of copy attempts
+
+        Returns:
+            np.ndarray: the columns as rows of `out` or of a new array, doubles
+                with the compact layout
+        """
+        start, stop, _ = slice(_from, _to).indices(self._rows)
+        count = max(stop - start, 0)
+        shape = (len(columns), count)
+        if out is None:
+            out = np.empty(shape, dtype=np.double if self._fields else self._dtype)
+        elif out.shape != shape:
+            raise ValueError(
+                f"{self._name}: out has shape {out.shape}, expected {shape}"
+            )
+        for _ in range(retries):
+            seq = self._header[SHMHeader.SEQ.value]
+            if seq & 1:
+                # give the writer a chance to finish
+                time.sleep(0)
+                continue
+            if self._ring:
+                # the head moves with every roll over, so every attempt reads it again
+                start, count = self._ring_range(_from, _to)
+            split = min(count, self._rows - start)
+            for i, column in enumerate(columns):
+                values = self._column(column)
+                out[i, :split] = values[start : start + split]
+                # rows wrapping around the end of the ring
+                out[i, split:] = values[: count - split]
+            if self._header[SHMHeader.SEQ.value] == seq:
+                return out
+        raise SHMSnapshotException(
+            f"couldn't take a consistent copy of {self._name} in {retries} retries"
+        )
+
+    @check_generation
+    def wait_for_update(self, timeout: Optional[float] = None) -> bool:
+        """wait_for_update.
+        blocks until the writer commits a write which this instance hasn't seen yet.
+
+        Args:
+            timeout (Optional[float]): timeout in seconds, None waits forever
+
+        Returns:
+            bool: True if the segment is updated, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            seq = int(self._header[SHMHeader.SEQ.value])
+            if seq != self._seen_seq and not seq & 1:
+                self._seen_seq = seq
+                return True
+            wait = WAIT_SLICE
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            # the count is raised before the futex compares the counter, and the
+            # slice bounds a wakeup lost to a racing update of the count
+            self._header[SHMHeader.WAITERS.value] += 1
+            try:
+                self._futex.wait(seq, wait)
+            finally:
+                self._header[SHMHeader.WAITERS.value] -= 1
+
+    async def updated(self, timeout: Optional[float] = None) -> bool:
+        """updated.
+        asyncio version of wait_for_update, the blocking wait runs in slices on the
+        shared futex wait executor, not the default one, so a cancelled waiter
+        doesn't hold a thread for long. see wait_executor for its limit.
+
+        Args:
+            timeout (Optional[float]): timeout in seconds, None waits forever
+
+        Returns:
+            bool: True if the segment is updated, False on timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            wait = WAIT_SLICE
+            if deadline is not None:
+                wait = min(wait, max(deadline - loop.time(), 0))
+            if await loop.run_in_executor(wait_executor(), self.wait_for_update, wait):
+                return True
+            if deadline is not None and loop.time() >= deadline:
+                return False
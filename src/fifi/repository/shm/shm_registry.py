@@ -0,0 +1,377 @@
+import fcntl
+import os
+import time
+from contextlib import contextmanager
+import numpy as np
+from typing import Dict, Optional, Tuple
+from multiprocessing.shared_memory import SharedMemory
+from multiprocessing.resource_tracker import register, unregister
+
+from ...enums import Market
+from ...exceptions import SHMLayoutException, SHMSnapshotException
+from ...types.market import intervals_type
+from ...helpers.get_logger import LoggerFactory
+from ...helpers.process import pid_alive
+from .shm_arena import SHMArena
+
+REGISTRY_MAGIC = int.from_bytes(b"FIFIREG\0", "little")
+REGISTRY_VERSION = 2
+# magic, version, entries, count, seq
+REGISTRY_HEADER_SIZE = 64
+MAGIC, VERSION, ENTRIES, COUNT, SEQ = range(5)
+ENTRY_DTYPE = np.dtype(
+    [
+        ("name", "S64"),
+        ("kind", "S16"),
+        ("market", "S32"),
+        ("interval", "S8"),
+        ("rows", "<i8"),
+        ("columns", "<i8"),
+        ("pid", "<i8"),
+        # backing store of the segment, a directory of files or an arena
+        ("directory", "S256"),
+        ("arena", "S64"),
+    ]
+)
+# how long an attaching process waits for the creator to finish the header
+ATTACH_TIMEOUT = 1.0
+
+RegistryKey = Tuple[str, Market, Optional[str]]
+
+
+def _kinds() -> Dict[str, type]:
+    from .market_data_repository import MarketDataRepository
+    from .market_stat_repository import MarketStatRepository
+    from .order_book_repository import OrderBookRepository
+    from .trade_tape_repository import TradeTapeRepository
+
+    return {
+        "market_data": MarketDataRepository,
+        "market_stat": MarketStatRepository,
+        "order_book": OrderBookRepository,
+        "trade_tape": TradeTapeRepository,
+    }
+
+
+class SHMRegistry:
+    """SHMRegistry.
+    small index segment which lists the live repository segments of the host
+    with their shapes and writers. writers register their segments, readers
+    look them up and attach lazily on first use:
+
+        registry = SHMRegistry()
+        closes = registry[Market.BTCUSD_PERP, "1m"].get_closes()
+
+    the first process to open the registry creates it and nobody unlinks it.
+    registration is rare and serialized by a lock on the segment, the table
+    is guarded by a seqlock so readers never take the lock.
+    """
+
+    def __init__(self, name: str = "fifi_registry", entries: int = 1024) -> None:
+        """__init__.
+
+        Args:
+            name (str): shared memory segment name of the registry
+            entries (int): capacity of the table, only used by the creator
+        """
+        self._name = name
+        self.LOGGER = LoggerFactory().get(self._name)
+        # cached readers with the pid of their writer and the registry version
+        # they were looked up at
+        self._handles: Dict[RegistryKey, Tuple[object, int, int]] = {}
+        # arenas attached for the readers of segments hosted in them
+        self._arenas: Dict[str, SHMArena] = {}
+        self._closed = False
+        try:
+            self._sm = SharedMemory(
+                name=name,
+                create=True,
+                size=REGISTRY_HEADER_SIZE + entries * ENTRY_DTYPE.itemsize,
+            )
+            created = True
+        except FileExistsError:
+            self._attach()
+            created = False
+        # the registry outlives every process which uses it
+        unregister(self._sm._name, "shared_memory")  # type: ignore
+
+        self._header = np.ndarray(shape=(8,), dtype=np.int64, buffer=self._sm.buf)
+        if created:
+            self._header[VERSION] = REGISTRY_VERSION
+            self._header[ENTRIES] = entries
+            self._header[MAGIC] = REGISTRY_MAGIC
+        else:
+            self._read_header()
+        self._table = np.ndarray(
+            shape=(int(self._header[ENTRIES]),),
+            dtype=ENTRY_DTYPE,
+            buffer=self._sm.buf,
+            offset=REGISTRY_HEADER_SIZE,
+        )
+
+    def _attach(self) -> None:
+        deadline = time.monotonic() + ATTACH_TIMEOUT
+        while True:
+            try:
+                self._sm = SharedMemory(name=self._name)
+                return
+            except ValueError:
+                # the creator hasn't sized the segment yet
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.001)
+
+    def _read_header(self) -> None:
+        deadline = time.monotonic() + ATTACH_TIMEOUT
+        while self._header[MAGIC] != REGISTRY_MAGIC:
+            if time.monotonic() > deadline:
+                raise SHMLayoutException(f"{self._name}: segment is not a registry")
+            time.sleep(0.001)
+        if self._header[VERSION] != REGISTRY_VERSION:
+            raise SHMLayoutException(
+                f"{self._name}: registry version {self._header[VERSION]} is not supported"
+            )
+
+    @property
+    def version(self) -> int:
+        """version.
+        changes with every registration, a service can poll it to pick up new segments
+        """
+        return int(self._header[SEQ])
+
+    def register(
+        self,
+        kind: str,
+        repository,
+        market: Market,
+        interval: Optional[intervals_type] = None,
+    ) -> None:
+        """register.
+        lists the segment of a writer, it replaces an entry with the same name and
+        the repository unregisters itself on close.
+
+        Args:
+            kind (str): market_data, market_stat, order_book or trade_tape
+            repository: writer repository
+            market (Market): market
+            interval (Optional[intervals_type]): interval of candle repositories
+        """
+        if kind not in _kinds():
+            raise ValueError(f"{kind}: unknown kind of repository")
+        if repository._reader:
+            raise Exception("Reader couldn't register the segment!!!")
+        directory = (
+            os.path.abspath(repository._directory).encode()
+            if repository._directory is not None
+            else b""
+        )
+        if len(directory) > ENTRY_DTYPE["directory"].itemsize:
+            raise ValueError(f"{directory!r}: directory path is too long to register")
+        arena = (
+            repository._arena._name.encode() if repository._arena is not None else b""
+        )
+        entry = (
+            repository._name.encode(),
+            kind.encode(),
+            market.value.encode(),
+            (interval or "").encode(),
+            repository._rows,
+            repository._columns,
+            os.getpid(),
+            directory,
+            arena,
+        )
+        with self._locked():
+            names = self._table["name"][: int(self._header[COUNT])]
+            found = np.flatnonzero(names == entry[0])
+            if not len(found):
+                found = np.flatnonzero(names == b"")
+            index = int(found[0]) if len(found) else int(self._header[COUNT])
+            if index == len(self._table):
+                raise SHMLayoutException(f"{self._name}: registry is full")
+            self._table[index] = entry
+            self._header[COUNT] = max(int(self._header[COUNT]), index + 1)
+        repository._registry = self
+
+    def unregister(self, name: str) -> None:
+        if self._closed:
+            # the registry went away first, there is nothing left to update
+            return
+        with self._locked():
+            count = int(self._header[COUNT])
+            for index in np.flatnonzero(self._table["name"][:count] == name.encode()):
+                self._table[index] = np.zeros((), dtype=ENTRY_DTYPE)
+
+    @contextmanager
+    def _locked(self):
+        """_locked.
+        serializes writers across processes and makes the change odd for readers
+        """
+        fcntl.flock(self._sm._fd, fcntl.LOCK_EX)  # type: ignore
+        self._header[SEQ] += 1
+        try:
+            yield
+        finally:
+            self._header[SEQ] += 1
+            fcntl.flock(self._sm._fd, fcntl.LOCK_UN)  # type: ignore
+
+    def resized(self, repository) -> None:
+        """resized.
+        updates the shape of a registered segment after a resize
+        """
+        if self._closed:
+            return
+        with self._locked():
+            count = int(self._header[COUNT])
+            names = self._table["name"][:count]
+            for index in np.flatnonzero(names == repository._name.encode()):
+                self._table["rows"][index] = repository._rows
+
+    def entries(self, retries: int = 100) -> np.ndarray:
+        """entries.
+        consistent copy of the live entries, entries of dead writers are skipped
+
+        Returns:
+            np.ndarray: records of ENTRY_DTYPE
+        """
+        table = self._table_copy(retries)
+        alive = [pid_alive(int(entry["pid"])) for entry in table]
+        return table[np.array(alive, dtype=bool)]
+
+    def _table_copy(self, retries: int = 100) -> np.ndarray:
+        """_table_copy.
+        consistent copy of the registered entries, dead writers included
+        """
+        for _ in range(retries):
+            seq = self._header[SEQ]
+            if seq & 1:
+                time.sleep(0)
+                continue
+            table = self._table[: int(self._header[COUNT])].copy()
+            if self._header[SEQ] == seq:
+                return table[table["name"] != b""]
+        raise SHMSnapshotException(
+            f"couldn't take a consistent copy of {self._name} in {retries} retries"
+        )
+
+    def _key(self, key) -> RegistryKey:
+        # a bare market has no interval, so it only finds market data without one
+        if isinstance(key, Market):
+            key = (key, None)
+        market, interval, *kind = key
+        return (kind[0] if kind else "market_data", market, interval)
+
+    def find(self, key) -> Optional[np.void]:
+        """find.
+        live entry of a key, see __getitem__ for the keys
+        """
+        return self._find(self._key(key))
+
+    def _find(self, key: RegistryKey) -> Optional[np.void]:
+        kind, market, interval = key
+        # only the writer of the match is checked for liveness
+        for entry in self._table_copy():
+            if (
+                entry["kind"] == kind.encode()
+                and entry["market"] == market.value.encode()
+                and entry["interval"] == (interval or "").encode()
+                and pid_alive(int(entry["pid"]))
+            ):
+                return entry
+        return None
+
+    def __contains__(self, key) -> bool:
+        return self.find(key) is not None
+
+    def __getitem__(self, key):
+        """__getitem__.
+        reader of a registered segment, attached on first use and cached.
+        keys are (market, interval) for market data, (market, interval, kind)
+        for the other candle repositories and (market, None, kind) for order
+        books and trade tapes. a cached reader is attached again when another
+        writer has registered the segment since. while the registry is unchanged
+        a cached lookup only checks that its writer is alive.
+
+        Raises:
+            KeyError: segment isn't registered by a live writer
+        """
+        key = self._key(key)
+        cached = self._handles.get(key)
+        if cached is not None:
+            handle, pid, seq = cached
+            if self._header[SEQ] == seq and pid_alive(pid):
+                return handle
+        seq = int(self._header[SEQ])
+        entry = self._find(key)
+        if cached is not None:
+            if entry is not None and int(entry["pid"]) == cached[1]:
+                self._handles[key] = (cached[0], cached[1], seq)
+                return cached[0]
+            # the writer is gone or restarted, the reader maps its old segment
+            del self._handles[key]
+            cached[0].close()  # type: ignore
+        if entry is None:
+            raise KeyError(f"{key}: no such segment in {self._name}")
+        kind, market, interval = key
+        kwargs = {"interval": interval} if interval else {}
+        if entry["directory"]:
+            kwargs["directory"] = entry["directory"].decode()
+        if entry["arena"]:
+            kwargs["arena"] = self._arena(entry["arena"].decode())
+        handle = _kinds()[kind](market=market, **kwargs)
+        self._handles[key] = (handle, int(entry["pid"]), seq)
+        return handle
+
+    def _arena(self, name: str) -> SHMArena:
+        arena = self._arenas.get(name)
+        if arena is None:
+            arena = self._arenas[name] = SHMArena(name)
+        return arena
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def market_data(self, market: Market, interval: intervals_type, **kwargs):
+        """market_data.
+        MarketDataRepository writer registered in the registry
+        """
+        repository = _kinds()["market_data"](
+            market=market, interval=interval, create=True, **kwargs
+        )
+        self.register("market_data", repository, market, interval)
+        return repository
+
+    def market_stat(self, market: Market, interval: intervals_type, **kwargs):
+        """market_stat.
+        MarketStatRepository writer registered in the registry
+        """
+        repository = _kinds()["market_stat"](
+            market=market, interval=interval, create=True, **kwargs
+        )
+        self.register("market_stat", repository, market, interval)
+        return repository
+
+    def close(self, unlink: bool = False) -> None:
+        """close.
+        closes the readers attached by the registry, writers close their own
+        repositories
+
+        Args:
+            unlink (bool): removes the registry of the host, only for a tear down
+        """
+        for handle, *_ in self._handles.values():
+            handle.close()  # type: ignore
+        self._handles.clear()
+        for arena in self._arenas.values():
+            arena.close()
+        self._arenas.clear()
+        self._closed = True
+        del self._header, self._table
+        self._sm.close()
+        if unlink:
+            # the segment was untracked on open, unlink untracks it again
+            register(self._sm._name, "shared_memory")  # type: ignore
+            self._sm.unlink()
@@ -0,0 +1,154 @@
+import time
+import numpy as np
+from typing import Optional
+
+from ...enums import Market, SHMHeader
+from ...enums.market import Trade
+from ...exceptions import SHMOverrunException, SHMSnapshotException
+from ...helpers.get_logger import LoggerFactory
+from .shm_base_repository import SHMBaseRepository, check_generation, check_reader
+from .shm_arena import SHMArena
+
+
+class TradeTapeRepository(SHMBaseRepository):
+    """TradeTapeRepository.
+    fixed capacity tape of the raw trades of a market. trade n lives in row
+    n % capacity and the header counts the trades ever appended, every reader
+    instance keeps its own cursor into this sequence.
+    """
+
+    def __init__(
+        self,
+        market: Market,
+        create: bool = False,
+        capacity: int = 65536,
+        from_oldest: bool = False,
+        directory: Optional[str] = None,
+        arena: Optional[SHMArena] = None,
+    ) -> None:
+        """__init__.
+
+        Args:
+            market (Market): market
+            create (bool): writer creates the tape, reader connects to it
+            capacity (int): number of trades kept, only for the writer
+            from_oldest (bool): reader starts at the oldest trade on the tape
+                instead of the next appended one
+            directory (Optional[str]): keeps the tape in a memory-mapped file
+            arena (Optional[SHMArena]): hosts the tape in this arena
+        """
+        super().__init__(
+            name=f"trade_tape_{market.value}",
+            rows=capacity,
+            create=create,
+            schema=Trade,
+            directory=directory,
+            arena=arena,
+        )
+        self._market = market
+        self.LOGGER = LoggerFactory().get(self._name)
+        self.cursor = self.oldest if from_oldest else self.written
+
+    @property
+    def capacity(self) -> int:
+        return self._rows
+
+    @property
+    def written(self) -> int:
+        """written.
+        sequence number of the next trade, it's the count of trades ever appended
+        """
+        return int(self._header[SHMHeader.WRITTEN.value])
+
+    @property
+    def oldest(self) -> int:
+        """oldest.
+        sequence number of the oldest trade still on the tape
+        """
+        return max(self.written - self._rows, 0)
+
+    @property
+    def lag(self) -> int:
+        """lag.
+        number of trades appended after the cursor
+        """
+        return self.written - self.cursor
+
+    @check_reader
+    def append(
+        self,
+        times: np.ndarray,
+        prices: np.ndarray,
+        sizes: np.ndarray,
+        sides: np.ndarray,
+    ) -> None:
+        """append.
+        appends a batch of trades, they are published together once the batch
+        is on the tape.
+
+        Args:
+            times (np.ndarray): trade times in seconds
+            prices (np.ndarray): trade prices
+            sizes (np.ndarray): trade sizes
+            sides (np.ndarray): positive for buyer trades, negative for seller trades
+        """
+        trades = np.column_stack((times, prices, sizes, np.sign(sides)))
+        count = len(trades)
+        written = self.written
+        # a batch longer than the tape only keeps its latest trades
+        kept = trades[max(count - self._rows, 0) :]
+        rows = (written + count - len(kept) + np.arange(len(kept))) % self._rows
+        self._data[rows] = kept
+        self._header[SHMHeader.WRITTEN.value] = written + count
+
+    @check_generation
+    def poll(self, max_count: Optional[int] = None, retries: int = 100) -> np.ndarray:
+        """poll.
+        trades after the cursor and moves the cursor past them. the batch is a
+        copy of the tape, it stops at the end of the buffer so a wrapped batch
+        takes two polls. the copy is checked against the appends which ran
+        meanwhile, a reader which gets lapped during the copy gets an overrun
+        instead of torn trades.
+
+        Args:
+            max_count (Optional[int]): maximum number of trades in the batch
+            retries (int): maximum number of checks for a pending append
+
+        Raises:
+            SHMOverrunException: the reader fell behind by more than the capacity,
+                the cursor moves to the oldest trade on the tape
+
+        Returns:
+            np.ndarray: (count, len(Trade)) array, empty if there is no new trade
+        """
+        written = self.written
+        self._check_overrun(written)
+        start = self.cursor % self._rows
+        count = min(written - self.cursor, self._rows - start)
+        if max_count is not None:
+            count = min(count, max_count)
+        batch = self._data[start : start + count].copy()
+        # appends which touched the rows during the copy are committed once the
+        # seqlock counter is even, the written count after it covers them
+        for _ in range(retries):
+            if not self._header[SHMHeader.SEQ.value] & 1:
+                break
+            time.sleep(0)
+        else:
+            raise SHMSnapshotException(
+                f"couldn't take a consistent copy of {self._name} in {retries} retries"
+            )
+        self._check_overrun(self.written)
+        self.cursor += count
+        return batch
+
+    def _check_overrun(self, written: int) -> None:
+        if written - self.cursor > self._rows:
+            lost = written - self._rows - self.cursor
+            self.cursor = written - self._rows
+            raise SHMOverrunException(
+                f"{self._name}: reader fell behind, {lost} trades are lost"
+            )
+
+    def resize(self, rows: int) -> None:
+        raise ValueError(f"{self._name}: trade tape can't be resized")
@@ -0,0 +1,65 @@
+import numpy as np
+from typing import Optional
+
+from ...helpers.get_logger import LoggerFactory
+from ...helpers.hyperloglog import check_precision, hll_add, hll_count, hll_merge
+from .shm_base_repository import SHMBaseRepository, check_reader
+from .shm_arena import SHMArena
+
+
+class TraderSketchRepository(SHMBaseRepository):
+    """TraderSketchRepository.
+    HyperLogLog sketches of the traders of a candle repository, one row of
+    2 ** precision uint8 registers per candle. the rows roll over together with
+    the candles so both segments share the same row indexes.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rows: Optional[int] = None,
+        precision: Optional[int] = None,
+        create: bool = False,
+        ring: bool = False,
+        directory: Optional[str] = None,
+        arena: Optional[SHMArena] = None,
+    ) -> None:
+        if precision is not None:
+            check_precision(precision)
+        self._name = name
+        self.LOGGER = LoggerFactory().get(self._name)
+        super().__init__(
+            name=self._name,
+            rows=rows,
+            columns=None if precision is None else 2**precision,
+            create=create,
+            ring=ring,
+            dtype=np.uint8,
+            directory=directory,
+            arena=arena,
+        )
+
+    @property
+    def precision(self) -> int:
+        return self._columns.bit_length() - 1
+
+    def get_sketch(self, row: Optional[int] = None) -> np.ndarray:
+        """get_sketch.
+        view of the registers of a physical row, the latest row by default
+        """
+        return self._data[self._last() if row is None else row]
+
+    def count(self, _from: Optional[int] = None, _to: Optional[int] = None) -> float:
+        """count.
+        estimated distinct traders of the merged sketches of a range of rows
+        """
+        return hll_count(hll_merge(self.extract_data(_from, _to)))
+
+    @check_reader
+    def add(self, hashes: np.ndarray) -> None:
+        hll_add(self.get_sketch(), hashes)
+
+    @check_reader
+    def merge(self, sketch: np.ndarray) -> None:
+        current = self.get_sketch()
+        np.maximum(current, sketch, out=current)
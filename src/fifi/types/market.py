@@ -1,3 +1,12 @@
-from typing import Literal
+from typing import Dict, Literal
 
 intervals_type = Literal["1m", "5m", "30m", "1h", "1d", "1w"]
+
+intervals_seconds: Dict[str, int] = {
+    "1m": 60,
+    "5m": 5 * 60,
+    "30m": 30 * 60,
+    "1h": 60 * 60,
+    "1d": 24 * 60 * 60,
+    "1w": 7 * 24 * 60 * 60,
+}
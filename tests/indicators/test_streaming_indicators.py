@@ -0,0 +1,166 @@
+import math
+import numpy as np
+import pytest
+from src.fifi import MarketDataRepository, MarketStatRepository
+from src.fifi.enums import Market
+from src.fifi.enums.market import MarketStat
+from src.fifi.indicators import (
+    StreamingATR,
+    StreamingHMA,
+    StreamingIndicators,
+    StreamingRSI,
+    StreamingWMA,
+)
+
+
+def wilder(values: np.ndarray, period: int) -> np.ndarray:
+    result = np.full(len(values), np.nan)
+    result[period - 1] = values[:period].mean()
+    for i in range(period, len(values)):
+        result[i] = (result[i - 1] * (period - 1) + values[i]) / period
+    return result
+
+
+def rsi(closes: np.ndarray, period: int) -> np.ndarray:
+    changes = np.diff(closes)
+    gains = wilder(np.maximum(changes, 0), period)
+    losses = wilder(np.maximum(-changes, 0), period)
+    return np.concatenate(([np.nan], 100 - 100 / (1 + gains / losses)))
+
+
+def wma(values: np.ndarray, period: int) -> np.ndarray:
+    weights = np.arange(1, period + 1)
+    result = np.full(len(values), np.nan)
+    for i in range(period - 1, len(values)):
+        result[i] = values[i - period + 1 : i + 1] @ weights / weights.sum()
+    return result
+
+
+@pytest.fixture
+def candles():
+    rng = np.random.default_rng(3)
+    closes = 100 + rng.normal(0, 1, 120).cumsum()
+    highs = closes + rng.uniform(0, 1, 120)
+    lows = closes - rng.uniform(0, 1, 120)
+    return closes, highs, lows
+
+
+class TestStreamingIndicators:
+    def test_rsi(self, candles):
+        closes, _, _ = candles
+        streaming = StreamingRSI(14)
+        values = [streaming.push(close) for close in closes]
+        assert np.allclose(values, rsi(closes, 14), equal_nan=True)
+
+    def test_peek_does_not_commit(self, candles):
+        closes, _, _ = candles
+        streaming = StreamingRSI(5)
+        for close in closes[:-1]:
+            streaming.push(close)
+        peeked = streaming.peek(closes[-1])
+        assert streaming.peek(closes[-1] + 1) != peeked
+        assert streaming.push(closes[-1]) == peeked
+
+    def test_atr(self, candles):
+        closes, highs, lows = candles
+        ranges = np.maximum(
+            highs - lows,
+            np.maximum(
+                np.abs(highs - np.roll(closes, 1)), np.abs(lows - np.roll(closes, 1))
+            ),
+        )
+        ranges[0] = highs[0] - lows[0]
+        streaming = StreamingATR(7)
+        values = [streaming.push(h, l, c) for c, h, l in zip(closes, highs, lows)]
+        assert np.allclose(values, wilder(ranges, 7), equal_nan=True)
+
+    def test_wma(self, candles):
+        closes, _, _ = candles
+        streaming = StreamingWMA(9)
+        values = [streaming.push(close) for close in closes]
+        assert np.allclose(values, wma(closes, 9), equal_nan=True)
+
+    def test_wma_does_not_drift(self):
+        rng = np.random.default_rng(5)
+        closes = 100 + rng.normal(0, 0.01, 100_000).cumsum()
+        # spikes leave rounding errors in running sums
+        closes[rng.integers(0, 90_000, 200)] *= 1e7
+        streaming = StreamingWMA(9)
+        values = [streaming.push(close) for close in closes]
+        assert np.allclose(values[-100:], wma(closes[-108:], 9)[8:], rtol=1e-12)
+
+    def test_hma(self, candles):
+        closes, _, _ = candles
+        raw = 2 * wma(closes, 8) - wma(closes, 16)
+        expected = np.full(len(closes), np.nan)
+        expected[15:] = wma(raw[15:], 4)
+        streaming = StreamingHMA(16)
+        values = [streaming.push(close) for close in closes]
+        assert np.allclose(values, expected, equal_nan=True)
+
+    def test_writes_market_stats(self, candles):
+        closes, highs, lows = candles
+        data = MarketDataRepository(market=Market.ETHUSD, interval="1m", create=True)
+        stats = MarketStatRepository(market=Market.ETHUSD, interval="1m", create=True)
+        indicators = StreamingIndicators(stats)
+        for i, (close, high, low) in enumerate(zip(closes, highs, lows)):
+            data.apply_trades(
+                prices=np.array([closes[i - 1] if i else close, high, low, close]),
+                sizes=np.ones(4),
+                sides=np.ones(4),
+                timestamps=np.full(4, 60.0 * (i + 1)),
+            )
+            indicators.update_from(data)
+
+        assert stats.get_time() == 60 * len(closes)
+        assert stats.get_last_stat(MarketStat.RSI14) == pytest.approx(
+            rsi(closes, 14)[-1]
+        )
+        previous = stats.get_stat(MarketStat.RSI3, -2, -1)[0]
+        assert previous == pytest.approx(rsi(closes, 3)[-2])
+        assert not math.isnan(stats.get_last_stat(MarketStat.HMA))
+        data.close()
+        stats.close()
+
+    def test_update_from_replays_missed_candles(self, candles):
+        closes, highs, lows = candles
+        data = MarketDataRepository(market=Market.ETHUSD, interval="1m", create=True)
+        stats = MarketStatRepository(market=Market.ETHUSD, interval="1m", create=True)
+        indicators = StreamingIndicators(stats)
+        expected = []
+        # the first candle has no trades and no close before it
+        data.set_time(60.0)
+        indicators.update_from(data)
+        minute = 1
+        for i, (close, high, low) in enumerate(zip(closes, highs, lows)):
+            minute += 1
+            if i == 50:
+                # a candle without trades is flat at the previous close
+                data.create_candle()
+                data.set_time(60.0 * minute)
+                expected.append(expected[-1])
+                minute += 1
+            data.apply_trades(
+                prices=np.array([closes[i - 1] if i else close, high, low, close]),
+                sizes=np.ones(4),
+                sides=np.ones(4),
+                timestamps=np.full(4, 60.0 * minute),
+            )
+            expected.append(close)
+            # the poller misses two closes between updates
+            if i % 3 == 0:
+                indicators.update_from(data)
+
+        indicators.update_from(data)
+        # the live candle isn't committed yet
+        assert stats.get_stat(MarketStat.RSI14, -2, -1)[0] == pytest.approx(
+            rsi(np.array(expected[:-1]), 14)[-1]
+        )
+        assert stats.get_last_stat(MarketStat.RSI14) == pytest.approx(
+            rsi(np.array(expected), 14)[-1]
+        )
+        # every committed row has the time of its candle, empty ones too
+        times = stats.get_stat(MarketStat.TIME, -minute, -1)
+        assert np.array_equal(times, 60.0 * np.arange(1, minute))
+        data.close()
+        stats.close()
@@ -0,0 +1,109 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+import numpy as np
+import pytest
+
+from src.fifi import SHMPublisher, SHMSubscriber
+from src.fifi.exceptions import SHMLayoutException
+
+TRADE = np.dtype([("time", "<i8"), ("price", "<f8"), ("size", "<f8")])
+
+
+@pytest.fixture
+def create_subscriber():
+    subscriber = SHMSubscriber("test_channel", lanes=2, capacity=256)
+    yield subscriber
+    subscriber.close()
+
+
+def publish_in_process(channel: str, count: int):
+    publisher = SHMPublisher(channel)
+    for i in range(count):
+        # the lane fits a few messages, back off until the subscriber catches up
+        while not asyncio.run(publisher.publish({"index": i})):
+            time.sleep(0.001)
+    publisher.close()
+
+
+class TestSHMQueue:
+    @pytest.mark.asyncio
+    async def test_publish_and_get_messages(self, create_subscriber):
+        subscriber: SHMSubscriber = create_subscriber
+        publisher = await SHMPublisher.create("test_channel")
+        assert await subscriber.get_messages() == []
+        for i in range(3):
+            assert await publisher.publish({"index": i})
+        assert await subscriber.get_messages() == [{"index": i} for i in range(3)]
+        await publisher.publish({"index": 3})
+        await publisher.publish({"index": 4})
+        assert await subscriber.get_last_message() == {"index": 4}
+        assert await subscriber.get_last_message() is None
+        publisher.close()
+
+    @pytest.mark.asyncio
+    async def test_lane_wraps_and_drops_when_full(self, create_subscriber):
+        subscriber: SHMSubscriber = create_subscriber
+        publisher = SHMPublisher("test_channel")
+        received = []
+        for i in range(50):
+            assert await publisher.publish({"index": i})
+            if i % 3 == 2:
+                received += await subscriber.get_messages()
+        received += await subscriber.get_messages()
+        assert received == [{"index": i} for i in range(50)]
+        # 256 bytes of lane fit only a few messages
+        published = [await publisher.publish({"index": i}) for i in range(50)]
+        assert not all(published)
+        assert publisher.dropped == published.count(False)
+        assert len(await subscriber.get_messages()) == published.index(False)
+        with pytest.raises(ValueError):
+            await publisher.publish(b"x" * 512)
+        publisher.close()
+
+    def test_lanes_of_many_publishers(self, create_subscriber):
+        subscriber: SHMSubscriber = create_subscriber
+        first = SHMPublisher("test_channel")
+        second = SHMPublisher("test_channel")
+        assert {first.lane, second.lane} == {0, 1}
+        with pytest.raises(SHMLayoutException):
+            SHMPublisher("test_channel")
+        second.close()
+        third = SHMPublisher("test_channel")
+        assert third.lane == second.lane
+        first.close()
+        third.close()
+
+    def test_across_processes(self, create_subscriber):
+        subscriber: SHMSubscriber = create_subscriber
+        process = multiprocessing.Process(
+            target=publish_in_process, args=("test_channel", 20)
+        )
+        process.start()
+        messages = []
+        while len(messages) < 20:
+            batch = subscriber.wait_for_messages(timeout=5)
+            assert len(batch)
+            messages += batch
+        process.join()
+        assert messages == [{"index": i} for i in range(20)]
+
+    @pytest.mark.asyncio
+    async def test_records_and_async_receive(self):
+        subscriber = SHMSubscriber("test_records", record_dtype=TRADE, capacity=4096)
+        publisher = SHMPublisher("test_records", record_dtype=TRADE)
+        assert not len(await subscriber.receive(timeout=0.05))
+
+        records = np.array([(i, 100.0 + i, 1.0) for i in range(3)], dtype=TRADE)
+        timer = threading.Timer(0.05, lambda: asyncio.run(publisher.publish(records)))
+        timer.start()
+        received = await subscriber.receive(timeout=2)
+        timer.join()
+        assert np.array_equal(received, records)
+        await publisher.publish((3, 103.0, 2.0))
+        assert (await subscriber.get_last_message())["price"] == 103
+        with pytest.raises(SHMLayoutException):
+            SHMPublisher("test_records")
+        publisher.close()
+        subscriber.close()
@@ -0,0 +1,63 @@
+import pytest
+
+from src.fifi.enums import OverflowPolicy
+from src.fifi.redis.message_buffer import MessageBuffer
+
+
+class TestMessageBuffer:
+    def test_drop_oldest(self):
+        buffer = MessageBuffer(3)
+        for i in range(5):
+            assert buffer.put(i)
+        assert buffer.take() == [2, 3, 4]
+        assert buffer.stats() == {
+            "received": 5,
+            "dropped": 2,
+            "buffered": 0,
+            "high_water_mark": 3,
+        }
+
+    def test_drop_newest(self):
+        buffer = MessageBuffer(3, OverflowPolicy.DROP_NEWEST)
+        assert [buffer.put(i) for i in range(5)] == [True, True, True, False, False]
+        assert buffer.popleft() == 0
+        assert buffer.take() == [1, 2]
+        assert buffer.dropped == 2
+
+    def test_keep_latest(self):
+        buffer = MessageBuffer(
+            2, OverflowPolicy.KEEP_LATEST, key=lambda message: message.get("market")
+        )
+        for message in [
+            {"market": "btc", "price": 1},
+            {"market": "eth", "price": 2},
+            {"market": "btc", "price": 3},
+            {"price": 4},
+        ]:
+            buffer.put(message)
+        # the stale btc is replaced, then eth is evicted for the keyless message
+        assert buffer.take() == [{"market": "btc", "price": 3}, {"price": 4}]
+        assert buffer.dropped == 2
+        with pytest.raises(ValueError):
+            MessageBuffer(2, OverflowPolicy.KEEP_LATEST)
+
+    def test_keyless_messages_are_kept(self):
+        buffer = MessageBuffer(
+            4, OverflowPolicy.KEEP_LATEST, key=lambda message: message.get("market")
+        )
+        # keyless messages are numbered, the numbers can't clash with keys
+        for message in [{"price": 1}, {"market": 0, "price": 2}, {"price": 3}]:
+            buffer.put(message)
+        assert buffer.take() == [{"price": 1}, {"market": 0, "price": 2}, {"price": 3}]
+        assert not buffer.dropped
+
+    def test_block_and_take_by_predicate(self):
+        buffer = MessageBuffer(2, "block")
+        buffer.put(("a", 1))
+        assert not buffer.blocked()
+        buffer.put(("b", 2))
+        assert buffer.blocked()
+        assert buffer.take(lambda item: item[0] == "b") == [("b", 2)]
+        assert not buffer.blocked()
+        assert len(buffer) == 1
+        assert not MessageBuffer().full()
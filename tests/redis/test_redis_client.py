@@ -5,7 +5,7 @@ import pytest_asyncio
 
 from src.fifi import RedisSubscriber, RedisPublisher
 from src.fifi import LoggerFactory
-
+from src.fifi.enums import OverflowPolicy
 
 CHANNEL: str = "test_channel"
 LOGGER = LoggerFactory().get(__name__)
@@ -69,3 +69,169 @@ async def test_performance(setup_redis_subscriber):
     LOGGER.info(f"{circulation_time=}")
 
     assert circulation_time < 0.1
+
+
+@pytest.mark.redis
+@pytest.mark.asyncio
+async def test_multiplexed_subscriber():
+    subscriber = await RedisSubscriber.create(
+        channels=["test_channel_a"], patterns=["test_pattern_*"]
+    )
+    publisher = await RedisPublisher.create("test_channel_a")
+    pattern_publisher = await RedisPublisher.create("test_pattern_btc")
+    await asyncio.sleep(1)
+
+    await publisher.publish({"data": "a"})
+    await pattern_publisher.publish({"data": "btc"})
+    await asyncio.sleep(1)
+    assert await subscriber.get_all_messages() == {
+        "test_channel_a": [{"data": "a"}],
+        "test_pattern_btc": [{"data": "btc"}],
+    }
+
+    await subscriber.unsubscribe("test_channel_a")
+    await subscriber.subscribe("test_channel_b")
+    await publisher.publish({"data": "a"})
+    await (await RedisPublisher.create("test_channel_b")).publish({"data": "b"})
+    await asyncio.sleep(1)
+    assert await subscriber.get_messages("test_channel_a") == []
+    assert await subscriber.get_last_message("test_channel_b") == {"data": "b"}
+    assert subscriber.thread.is_alive()
+    subscriber.close()
+
+
+@pytest.mark.redis
+@pytest.mark.asyncio
+async def test_asyncio_subscriber():
+    subscriber = await RedisSubscriber.create(CHANNEL, threaded=False)
+    publisher = await RedisPublisher.create(CHANNEL)
+    await asyncio.sleep(1)
+
+    for i in range(3):
+        await publisher.publish({"data": i})
+    assert await subscriber.next(timeout=1) == {"data": 0}
+    received = []
+    async for message in subscriber:
+        received.append(message)
+        if len(received) == 2:
+            break
+    assert received == [{"data": 1}, {"data": 2}]
+    with pytest.raises(asyncio.TimeoutError):
+        await subscriber.next(timeout=0.1)
+    assert subscriber.thread is None
+    subscriber.close()
+
+
+@pytest.mark.redis
+@pytest.mark.asyncio
+async def test_bounded_subscriber():
+    subscriber = await RedisSubscriber.create(
+        CHANNEL, max_messages=2, overflow=OverflowPolicy.KEEP_LATEST, key="market"
+    )
+    publisher = await RedisPublisher.create(CHANNEL)
+    await asyncio.sleep(1)
+
+    for i, market in enumerate(["btc", "eth", "btc", "sol"]):
+        await publisher.publish({"market": market, "price": i})
+    await asyncio.sleep(1)
+    assert await subscriber.get_messages() == [
+        {"market": "btc", "price": 2},
+        {"market": "sol", "price": 3},
+    ]
+    assert subscriber.get_stats() == {
+        "received": 4,
+        "dropped": 2,
+        "buffered": 0,
+        "high_water_mark": 2,
+    }
+    subscriber.close()
+
+
+@pytest.mark.redis
+@pytest.mark.asyncio
+async def test_bounded_asyncio_subscriber():
+    subscriber = await RedisSubscriber.create(
+        CHANNEL, threaded=False, overflow=OverflowPolicy.KEEP_LATEST, key="market"
+    )
+    publisher = await RedisPublisher.create(CHANNEL)
+    await asyncio.sleep(1)
+
+    for i in range(3):
+        await publisher.publish({"price": i})
+    await asyncio.sleep(1)
+    # messages without the key field are never replaced
+    assert await subscriber.get_messages() == [{"price": i} for i in range(3)]
+    subscriber.close()
+
+
+@pytest.mark.redis
+@pytest.mark.asyncio
+async def test_subscribe_while_blocked():
+    subscriber = await RedisSubscriber.create(
+        CHANNEL, max_messages=1, overflow=OverflowPolicy.BLOCK
+    )
+    publisher = await RedisPublisher.create(CHANNEL)
+    await asyncio.sleep(1)
+
+    for i in range(3):
+        await publisher.publish({"data": i})
+    await asyncio.sleep(0.5)
+    # the listener waits for room without holding up the commands
+    await asyncio.wait_for(subscriber.subscribe("test_channel_b"), 2)
+    received = []
+    for _ in range(20):
+        received += await subscriber.get_messages(CHANNEL)
+        await asyncio.sleep(0.1)
+    assert received == [{"data": i} for i in range(3)]
+    subscriber.close()
+
+
+@pytest.mark.redis
+@pytest.mark.asyncio
+async def test_batched_publisher(setup_redis_subscriber):
+    subscriber = setup_redis_subscriber
+    publisher = await RedisPublisher.create(CHANNEL, batch_size=3, batch_window=0.1)
+    await asyncio.sleep(1)
+
+    await publisher.publish({"data": 0})
+    await publisher.publish({"data": 1})
+    assert publisher.get_stats()["queued"] == 2
+    await asyncio.sleep(0.5)
+    assert await subscriber.get_messages() == [{"data": 0}, {"data": 1}]
+
+    await publisher.publish_many([{"data": i} for i in range(2, 6)])
+    await publisher.publish({"data": 6})
+    await publisher.close()
+    await asyncio.sleep(0.5)
+    assert await subscriber.get_messages() == [{"data": i} for i in range(2, 7)]
+    stats = publisher.get_stats()
+    assert stats["messages"] == 7
+    assert stats["batches"] == 3
+    assert stats["max_batch_size"] == 4
+
+
+@pytest.mark.redis
+@pytest.mark.asyncio
+async def test_conflating_publisher(setup_redis_subscriber):
+    subscriber = setup_redis_subscriber
+    publisher = await RedisPublisher.create(
+        CHANNEL, conflate_by=("market", "type"), conflate_interval=0.5
+    )
+    await asyncio.sleep(1)
+
+    for i in range(10):
+        await publisher.publish({"market": "btcusd", "type": "candle", "close": i})
+        await publisher.publish({"market": "ethusd", "type": "candle", "close": i})
+    await asyncio.sleep(0.2)
+    # the first message of every key goes out at once
+    assert await subscriber.get_messages() == [
+        {"market": "btcusd", "type": "candle", "close": 0},
+        {"market": "ethusd", "type": "candle", "close": 0},
+    ]
+    await asyncio.sleep(0.6)
+    assert await subscriber.get_messages() == [
+        {"market": "btcusd", "type": "candle", "close": 9},
+        {"market": "ethusd", "type": "candle", "close": 9},
+    ]
+    assert publisher.get_stats()["conflated"] == 16
+    await publisher.close()
@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from redis.exceptions import ConnectionError
+
+from src.fifi import RedisPublisher
+
+
+class BrokenRedis:
+    """redis client whose connection is down"""
+
+    def __init__(self):
+        self.redis = self
+        self.calls = 0
+
+    async def publish(self, channel, payload):
+        self.calls += 1
+        raise ConnectionError("connection refused")
+
+    async def close(self):
+        pass
+
+
+class TestRedisPublisherErrors:
+    @pytest.mark.asyncio
+    async def test_direct_sends_raise(self):
+        publisher = RedisPublisher(BrokenRedis(), "test_channel")
+        with pytest.raises(ConnectionError):
+            await publisher.publish({"price": 1})
+        assert publisher.get_stats()["messages"] == 0
+        await publisher.close()
+
+    @pytest.mark.asyncio
+    async def test_timer_sends_are_logged(self):
+        client = BrokenRedis()
+        publisher = RedisPublisher(client, "test_channel", batch_window=0.01)
+        await publisher.publish({"price": 1})
+        await asyncio.sleep(0.05)
+        assert client.calls == 1
+        assert publisher.get_stats()["messages"] == 0
+        assert not publisher._flushes
+        await publisher.close()
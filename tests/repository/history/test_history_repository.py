@@ -0,0 +1,110 @@
+import numpy as np
+import pytest
+from src.fifi import MarketDataRepository
+from src.fifi.enums import Market
+from src.fifi.enums.market import MarketData, MarketStat
+from src.fifi.repository.history.history_repository import HistoryRepository
+
+
+def make_rows(start: int, count: int) -> np.ndarray:
+    rows = np.zeros((count, len(MarketData)))
+    rows[:, MarketData.TIME.value] = 60 * np.arange(start, start + count)
+    rows[:, MarketData.CLOSE.value] = np.arange(start, start + count)
+    return rows
+
+
+@pytest.fixture
+def create_history(tmp_path):
+    yield HistoryRepository(
+        directory=str(tmp_path),
+        market=Market.BTCUSD_PERP,
+        interval="1m",
+        chunk_rows=10,
+    )
+
+
+class TestHistoryRepository:
+    def test_append_across_chunks(self, create_history):
+        history: HistoryRepository = create_history
+        assert history.append(make_rows(1, 25)) == 25
+        assert history.append(make_rows(20, 10)) == 4
+        assert len(history) == 29
+        assert history.last_time() == 60 * 29
+
+    def test_read_range(self, create_history):
+        history: HistoryRepository = create_history
+        history.append(make_rows(1, 35))
+
+        inside = history.read_range(60 * 12, 60 * 15, [MarketData.CLOSE])
+        assert np.array_equal(inside[MarketData.CLOSE], [12, 13, 14])
+        assert isinstance(inside[MarketData.CLOSE], np.memmap)
+
+        across = history.read_range(60 * 5, 60 * 32)
+        assert np.array_equal(across[MarketData.CLOSE], np.arange(5, 32))
+        assert np.array_equal(across[MarketData.TIME], 60 * np.arange(5, 32))
+
+        assert not len(history.read_range(0, 30)[MarketData.CLOSE])
+        assert np.array_equal(
+            history.read_range(60 * 34, 10**9)[MarketData.CLOSE], [34, 35]
+        )
+
+    def test_open_chunks_are_bounded(self, tmp_path):
+        history = HistoryRepository(
+            directory=str(tmp_path),
+            market=Market.BTCUSD_PERP,
+            interval="1m",
+            chunk_rows=10,
+            max_open_chunks=4,
+        )
+        history.append(make_rows(1, 95))
+        assert len(history._chunks) <= 4
+        across = history.read_range(0, 10**9, [MarketData.CLOSE])
+        assert np.array_equal(across[MarketData.CLOSE], np.arange(1, 96))
+        assert len(history._chunks) <= 4
+        assert history._firsts == [60.0 * i for i in range(1, 96, 10)]
+
+        history.append(make_rows(96, 10))
+        assert np.array_equal(
+            history.read_range(60 * 94, 10**9)[MarketData.CLOSE], np.arange(94, 106)
+        )
+        assert history._firsts[-1] == 60 * 101
+
+    def test_reopen(self, tmp_path, create_history):
+        history: HistoryRepository = create_history
+        history.append(make_rows(1, 15))
+        reopened = HistoryRepository(
+            directory=str(tmp_path),
+            market=Market.BTCUSD_PERP,
+            interval="1m",
+            chunk_rows=10,
+        )
+        assert len(reopened) == 15
+        reopened.append(make_rows(16, 1))
+        assert np.array_equal(
+            history.read_range(0, 10**9)[MarketData.CLOSE], np.arange(1, 17)
+        )
+
+    def test_append_from_repository(self, tmp_path):
+        repo = MarketDataRepository(market=Market.ETHUSD, interval="1m", create=True)
+        repo.apply_trades(
+            prices=np.array([10.0, 11.0, 12.0]),
+            sizes=np.ones(3),
+            sides=np.ones(3),
+            timestamps=np.array([60.0, 120.0, 180.0]),
+        )
+        history = HistoryRepository(
+            directory=str(tmp_path), market=Market.ETHUSD, interval="1m"
+        )
+        assert history.append_from(repo) == 2
+        assert history.append_from(repo) == 0
+        assert np.array_equal(history.read_range(0, 200)[MarketData.CLOSE], [10, 11])
+        repo.close()
+
+    def test_stat_history(self, tmp_path):
+        history = HistoryRepository(
+            directory=str(tmp_path),
+            market=Market.ETHUSD,
+            interval="5m",
+            schema=MarketStat,
+        )
+        assert history._name == "market_stat_ethusd_5m"
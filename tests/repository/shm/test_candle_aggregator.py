@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+from src.fifi import MarketDataRepository
+from src.fifi.enums import Market
+from src.fifi.enums.market import MarketData
+from src.fifi.helpers.hyperloglog import hash_traders
+from src.fifi.repository.shm.candle_aggregator import CandleAggregator
+
+
+@pytest.fixture
+def create_aggregator():
+    base = MarketDataRepository(market=Market.ETHUSD, interval="1m", create=True)
+    aggregator = CandleAggregator(base=base, intervals=["5m", "30m"])
+    yield aggregator
+    aggregator.close()
+    base.close()
+
+
+class TestCandleAggregator:
+    def test_matches_direct_ingestion(self, create_aggregator):
+        aggregator: CandleAggregator = create_aggregator
+        direct = MarketDataRepository(
+            market=Market.ETHUSD_PERP, interval="5m", create=True
+        )
+        rng = np.random.default_rng(7)
+        timestamps = np.sort(rng.uniform(0, 1500, 600)) + 3600
+        prices = 100 + rng.normal(0, 1, 600).cumsum()
+        sizes = rng.uniform(0.1, 2, 600)
+        sides = rng.choice([1, -1], 600)
+        for batch in np.array_split(np.arange(600), 90):
+            args = (prices[batch], sizes[batch], sides[batch], timestamps[batch])
+            aggregator.base.apply_trades(*args)
+            direct.apply_trades(*args)
+            aggregator.update()
+
+        columns = [member.value for member in MarketData]
+        columns.remove(MarketData.UNIQUE_TRADERS.value)
+        aggregated = aggregator.repositories["5m"].extract_data()
+        expected = direct.extract_data()
+        assert np.allclose(aggregated[:, columns], expected[:, columns])
+        direct.close()
+
+    def test_higher_interval_candle(self, create_aggregator):
+        aggregator: CandleAggregator = create_aggregator
+        aggregator.base.apply_trades(
+            prices=np.array([10.0, 12.0, 9.0, 11.0]),
+            sizes=np.array([1.0, 1.0, 1.0, 1.0]),
+            sides=np.array([1, 1, -1, 1]),
+            timestamps=np.array([1800.0, 1900.0, 2000.0, 3500.0]),
+        )
+        aggregator.update()
+        repository = aggregator.repositories["30m"]
+        assert repository.get_time() == 1800
+        assert repository.get_opens()[-1] == 10
+        assert repository.get_highs()[-1] == 12
+        assert repository.get_lows()[-1] == 9
+        assert repository.get_closes()[-1] == 11
+        assert repository.get_vols()[-1] == 4
+        assert repository.get_buyer_count() == 3
+
+    def test_merges_trader_sketches(self):
+        base = MarketDataRepository(
+            market=Market.ETHUSD, interval="1m", create=True, hll_precision=10
+        )
+        aggregator = CandleAggregator(base=base, intervals=["5m"])
+        traders = hash_traders(f"trader-{i}" for i in range(1000))
+        for minute in range(6):
+            base.apply_trades(
+                prices=np.array([100.0]),
+                sizes=np.array([1.0]),
+                sides=np.array([1]),
+                timestamps=np.array([60.0 * (minute + 5)]),
+            )
+            # every minute has 400 traders, overlapping the previous minute
+            base.add_traders(traders[minute * 100 : minute * 100 + 400])
+            aggregator.update()
+        repository = aggregator.repositories["5m"]
+        assert repository.count_traders(_from=-2, _to=-1) == pytest.approx(800, rel=0.1)
+        assert repository.get_unique_traders() == pytest.approx(400, rel=0.1)
+        aggregator.close()
+        base.close()
+
+    def test_rejects_finer_interval(self):
+        base = MarketDataRepository(market=Market.ETHUSD, interval="5m", create=True)
+        with pytest.raises(ValueError):
+            CandleAggregator(base=base, intervals=["1m"])
+        base.close()
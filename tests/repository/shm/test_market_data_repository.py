@@ -4,6 +4,7 @@ import pytest
 from src.fifi import MarketDataRepository
 from src.fifi.enums import Market
 from src.fifi.enums.market import MarketData
+from src.fifi.helpers.hyperloglog import hash_traders, hll_add, hll_count
 
 
 @pytest.fixture
@@ -71,3 +72,183 @@ class TestMarketDataRepository:
 
         repo.create_candle()
         assert not repo._data[-1, :].any()
+
+    def test_ring_create_candle(self):
+        repo = MarketDataRepository(
+            market=Market.ETHUSD_PERP, interval="1m", create=True, rows=4, ring=True
+        )
+        for price in range(1, 7):
+            repo.set_close_price(price)
+            repo.set_last_trade(price)
+            repo.create_candle()
+        assert np.array_equal(repo.get_closes(), [4, 5, 6, 0])
+        assert repo.get_last_trade() == 6
+        repo.close()
+
+    @pytest.mark.parametrize("compact", [False, True])
+    def test_get_ohlcv(self, compact):
+        repo = MarketDataRepository(
+            market=Market.ETHUSD_PERP,
+            interval="1m",
+            create=True,
+            rows=4,
+            ring=True,
+            compact=compact,
+        )
+        version = repo.version
+        for price in range(1, 7):
+            repo.set_open_price(price)
+            repo.set_high_price(price + 1)
+            repo.set_low_price(price - 1)
+            repo.set_close_price(price + 0.5)
+            repo.set_vol(10 * price)
+            repo.create_candle()
+        assert repo.version > version
+
+        opens, highs, lows, closes, vols = repo.get_ohlcv(_from=-3)
+        assert np.array_equal(opens, [5, 6, 0])
+        assert np.array_equal(highs, [6, 7, 0])
+        assert np.array_equal(lows, [4, 5, 0])
+        assert np.array_equal(closes, [5.5, 6.5, 0])
+        assert np.array_equal(vols, [50, 60, 0])
+        assert closes.flags.c_contiguous
+
+        out = np.empty((2, 4))
+        result = repo.get_ohlcv(columns=(MarketData.CLOSE, MarketData.TIME), out=out)
+        assert result is out
+        assert np.array_equal(out[0], [4.5, 5.5, 6.5, 0])
+        with pytest.raises(ValueError):
+            repo.get_ohlcv(_from=-2, out=out)
+
+        version = repo.version
+        repo.get_ohlcv()
+        assert repo.version == version
+        repo.close()
+
+    def test_apply_trades(self, create_repo):
+        repo: MarketDataRepository = create_repo
+        repo.apply_trades(
+            prices=np.array([100.0, 102.0, 99.0, 101.0, 105.0]),
+            sizes=np.array([1.0, 2.0, 1.5, 0.5, 3.0]),
+            sides=np.array([1, -1, 1, 1, -1]),
+            timestamps=np.array([60.0, 70.0, 110.0, 119.0, 125.0]),
+        )
+        closed = repo._data[-2]
+        assert closed[MarketData.TIME.value] == 60
+        assert closed[MarketData.OPEN.value] == 100
+        assert closed[MarketData.HIGH.value] == 102
+        assert closed[MarketData.LOW.value] == 99
+        assert closed[MarketData.CLOSE.value] == 101
+        assert closed[MarketData.VOL.value] == 5
+        assert closed[MarketData.BUYER_VOL.value] == 3
+        assert closed[MarketData.SELLER_VOL.value] == 2
+        assert closed[MarketData.BUYER_COUNT.value] == 3
+        assert closed[MarketData.SELLER_COUNT.value] == 1
+
+        assert repo.get_time() == 120
+        assert repo.get_last_trade() == 105
+        assert repo.get_closes()[-1] == 105
+        assert repo.get_seller_vol() == 3
+        assert repo.get_seller_count() == 1
+
+        repo.apply_trades(
+            prices=np.array([104.0]),
+            sizes=np.array([1.0]),
+            sides=np.array([1]),
+            timestamps=np.array([130.0]),
+        )
+        assert repo.get_time() == 120
+        assert repo.get_lows()[-1] == 104
+        assert repo.get_highs()[-1] == 105
+        assert repo.get_vols()[-1] == 4
+
+    @pytest.mark.parametrize("ring", [False, True])
+    def test_compact_layout(self, ring):
+        repo = MarketDataRepository(
+            market=Market.ETHUSD_PERP,
+            interval="1m",
+            create=True,
+            rows=4,
+            ring=ring,
+            compact=True,
+        )
+        assert repo._data.dtype.itemsize < len(MarketData) * 8
+        assert repo._data.dtype["TIME"] == np.int64
+        for minute in range(1, 7):
+            repo.apply_trades(
+                prices=np.array([100.0 + minute, 99.5 + minute]),
+                sizes=np.array([1.5, 2.0]),
+                sides=np.array([1, -1]),
+                timestamps=np.full(2, 60.0 * minute),
+            )
+        repo.add_unique_traders(3)
+
+        reader = MarketDataRepository(market=Market.ETHUSD_PERP, interval="1m")
+        assert reader._data.dtype == repo._data.dtype
+        assert np.array_equal(reader.get_closes(), [102.5, 103.5, 104.5, 105.5])
+        assert reader.get_highs()[-1] == 106
+        assert reader.get_time() == 360
+        assert reader.get_buyer_count() == 1
+        assert reader.get_unique_traders() == 3
+        snapshot = reader.snapshot()
+        assert snapshot.shape == (4, len(MarketData))
+        assert np.array_equal(snapshot[:, MarketData.VOL.value], [3.5] * 4)
+        reader.close()
+        repo.close()
+
+    @pytest.mark.parametrize("precision", [3, 17])
+    def test_hll_precision_is_checked(self, precision):
+        with pytest.raises(ValueError):
+            MarketDataRepository(
+                market=Market.ETHUSD_PERP,
+                interval="1m",
+                create=True,
+                hll_precision=precision,
+            )
+        with pytest.raises(ValueError):
+            hll_add(np.zeros(2**precision, dtype=np.uint8), hash_traders(["a"]))
+        with pytest.raises(ValueError):
+            hll_count(np.zeros(2**precision, dtype=np.uint8))
+        with pytest.raises(ValueError):
+            hll_count(np.zeros(100, dtype=np.uint8))
+        # nothing was left behind
+        repo = MarketDataRepository(
+            market=Market.ETHUSD_PERP, interval="1m", create=True
+        )
+        repo.close()
+
+    def test_trader_sketches(self):
+        repo = MarketDataRepository(
+            market=Market.ETHUSD_PERP,
+            interval="1m",
+            create=True,
+            rows=4,
+            ring=True,
+            hll_precision=10,
+        )
+        traders = hash_traders(f"0x{i:040x}" for i in range(3000))
+        repo.add_traders(traders[:2000])
+        repo.add_traders(traders[:100])
+        assert repo.get_unique_traders() == pytest.approx(2000, rel=0.1)
+        repo.create_candle()
+        repo.add_traders(traders[1000:])
+        assert repo.get_unique_traders() == pytest.approx(2000, rel=0.1)
+        assert repo.get_trader_sketch(-2).any()
+
+        reader = MarketDataRepository(market=Market.ETHUSD_PERP, interval="1m")
+        assert reader.traders.precision == 10
+        assert reader.count_traders(_from=-2) == pytest.approx(3000, rel=0.1)
+        assert reader.count_traders(_from=-1) == pytest.approx(2000, rel=0.1)
+        reader.close()
+        repo.close()
+
+        plain = MarketDataRepository(
+            market=Market.ETHUSD_PERP, interval="1m", create=True
+        )
+        assert (
+            MarketDataRepository(market=Market.ETHUSD_PERP, interval="1m").traders
+            is None
+        )
+        with pytest.raises(ValueError):
+            plain.add_traders(traders)
+        plain.close()
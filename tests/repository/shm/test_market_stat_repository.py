@@ -25,3 +25,15 @@ class TestMarketDataRepository:
         repo.set_last_stat(MarketStat.RSI14, 55.6)
         rsi14 = repo.get_last_stat(MarketStat.RSI14)
         assert rsi14 == 55.6
+
+    def test_compact_create_candle(self):
+        repo = MarketStatRepository(
+            market=Market.ETHUSD, interval="1m", create=True, compact=True
+        )
+        repo.set_last_stats({MarketStat.RSI14: 55.5, MarketStat.HMA: 101.25})
+        repo.set_time(60)
+        repo.create_candle()
+        assert repo.get_last_stat(MarketStat.RSI14) == 55.5
+        assert repo.get_last_stat(MarketStat.HMA) == 101.25
+        assert np.array_equal(repo.get_stat(MarketStat.TIME, -2, None), [60, 60])
+        repo.close()
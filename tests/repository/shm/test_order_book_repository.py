@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from src.fifi import OrderBookRepository
+from src.fifi.enums import Market
+
+
+@pytest.fixture
+def create_book():
+    book = OrderBookRepository(market=Market.BTCUSD_PERP, create=True, depth=4)
+    book.set_snapshot(
+        bids=np.array([[99.0, 1.0], [100.0, 2.0], [98.0, 3.0]]),
+        asks=np.array([[102.0, 1.0], [101.0, 3.0]]),
+        time=60,
+    )
+    yield book
+    book.close()
+
+
+class TestOrderBookRepository:
+    def test_snapshot(self, create_book):
+        book: OrderBookRepository = create_book
+        bids, asks = book.top(4)
+        assert np.array_equal(bids, [[100, 2], [99, 1], [98, 3], [0, 0]])
+        assert np.array_equal(asks, [[101, 3], [102, 1], [0, 0], [0, 0]])
+        assert book.best_bid() == 100
+        assert book.best_ask() == 101
+        assert book.get_time() == 60
+
+    def test_apply_diff(self, create_book):
+        book: OrderBookRepository = create_book
+        book.apply_diff(
+            bids=np.array([[99.0, 0.0], [100.5, 4.0], [97.0, 1.0], [96.0, 1.0]]),
+            asks=np.array([[101.0, 2.0], [101.0, 5.0], [103.0, 1.0]]),
+        )
+        bids, asks = book.top(4)
+        assert np.array_equal(bids, [[100.5, 4], [100, 2], [98, 3], [97, 1]])
+        assert np.array_equal(asks, [[101, 5], [102, 1], [103, 1], [0, 0]])
+
+    def test_microprice_and_imbalance(self, create_book):
+        book: OrderBookRepository = create_book
+        assert book.mid_price() == 100.5
+        assert book.microprice() == pytest.approx((100 * 3 + 101 * 2) / 5)
+        assert book.imbalance() == pytest.approx(-0.2)
+        assert book.imbalance(2) == pytest.approx(-1 / 7)
+        book.set_snapshot(bids=np.empty((0, 2)), asks=np.array([[101.0, 1.0]]))
+        assert np.isnan(book.microprice())
+
+    def test_reader_reads_views(self, create_book):
+        reader = OrderBookRepository(market=Market.BTCUSD_PERP)
+        bids, _ = reader.top(2)
+        create_book.apply_diff(bids=np.array([[100.0, 7.0]]), asks=np.empty((0, 2)))
+        assert bids[0, 1] == 7
+        assert reader.depth == 4
+        with pytest.raises(Exception):
+            reader.apply_diff(bids=np.array([[100.0, 1.0]]), asks=np.empty((0, 2)))
+        reader.close()
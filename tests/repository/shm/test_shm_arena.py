@@ -0,0 +1,54 @@
+import pytest
+from src.fifi.enums import Market
+from src.fifi.exceptions import SHMLayoutException
+from src.fifi.repository.shm.shm_arena import ALIGNMENT, SHMArena
+
+
+@pytest.fixture
+def create_arena():
+    arena = SHMArena(name="test_arena", create=True, size=1024 * 1024, entries=16)
+    yield arena
+    arena.close()
+
+
+class TestSHMArena:
+    def test_repositories_in_arena(self, create_arena):
+        arena: SHMArena = create_arena
+        data = arena.market_data(Market.BTCUSD_PERP, "1m", rows=50)
+        stat = arena.market_stat(Market.BTCUSD_PERP, "1m", rows=50)
+        assert arena.names() == [
+            "market_data_btcusd_perp_1m",
+            "market_data_health_btcusd_perp_1m",
+            "market_stat_btcusd_perp_1m",
+            "market_stat_health_btcusd_perp_1m",
+        ]
+        data.set_close_price(100)
+        data.health.set_is_updated()
+
+        reader_arena = SHMArena(name="test_arena")
+        reader = reader_arena.market_data(Market.BTCUSD_PERP, "1m")
+        assert reader._reader
+        assert reader.get_closes().shape == (50,)
+        assert reader.get_closes()[-1] == 100
+        assert reader.health.is_updated()
+        with pytest.raises(FileNotFoundError):
+            reader_arena.market_data(Market.ETHUSD, "1m")
+
+        reader.close()
+        reader_arena.close()
+        data.close()
+        stat.close()
+
+    def test_allocate(self, create_arena):
+        arena: SHMArena = create_arena
+        first = arena.allocate("first", 100)
+        second = arena.allocate("second", 100)
+        assert arena.allocate("first", 100).size == 100
+        offsets = arena._directory["offset"][:2]
+        assert not (offsets % ALIGNMENT).any()
+        with pytest.raises(SHMLayoutException):
+            arena.allocate("first", 200)
+        with pytest.raises(SHMLayoutException):
+            arena.allocate("huge", 2 * 1024 * 1024)
+        first.close()
+        second.close()
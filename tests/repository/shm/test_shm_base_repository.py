@@ -1,7 +1,18 @@
+import asyncio
+import multiprocessing
+import threading
+import time
 import pytest
 import numpy as np
+from multiprocessing.shared_memory import SharedMemory
 
-from src.fifi.repository.shm.shm_base_repository import SHMBaseRepository
+from src.fifi.enums import SHMHeader
+from src.fifi.enums.market import HealthStat, MarketData, MarketStat
+from src.fifi.exceptions import SHMLayoutException, SHMSnapshotException
+from src.fifi.repository.shm.shm_base_repository import (
+    SHMBaseRepository,
+    fingerprint,
+)
 
 
 @pytest.fixture
@@ -47,3 +58,395 @@ class TestSHMBaseRepository:
         assert data.base is not None
         assert base_repo._data.base is not None
         assert np.array_equal(data.base, base_repo._data.base)
+
+
+@pytest.fixture
+def create_ring_repo():
+    ring_repo = SHMBaseRepository(
+        name="test_ring",
+        rows=5,
+        columns=5,
+        create=True,
+        ring=True,
+    )
+    yield ring_repo
+    ring_repo.close()
+
+
+class TestSHMRingRepository:
+    def test_new_row(self, create_ring_repo):
+        ring_repo: SHMBaseRepository = create_ring_repo
+        ring_repo._data[:] = np.arange(25).reshape((5, 5))
+        buffer = ring_repo._data
+        ring_repo.new_row()
+        # nothing moved, head just points to the next physical row
+        assert ring_repo._data is buffer
+        assert ring_repo._last() == 0
+        assert not ring_repo._data[ring_repo._last()].any()
+        assert np.array_equal(ring_repo._data[1:], np.arange(5, 25).reshape((4, 5)))
+
+    def test_extract_data_in_time_order(self, create_ring_repo):
+        ring_repo: SHMBaseRepository = create_ring_repo
+        expected = np.zeros((5, 5))
+        for i in range(1, 8):
+            ring_repo.new_row()
+            ring_repo._data[ring_repo._last()] = i
+            expected = np.roll(expected, shift=-1, axis=0)
+            expected[-1] = i
+        assert np.array_equal(ring_repo.extract_data(), expected)
+        assert np.array_equal(ring_repo.extract_data(_from=-3), expected[-3:])
+        assert np.array_equal(ring_repo.extract_data(_to=2), expected[:2])
+        assert np.array_equal(ring_repo.extract_data(1, 3), expected[1:3])
+        assert ring_repo._data[ring_repo._index(-2)][0] == 6
+
+    def test_reader_takes_ring_mode_from_segment(self, create_ring_repo):
+        reader = SHMBaseRepository(name="test_ring", rows=5, columns=5)
+        assert reader._ring
+        create_ring_repo.new_row()
+        assert reader._last() == create_ring_repo._last()
+        reader.close()
+
+
+class TestSHMSnapshot:
+    def test_writes_bump_sequence(self, create_base_repo):
+        base_repo: SHMBaseRepository = create_base_repo
+        seq = base_repo._header[SHMHeader.SEQ.value]
+        base_repo.new_row()
+        assert base_repo._header[SHMHeader.SEQ.value] == seq + 2
+
+    def test_snapshot_is_a_copy(self, create_ring_repo):
+        ring_repo: SHMBaseRepository = create_ring_repo
+        ring_repo._data[:] = np.arange(25).reshape((5, 5))
+        snapshot = ring_repo.snapshot(_from=-2)
+        assert np.array_equal(snapshot, ring_repo.extract_data(_from=-2))
+        ring_repo._data.fill(0)
+        assert snapshot.any()
+
+    def test_snapshot_during_write(self, create_base_repo):
+        base_repo: SHMBaseRepository = create_base_repo
+        # writer is stuck in the middle of a write
+        base_repo._header[SHMHeader.SEQ.value] += 1
+        with pytest.raises(SHMSnapshotException):
+            base_repo.snapshot(retries=3)
+        with pytest.raises(SHMSnapshotException):
+            base_repo.get_columns([0, 1], retries=3)
+
+    def test_get_columns_during_roll_over(self, create_ring_repo):
+        ring_repo: SHMBaseRepository = create_ring_repo
+        for i in range(4, 9):
+            ring_repo.new_row()
+            ring_repo._data[ring_repo._last()] = i
+        ring_repo.new_row()
+        ring_repo._data[ring_repo._last()] = 9
+        reader = SHMBaseRepository(name="test_ring")
+        column = reader._column
+        attempts = []
+
+        def roll_over_once(index):
+            # the writer rolls over in the middle of the first copy
+            if not attempts:
+                ring_repo.new_row()
+                ring_repo._data[ring_repo._last()] = 10
+            attempts.append(index)
+            return column(index)
+
+        reader._column = roll_over_once
+        assert list(reader.get_columns([0])[0]) == [6, 7, 8, 9, 10]
+        assert len(attempts) == 2
+        reader.close()
+
+
+class TestSHMHeader:
+    def test_reader_maps_layout_from_header(self):
+        writer = SHMBaseRepository(
+            name="test_header", rows=7, create=True, schema=HealthStat, dtype=np.int32
+        )
+        reader = SHMBaseRepository(name="test_header", schema=HealthStat)
+        assert reader._data.shape == (7, len(HealthStat))
+        assert reader._data.dtype == np.int32
+        writer._data[-1, HealthStat.TIME.value] = 12
+        assert reader._data[-1, HealthStat.TIME.value] == 12
+        reader.close()
+        writer.close()
+
+    def test_reader_with_other_schema(self):
+        writer = SHMBaseRepository(
+            name="test_header", rows=3, create=True, schema=MarketData
+        )
+        with pytest.raises(SHMLayoutException):
+            SHMBaseRepository(name="test_header", schema=MarketStat)
+        with pytest.raises(SHMLayoutException):
+            SHMBaseRepository(name="test_header", columns=3)
+        writer.close()
+
+    def test_segment_without_header(self):
+        segment = SharedMemory(name="test_header", create=True, size=1024)
+        with pytest.raises(SHMLayoutException):
+            SHMBaseRepository(name="test_header", rows=4, columns=4)
+        segment.close()
+        segment.unlink()
+
+    def test_fingerprint(self):
+        assert fingerprint(MarketData) == fingerprint(MarketData)
+        assert fingerprint(MarketData) != fingerprint(MarketStat)
+        assert fingerprint(None) == 0
+
+
+def wait_in_reader(name: str, updated):
+    reader = SHMBaseRepository(name=name)
+    updated.value = reader.wait_for_update(timeout=5)
+    reader.close()
+
+
+class TestSHMNotification:
+    def test_wait_for_update_timeout(self, create_base_repo):
+        base_repo: SHMBaseRepository = create_base_repo
+        started = time.monotonic()
+        assert not base_repo.wait_for_update(timeout=0.05)
+        assert time.monotonic() - started >= 0.05
+
+    def test_wait_for_update_across_processes(self, create_base_repo):
+        base_repo: SHMBaseRepository = create_base_repo
+        updated = multiprocessing.Value("b", 0)
+        reader = multiprocessing.Process(
+            target=wait_in_reader, args=("test_base", updated)
+        )
+        reader.start()
+        time.sleep(0.3)
+        base_repo.new_row()
+        reader.join(timeout=5)
+        assert updated.value
+
+    def test_wait_for_update_wakes_up(self, create_base_repo):
+        base_repo: SHMBaseRepository = create_base_repo
+        woken = []
+
+        def wait():
+            woken.append(base_repo.wait_for_update(timeout=5))
+            woken.append(time.monotonic())
+
+        waiter = threading.Thread(target=wait)
+        waiter.start()
+        time.sleep(0.2)
+        written = time.monotonic()
+        base_repo.new_row()
+        waiter.join()
+        assert woken[0]
+        assert woken[1] - written < 0.05
+
+    def test_waiters_are_counted(self, create_base_repo):
+        base_repo: SHMBaseRepository = create_base_repo
+        woken = []
+
+        def wait():
+            reader = SHMBaseRepository(name="test_base")
+            woken.append(reader.wait_for_update(timeout=5))
+            woken.append(time.monotonic())
+            reader.close()
+
+        waiters = [threading.Thread(target=wait) for _ in range(2)]
+        for waiter in waiters:
+            waiter.start()
+        time.sleep(0.2)
+        assert base_repo._header[SHMHeader.WAITERS.value] == 2
+        written = time.monotonic()
+        base_repo.new_row()
+        for waiter in waiters:
+            waiter.join()
+        assert woken[0] and woken[2]
+        assert max(woken[1], woken[3]) - written < 0.05
+        assert base_repo._header[SHMHeader.WAITERS.value] == 0
+
+    @pytest.mark.asyncio
+    async def test_updated(self, create_base_repo):
+        base_repo: SHMBaseRepository = create_base_repo
+        asyncio.get_running_loop().call_later(0.05, base_repo.new_row)
+        assert await base_repo.updated(timeout=2)
+        assert not await base_repo.updated(timeout=0.05)
+
+
+class TestSHMFileBacked:
+    def test_writer_restores_rows(self, tmp_path):
+        writer = SHMBaseRepository(
+            name="test_file", rows=5, columns=5, create=True, directory=str(tmp_path)
+        )
+        writer._data[:] = np.arange(25).reshape((5, 5))
+        writer.new_row()
+        writer.close()
+        assert (tmp_path / "test_file").exists()
+
+        writer = SHMBaseRepository(
+            name="test_file", rows=5, columns=5, create=True, directory=str(tmp_path)
+        )
+        expected = np.roll(np.arange(25).reshape((5, 5)), shift=-1, axis=0)
+        expected[-1] = 0
+        assert np.array_equal(writer._data, expected)
+        assert not writer._header[SHMHeader.SEQ.value] & 1
+
+        reader = SHMBaseRepository(name="test_file", directory=str(tmp_path))
+        assert np.array_equal(reader.snapshot(), expected)
+        reader.close()
+        writer.close()
+
+    def test_other_layout_starts_empty(self, tmp_path):
+        writer = SHMBaseRepository(
+            name="test_file", rows=5, columns=5, create=True, directory=str(tmp_path)
+        )
+        writer._data.fill(1)
+        writer.close()
+        writer = SHMBaseRepository(
+            name="test_file", rows=8, columns=5, create=True, directory=str(tmp_path)
+        )
+        assert writer._data.shape == (8, 5)
+        assert not writer._data.any()
+        writer.close()
+
+    def test_periodic_flush(self, tmp_path):
+        writer = SHMBaseRepository(
+            name="test_file",
+            rows=5,
+            columns=5,
+            create=True,
+            directory=str(tmp_path),
+            flush_interval=0.01,
+        )
+        flushes = threading.Event()
+        flush = writer._sm.flush
+
+        def counted_flush():
+            flush()
+            flushes.set()
+
+        writer._sm.flush = counted_flush
+        # the write doesn't wait for the disk, the thread of the writer flushes
+        writer.new_row()
+        assert flushes.wait(timeout=2)
+        flusher = writer._flusher
+        writer.close()
+        assert not flusher.is_alive()
+
+
+class TestSHMTimeQueries:
+    @pytest.fixture(params=[False, True])
+    def create_time_repo(self, request):
+        time_repo = SHMBaseRepository(
+            name="test_time", rows=6, create=True, ring=request.param, schema=MarketData
+        )
+        # 8 candles in a 6 rows window, times 60..480
+        for i in range(1, 9):
+            time_repo.new_row()
+            time_repo._data[time_repo._last(), MarketData.TIME.value] = 60 * i
+            time_repo._data[time_repo._last(), MarketData.CLOSE.value] = i
+        yield time_repo
+        time_repo.close()
+
+    def test_extract_by_time(self, create_time_repo):
+        time_repo: SHMBaseRepository = create_time_repo
+        rows = time_repo.extract_by_time(180, 361)
+        assert np.array_equal(rows[:, MarketData.CLOSE.value], [3, 4, 5, 6])
+        rows = time_repo.extract_by_time(0, 10**9)
+        assert np.array_equal(rows[:, MarketData.CLOSE.value], np.arange(3, 9))
+        assert not len(time_repo.extract_by_time(500, 600))
+
+    def test_row_at(self, create_time_repo):
+        time_repo: SHMBaseRepository = create_time_repo
+        assert time_repo.row_at(300)[MarketData.CLOSE.value] == 5
+        assert time_repo.row_at(359)[MarketData.CLOSE.value] == 5
+        assert time_repo.row_at(10**9)[MarketData.CLOSE.value] == 8
+        assert time_repo.row_at(100) is None
+
+    def test_extract_data_with_zero(self, create_time_repo):
+        time_repo: SHMBaseRepository = create_time_repo
+        assert not len(time_repo.extract_data(_to=0))
+        assert len(time_repo.extract_data(_from=0)) == 6
+
+
+class TestSHMColumnMajor:
+    @pytest.mark.parametrize("ring", [False, True])
+    def test_columns_are_contiguous(self, ring):
+        writer = SHMBaseRepository(
+            name="test_order", rows=5, columns=4, create=True, ring=ring, order="F"
+        )
+        expected = np.zeros((5, 4))
+        for i in range(1, 8):
+            writer.new_row()
+            writer._data[writer._last()] = np.arange(4) + 10 * i
+            expected = np.roll(expected, shift=-1, axis=0)
+            expected[-1] = np.arange(4) + 10 * i
+
+        reader = SHMBaseRepository(name="test_order")
+        assert reader._data.flags.f_contiguous
+        assert np.array_equal(reader.extract_data(), expected)
+        assert np.array_equal(reader.snapshot(), expected)
+        for column in range(4):
+            values = reader.extract_column(column, _from=-4)
+            assert values.flags.c_contiguous
+            assert np.array_equal(values, expected[-4:, column])
+        reader.close()
+        writer.close()
+
+
+class TestSHMResize:
+    @pytest.mark.parametrize("ring", [False, True])
+    @pytest.mark.parametrize("file_backed", [False, True])
+    def test_reader_follows_resize(self, ring, file_backed, tmp_path):
+        directory = str(tmp_path) if file_backed else None
+        writer = SHMBaseRepository(
+            name="test_resize",
+            rows=4,
+            columns=3,
+            create=True,
+            ring=ring,
+            directory=directory,
+        )
+        for i in range(1, 7):
+            writer.new_row()
+            writer._data[writer._last()] = i
+        reader = SHMBaseRepository(name="test_resize", directory=directory)
+        old_view = reader.extract_data()
+        seq = writer._header[SHMHeader.SEQ.value]
+
+        writer.resize(6)
+        assert writer._header[SHMHeader.SEQ.value] == seq + 2
+        assert not writer._header[SHMHeader.SEQ.value] & 1
+        assert reader._rows == 4
+        expected = np.array([0, 0, 3, 4, 5, 6])
+        assert np.array_equal(reader.extract_column(0), expected)
+        assert reader._rows == 6
+        assert reader._generation == 1
+        # views taken before the resize stay readable
+        assert np.array_equal(old_view[:, 0], [3, 4, 5, 6])
+
+        writer.new_row()
+        writer._data[writer._last()] = 7
+        assert np.array_equal(reader.snapshot()[:, 0], [0, 3, 4, 5, 6, 7])
+
+        writer.resize(2)
+        assert np.array_equal(reader.extract_column(0), [6, 7])
+        assert reader._generation == 2
+        reader.close()
+        writer.close()
+
+    def test_resize_wakes_up_waiters(self, create_base_repo):
+        reader = SHMBaseRepository(name="test_base")
+        thread = threading.Thread(target=create_base_repo.resize, args=(8,))
+        thread.start()
+        assert reader.wait_for_update(timeout=1)
+        thread.join()
+        assert reader.extract_data().shape == (8, 5)
+        reader.close()
+
+    def test_remap_keeps_the_pending_update(self, create_base_repo):
+        reader = SHMBaseRepository(name="test_base")
+        create_base_repo.resize(8)
+        # the read remaps before the reader waits for the resize
+        assert reader.extract_data().shape == (8, 5)
+        assert reader.wait_for_update(timeout=0)
+        assert not reader.wait_for_update(timeout=0)
+        reader.close()
+
+    def test_reader_couldnt_resize(self, create_base_repo):
+        reader = SHMBaseRepository(name="test_base")
+        with pytest.raises(Exception):
+            reader.resize(8)
+        reader.close()
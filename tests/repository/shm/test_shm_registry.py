@@ -0,0 +1,130 @@
+import os
+import numpy as np
+import pytest
+from multiprocessing.shared_memory import SharedMemory
+from src.fifi import SHMRegistry
+from src.fifi.enums import Market
+from src.fifi.repository.shm.shm_arena import SHMArena
+from src.fifi.repository.shm.order_book_repository import OrderBookRepository
+
+
+@pytest.fixture
+def create_registry():
+    registry = SHMRegistry(name="test_registry", entries=8)
+    yield registry
+    registry.close(unlink=True)
+
+
+class TestSHMRegistry:
+    def test_lazy_readers(self, create_registry):
+        registry: SHMRegistry = create_registry
+        version = registry.version
+        data = registry.market_data(Market.BTCUSD_PERP, "1m", rows=20)
+        stat = registry.market_stat(Market.BTCUSD_PERP, "1m", rows=20)
+        assert registry.version > version
+        data.set_close_price(100)
+
+        reader_registry = SHMRegistry(name="test_registry")
+        entries = reader_registry.entries()
+        assert list(entries["name"]) == [
+            b"market_data_btcusd_perp_1m",
+            b"market_stat_btcusd_perp_1m",
+        ]
+        assert list(entries["rows"]) == [20, 20]
+        assert (Market.BTCUSD_PERP, "1m") in reader_registry
+        assert (Market.BTCUSD_PERP, "5m") not in reader_registry
+        assert reader_registry.get((Market.ETHUSD, "1m")) is None
+        with pytest.raises(KeyError):
+            reader_registry[Market.BTCUSD_PERP, "5m"]
+
+        reader = reader_registry[Market.BTCUSD_PERP, "1m"]
+        assert reader._reader
+        assert reader.get_closes()[-1] == 100
+        assert reader_registry[Market.BTCUSD_PERP, "1m"] is reader
+        assert reader_registry[Market.BTCUSD_PERP, "1m", "market_stat"]._reader
+
+        data.resize(40)
+        assert list(reader_registry.entries()["rows"]) == [40, 20]
+        stat.close()
+        assert (Market.BTCUSD_PERP, "1m", "market_stat") not in reader_registry
+        reader_registry.close()
+        data.close()
+        assert not len(registry.entries())
+
+    def test_register_order_book(self, create_registry):
+        registry: SHMRegistry = create_registry
+        book = OrderBookRepository(market=Market.ETHUSD, create=True, depth=5)
+        registry.register("order_book", book, Market.ETHUSD)
+        book.set_snapshot(bids=np.array([[10.0, 1.0]]), asks=np.array([[11.0, 2.0]]))
+        assert registry[Market.ETHUSD, None, "order_book"].best_ask() == 11
+        assert registry[Market.ETHUSD, None, "order_book"].depth == 5
+        with pytest.raises(ValueError):
+            registry.register("candles", book, Market.ETHUSD)
+        book.close()
+        assert (Market.ETHUSD, None, "order_book") not in registry
+
+    def test_dead_writers_are_skipped(self, create_registry):
+        registry: SHMRegistry = create_registry
+        data = registry.market_data(Market.BTCUSD, "1m", rows=5)
+        assert (Market.BTCUSD, "1m") in registry
+        # pid above the kernel maximum
+        registry._table["pid"][0] = 2**22 + 1
+        assert (Market.BTCUSD, "1m") not in registry
+        assert not len(registry.entries())
+        data.close()
+
+    def test_readers_follow_restarted_writers(self, create_registry):
+        registry: SHMRegistry = create_registry
+        data = registry.market_data(Market.BTCUSD, "1m", rows=5)
+        reader = registry[Market.BTCUSD, "1m"]
+        assert registry[Market.BTCUSD, "1m"] is reader
+        # another live process registered the segment again
+        with registry._locked():
+            registry._table["pid"][0] = os.getppid()
+        assert registry[Market.BTCUSD, "1m"] is not reader
+        data.close()
+        with pytest.raises(KeyError):
+            registry[Market.BTCUSD, "1m"]
+
+    def test_cached_readers_skip_the_scan(self, create_registry, monkeypatch):
+        registry: SHMRegistry = create_registry
+        data = registry.market_data(Market.BTCUSD, "1m", rows=5)
+        reader = registry[Market.BTCUSD, "1m"]
+        monkeypatch.setattr(registry, "_table_copy", None)
+        assert registry[Market.BTCUSD, "1m"] is reader
+        monkeypatch.undo()
+        # the registry changed, the lookup is checked again
+        stat = registry.market_stat(Market.BTCUSD, "1m", rows=5)
+        assert registry[Market.BTCUSD, "1m"] is reader
+        stat.close()
+        data.close()
+
+    def test_file_backed_writers(self, create_registry, tmp_path):
+        registry: SHMRegistry = create_registry
+        data = registry.market_data(Market.BTCUSD, "1m", rows=5, directory=tmp_path)
+        data.set_close_price(100)
+        reader_registry = SHMRegistry(name="test_registry")
+        reader = reader_registry[Market.BTCUSD, "1m"]
+        assert reader.get_closes()[-1] == 100
+        reader_registry.close()
+        data.close()
+
+    def test_arena_writers(self, create_registry):
+        registry: SHMRegistry = create_registry
+        arena = SHMArena(name="test_registry_arena", create=True, size=1024 * 1024)
+        data = registry.market_data(Market.BTCUSD, "1m", rows=5, arena=arena)
+        data.set_close_price(100)
+        reader_registry = SHMRegistry(name="test_registry")
+        assert reader_registry[Market.BTCUSD, "1m"].get_closes()[-1] == 100
+        reader_registry.close()
+        data.close()
+        arena.close()
+
+    def test_writers_outlive_the_registry(self):
+        registry = SHMRegistry(name="test_registry_first", entries=4)
+        data = registry.market_data(Market.BTCUSD, "1m", rows=5)
+        name = data._name
+        registry.close(unlink=True)
+        data.close()
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
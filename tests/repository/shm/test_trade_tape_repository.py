@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+from src.fifi import TradeTapeRepository
+from src.fifi.enums import Market
+from src.fifi.enums.market import Trade
+from src.fifi.exceptions import SHMOverrunException
+
+
+@pytest.fixture
+def create_tape():
+    tape = TradeTapeRepository(market=Market.BTCUSD_PERP, create=True, capacity=8)
+    yield tape
+    tape.close()
+
+
+def append(tape: TradeTapeRepository, first: int, count: int):
+    prices = np.arange(first, first + count, dtype=np.double)
+    tape.append(
+        times=prices * 10,
+        prices=prices,
+        sizes=np.ones(count),
+        sides=np.where(prices % 2, 1, -1),
+    )
+
+
+class TestTradeTapeRepository:
+    def test_poll_batches(self, create_tape):
+        tape: TradeTapeRepository = create_tape
+        reader = TradeTapeRepository(market=Market.BTCUSD_PERP)
+        assert not len(reader.poll())
+
+        append(tape, 0, 5)
+        batch = reader.poll(max_count=3)
+        assert np.array_equal(batch[:, Trade.PRICE.value], [0, 1, 2])
+        assert np.array_equal(batch[:, Trade.SIDE.value], [-1, 1, -1])
+        assert not np.shares_memory(batch, reader._data)
+        assert reader.lag == 2
+
+        append(tape, 5, 5)
+        # the batch stops at the end of the buffer
+        assert np.array_equal(reader.poll()[:, Trade.PRICE.value], [3, 4, 5, 6, 7])
+        assert np.array_equal(reader.poll()[:, Trade.PRICE.value], [8, 9])
+        assert reader.cursor == tape.written == 10
+        reader.close()
+
+    def test_overrun(self, create_tape):
+        tape: TradeTapeRepository = create_tape
+        reader = TradeTapeRepository(market=Market.BTCUSD_PERP)
+        append(tape, 0, 11)
+        with pytest.raises(SHMOverrunException):
+            reader.poll()
+        assert reader.cursor == tape.oldest == 3
+        assert reader.poll()[0, Trade.PRICE.value] == 3
+        reader.close()
+
+    def test_lapped_during_copy(self, create_tape):
+        tape: TradeTapeRepository = create_tape
+        reader = TradeTapeRepository(market=Market.BTCUSD_PERP, from_oldest=True)
+        append(tape, 0, 8)
+        data = reader._data
+
+        class Lapping:
+            def __getitem__(self, rows):
+                # the writer overwrites the oldest trade in the middle of the poll
+                batch = data[rows]
+                append(tape, 8, 1)
+                return batch
+
+        reader._data = Lapping()
+        with pytest.raises(SHMOverrunException):
+            reader.poll()
+        reader._data = data
+        assert reader.cursor == tape.oldest == 1
+        assert np.array_equal(reader.poll()[:, Trade.PRICE.value], np.arange(1, 8))
+        reader.close()
+
+    def test_independent_cursors(self, create_tape):
+        tape: TradeTapeRepository = create_tape
+        append(tape, 0, 20)
+        latest = TradeTapeRepository(market=Market.BTCUSD_PERP)
+        oldest = TradeTapeRepository(market=Market.BTCUSD_PERP, from_oldest=True)
+        assert not len(latest.poll())
+        assert np.array_equal(oldest.poll()[:, Trade.PRICE.value], np.arange(12, 16))
+        append(tape, 20, 1)
+        assert latest.poll()[0, Trade.PRICE.value] == 20
+        assert oldest.lag == 5
+        latest.close()
+        oldest.close()